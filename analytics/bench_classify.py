@@ -0,0 +1,140 @@
+# analytics/bench_classify.py
+"""
+Micro-benchmark: legacy opinion classification vs. OpinionClassifier
+--------------------------------------------------------------------
+Runs detect_outcome_plaintext + detect_tags + holding_from_text (the legacy
+per-opinion path) and classify_opinion (the compiled engine) over a corpus of
+large opinion texts, checks that both return the same outcome/tags/holding,
+and prints throughput in MB/s.
+
+Usage:
+  python analytics/bench_classify.py                       # synthetic corpus
+  python analytics/bench_classify.py --docs 20 --mb 4      # bigger synthetic corpus
+  python analytics/bench_classify.py --corpus ./opinions   # *.txt / *.htm files
+
+No Supabase or API credentials are needed.
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+from typing import List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import scrap_courtlistener as sc  # noqa: E402
+
+FILLER = [
+    "The district court entered an order on the motion.",
+    "Plaintiff alleges that the agency failed to provide notice before the hearing.",
+    "We review the grant of summary judgment de novo.",
+    "Defendants argue that the claims are barred by the statute of limitations.",
+    "The record reflects that the obligor was not served.",
+    "Accordingly, the judgment of the trial court is modified in part.",
+    "See Mathews v. Eldridge, 424 U.S. 319, 335 (1976).",
+    "The magistrate judge recommended that the petition be denied.",
+    "Counsel for the respondent did not appear.",
+    "The parties dispute whether the arrearage was properly calculated.",
+]
+
+SIGNALS = [
+    "We reverse the district court's order of dismissal.",
+    "We REVERSE and\n  remand for further proceedings.",
+    "vacate and remand",
+    "summary judgment for the defendant",
+    "Plaintiff's claims are reinstated.",
+    "a violation of due process",
+    "the § 1983 claim survives",
+    "The claims may proceed.",
+    "We affirm the dismissal.",
+    "dismissed for failure to state a claim",
+    "Qualified immunity applies here.",
+    "for lack of jurisdiction",
+    "claims dismissed with prejudice",
+    "brought under 42 U.S.C. § 1983",
+    "under 42 USC 1983 and",
+    "Section§1983",
+    "the Fourteenth  Amendment",
+    "Title IV-D child support enforcement",
+    "fraud on the court",
+    "extrinsic fraud",
+    "We hold that the notice provided to the obligor was constitutionally inadequate under the circumstances.",
+    "The court concludes that the agency acted outside its statutory authority in this matter.",
+]
+
+def synthetic_corpus(docs: int, mb: float, seed: int) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    target = int(mb * 1024 * 1024)
+    out: List[Tuple[str, str]] = []
+    for d in range(docs):
+        # Each document gets only a few signals, like a real opinion.
+        signals = rng.sample(SIGNALS, k=rng.randint(0, 4))
+        parts: List[str] = []
+        size = 0
+        while size < target:
+            s = rng.choice(FILLER)
+            if signals and rng.random() < 0.0005:
+                s = signals.pop()
+            sep = "\n\n" if rng.random() < 0.1 else " "
+            parts.append(s + sep)
+            size += len(s) + len(sep)
+        out.append((f"Doe v. State {d}", "".join(parts)))
+    return out
+
+def load_corpus(path: str) -> List[Tuple[str, str]]:
+    out: List[Tuple[str, str]] = []
+    for f in sorted(Path(path).glob("*")):
+        if f.suffix.lower() in (".txt", ".htm", ".html") and f.is_file():
+            out.append((f.stem, f.read_text(errors="replace")))
+    if not out:
+        raise SystemExit(f"No .txt/.htm files found in {path}")
+    return out
+
+def legacy(title: str, body: str) -> Tuple[str, List[str], str]:
+    return (
+        sc.detect_outcome_plaintext(body),
+        sc.detect_tags(f"{title}\n{body}"),
+        sc.holding_from_text(body),
+    )
+
+def engine(title: str, body: str) -> Tuple[str, List[str], str]:
+    c = sc.classify_opinion(body, title)
+    return c.outcome, c.tags, c.holding
+
+def run(fn, corpus: List[Tuple[str, str]], repeat: int) -> Tuple[float, list]:
+    best = float("inf")
+    results: list = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        results = [fn(title, body) for title, body in corpus]
+        best = min(best, time.perf_counter() - t0)
+    return best, results
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark opinion classification throughput.")
+    ap.add_argument("--corpus", type=str, help="Directory of .txt/.htm opinions (default: synthetic).")
+    ap.add_argument("--docs", type=int, default=8, help="Synthetic documents to generate.")
+    ap.add_argument("--mb", type=float, default=2.0, help="Size of each synthetic document in MB.")
+    ap.add_argument("--seed", type=int, default=1983)
+    ap.add_argument("--repeat", type=int, default=3, help="Best of N timed passes.")
+    args = ap.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.docs, args.mb, args.seed)
+    total_mb = sum(len(body.encode()) for _, body in corpus) / (1024 * 1024)
+    print(f"corpus: {len(corpus)} docs, {total_mb:.1f} MB")
+
+    t_legacy, r_legacy = run(legacy, corpus, args.repeat)
+    t_engine, r_engine = run(engine, corpus, args.repeat)
+
+    mismatches = [corpus[i][0] for i, (a, b) in enumerate(zip(r_legacy, r_engine)) if a != b]
+    print(f"legacy : {t_legacy:7.3f}s  {total_mb / t_legacy:8.1f} MB/s")
+    print(f"engine : {t_engine:7.3f}s  {total_mb / t_engine:8.1f} MB/s  ({t_legacy / t_engine:.1f}x)")
+    print(f"parity : {len(corpus) - len(mismatches)}/{len(corpus)} identical")
+    if mismatches:
+        print("mismatched:", ", ".join(mismatches[:10]))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# analytics/case_snapshot.py
+"""
+Columnar snapshots of federal_case_library
+------------------------------------------
+Streams the table out of Supabase into chunked Parquet (or Arrow IPC) files,
+with `vector_embedding` stored as a fixed-size float32 list, and bulk-loads
+such a snapshot back. Use it to rebuild indexes, run analytics or seed a
+test project from a local file instead of paging through REST as JSON.
+
+Usage:
+  python analytics/case_snapshot.py export --out snapshots/cases
+  python analytics/case_snapshot.py export --out snapshots/cases --incremental          # new ids only
+  python analytics/case_snapshot.py export --out snapshots/edits --by updated_at         # watermark on update time
+  python analytics/case_snapshot.py export --out snapshots/edits --incremental           # new and edited rows
+  python analytics/case_snapshot.py import snapshots/cases --concurrency 4
+
+A snapshot directory holds part-NNNNN.parquet|arrow files plus snapshot.json
+(parts, row counts and the id / update-time watermarks). A snapshot keeps the
+--by column it was created with. Incremental exports append parts; on import
+later parts win for the same id. Env vars are the scraper's (SUPABASE_URL,
+SUPABASE_SERVICE_ROLE_KEY).
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError as e:
+    raise SystemExit("Install pyarrow and numpy: pip install -U pyarrow numpy") from e
+
+sys.path[:0] = [str(Path(__file__).resolve().parent), str(Path(__file__).resolve().parent.parent / "backend")]
+
+from scrap_courtlistener import EMBED_DIM, LOG, get_sb  # noqa: E402
+from app.utils.vectors import parse_vector  # noqa: E402  (shared with the API's ANN loader)
+
+TABLE = "federal_case_library"
+MANIFEST = "snapshot.json"
+
+# Known columns get fixed types so every part shares one schema; any other
+# column (created_at, updated_at, ...) is carried as a string.
+TYPES = {
+    "id": pa.int64(),
+    "case_name": pa.string(),
+    "jurisdiction": pa.string(),
+    "court_level": pa.string(),
+    "summary": pa.string(),
+    "holding": pa.string(),
+    "citation": pa.string(),
+    "outcome": pa.string(),
+    "tags": pa.list_(pa.string()),
+    "source_link": pa.string(),
+    "provider": pa.string(),
+}
+VECTOR = "vector_embedding"
+
+# -------------------------
+# Manifest
+# -------------------------
+def load_manifest(root: Path) -> Dict[str, Any]:
+    try:
+        return json.loads((root / MANIFEST).read_text())
+    except (OSError, ValueError):
+        return {"table": TABLE, "dim": EMBED_DIM, "parts": []}
+
+def save_manifest(root: Path, manifest: Dict[str, Any]) -> None:
+    tmp = root / (MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp, root / MANIFEST)
+
+# -------------------------
+# Rows <-> Arrow
+# -------------------------
+def rows_to_table(rows: List[Dict[str, Any]], dim: int) -> pa.Table:
+    cols: Dict[str, pa.Array] = {}
+    names = list(dict.fromkeys(k for r in rows for k in r if k != VECTOR))
+    for name in names:
+        vals = [r.get(name) for r in rows]
+        typ = TYPES.get(name, pa.string())
+        if name not in TYPES:
+            vals = [v if v is None or isinstance(v, str) else json.dumps(v) for v in vals]
+        cols[name] = pa.array(vals, type=typ)
+
+    vecs = [parse_vector(r.get(VECTOR), dim) for r in rows]
+    missing = np.array([v is None for v in vecs])
+    flat = np.zeros((len(rows), dim), dtype=np.float32)
+    for i, v in enumerate(vecs):
+        if v is not None:
+            flat[i] = v
+    cols[VECTOR] = pa.FixedSizeListArray.from_arrays(
+        pa.array(flat.reshape(-1)), dim, mask=pa.array(missing) if missing.any() else None)
+    return pa.table(cols)
+
+_F32 = "{:.9g}".format  # 9 significant digits round-trip any float32 exactly
+
+def _vector_text(arr: np.ndarray) -> str:
+    return "[" + ",".join(map(_F32, arr.tolist())) + "]"
+
+def batch_to_rows(batch: pa.RecordBatch, keep_ids: bool) -> List[Dict[str, Any]]:
+    vec_idx = batch.schema.get_field_index(VECTOR)
+    rows = batch.drop_columns([VECTOR]).to_pylist() if vec_idx >= 0 else batch.to_pylist()
+    if vec_idx >= 0:
+        col = batch.column(vec_idx)
+        dim = col.type.list_size
+        # .values ignores slicing (IPC batches are sliced); nulls keep their slot.
+        flat = col.values.slice(col.offset * dim, len(col) * dim).to_numpy(zero_copy_only=False).reshape(-1, dim)
+        valid = col.is_valid().to_numpy(zero_copy_only=False)
+        for i, row in enumerate(rows):
+            row[VECTOR] = _vector_text(flat[i]) if valid[i] else None
+    if not keep_ids:
+        for row in rows:
+            row.pop("id", None)
+    return rows
+
+# -------------------------
+# Export
+# -------------------------
+def fetch_pages(by: str, after: Optional[Any], after_id: Optional[int], page_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Keyset pagination by id, or by (update column, id); never OFFSET.
+
+    Both keysets (and the int64 id column) assume `id` is an integer identity
+    column, so --incremental by id picks up rows inserted since the last
+    export but not edits; use --by updated_at for those. Anything else aborts
+    the export rather than writing parts that silently miss rows.
+    """
+    sb = get_sb()
+    while True:
+        q = sb.table(TABLE).select("*")
+        if by == "id":
+            if after_id is not None:
+                q = q.gt("id", after_id)
+            q = q.order("id")
+        else:
+            if after is not None:
+                q = q.or_(f'{by}.gt."{after}",and({by}.eq."{after}",id.gt.{after_id or 0})')
+            q = q.order(by).order("id")
+        rows = q.limit(page_size).execute().data or []
+        if not rows:
+            return
+        for row in rows:
+            if type(row.get("id")) is not int:
+                raise SystemExit(f"{TABLE}.id must be an integer identity column for keyset export, got {row.get('id')!r}")
+        yield rows
+        after_id = rows[-1].get("id")
+        if by != "id":
+            after = rows[-1].get(by)
+        if len(rows) < page_size:
+            return
+
+def write_part(root: Path, index: int, table: pa.Table, fmt: str) -> str:
+    name = f"part-{index:05d}.{fmt}"
+    tmp = root / (name + ".tmp")
+    if fmt == "parquet":
+        pq.write_table(table, tmp, compression="zstd")
+    else:
+        with ipc.new_file(str(tmp), table.schema) as w:
+            w.write_table(table)
+    os.replace(tmp, root / name)
+    return name
+
+def export(args: argparse.Namespace) -> None:
+    root = Path(args.out)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(root)
+    if not args.incremental and manifest["parts"]:
+        raise SystemExit(f"{root} already holds a snapshot; pass --incremental to extend it")
+    fmt = manifest.get("format") or args.format
+    dim = manifest.get("dim") or EMBED_DIM
+    if manifest.get("by") and args.by and args.by != manifest["by"]:
+        raise SystemExit(f"{root} is watermarked by {manifest['by']}; it cannot be extended --by {args.by}")
+    by = manifest.get("by") or args.by or "id"
+    manifest.update(format=fmt, dim=dim, by=by)
+
+    after = manifest.get("last_value") if args.incremental else None
+    after_id = manifest.get("last_id") if args.incremental else None
+    t0 = time.monotonic()
+    total = 0
+    buf: List[Dict[str, Any]] = []
+
+    def flush() -> None:
+        nonlocal buf
+        if not buf:
+            return
+        table = rows_to_table(buf, dim)
+        name = write_part(root, len(manifest["parts"]) + 1, table, fmt)
+        ids = [r.get("id") for r in buf if r.get("id") is not None]
+        manifest["parts"].append({"file": name, "rows": len(buf),
+                                  "min_id": min(ids, default=None), "max_id": max(ids, default=None)})
+        manifest["last_id"] = buf[-1].get("id")
+        if by != "id":
+            manifest["last_value"] = buf[-1].get(by)
+        manifest["exported_at"] = datetime.now(timezone.utc).isoformat()
+        save_manifest(root, manifest)  # after every part, so an interrupted export resumes cleanly
+        LOG.info("Wrote %s (%d rows)", name, len(buf))
+        buf = []
+
+    for page in fetch_pages(by, after, after_id, args.page_size):
+        buf.extend(page)
+        total += len(page)
+        if len(buf) >= args.chunk_rows:
+            flush()
+    flush()
+    LOG.info("Exported %d rows in %.1fs to %s", total, time.monotonic() - t0, root)
+
+# -------------------------
+# Import
+# -------------------------
+def part_files(path: Path) -> List[Path]:
+    return [path / p["file"] for p in load_manifest(path)["parts"]] if path.is_dir() else [path]
+
+def iter_batches(part: Path, batch_rows: int, columns: Optional[List[str]] = None) -> Iterator[pa.RecordBatch]:
+    if part.suffix == ".parquet":
+        yield from pq.ParquetFile(part).iter_batches(batch_size=batch_rows, columns=columns)
+    else:
+        with ipc.open_file(pa.memory_map(str(part))) as r:
+            for i in range(r.num_record_batches):
+                batch = r.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for off in range(0, batch.num_rows, batch_rows):
+                    yield batch.slice(off, batch_rows)
+
+def last_occurrence(part: Path) -> Optional[np.ndarray]:
+    """Row mask keeping only the last row per id in a part (an --by updated_at export can hold a row twice)."""
+    names = pq.ParquetFile(part).schema_arrow.names if part.suffix == ".parquet" else \
+        ipc.open_file(pa.memory_map(str(part))).schema.names
+    if "id" not in names:
+        return None
+    ids = [i for b in iter_batches(part, 65536, ["id"]) for i in b.column(0).to_pylist()]
+    last = {i: n for n, i in enumerate(ids)}
+    keep = np.zeros(len(ids), dtype=bool)
+    keep[list(last.values())] = True
+    return keep
+
+async def load(args: argparse.Namespace) -> None:
+    sem = asyncio.Semaphore(max(1, args.concurrency))
+    t0 = time.monotonic()
+    loaded = 0
+    pending: List[asyncio.Task] = []
+
+    def send(batch: pa.RecordBatch) -> int:
+        rows = batch_to_rows(batch, not args.no_ids)
+        get_sb().table(TABLE).upsert(rows, returning="minimal").execute()
+        return len(rows)
+
+    async def upsert(batch: pa.RecordBatch) -> None:
+        nonlocal loaded
+        async with sem:
+            loaded += await asyncio.to_thread(send, batch)
+
+    # Batches of one part are upserted concurrently, so a part must not hold an
+    # id twice (and Postgres rejects a statement that updates a row twice): only
+    # the last copy is sent. A part starts once the previous one has landed, so
+    # later parts win for the same id.
+    for part in part_files(Path(args.path)):
+        keep = None if args.no_ids else last_occurrence(part)
+        offset = 0
+        for batch in iter_batches(part, args.batch):
+            if keep is not None:
+                mask, offset = keep[offset:offset + batch.num_rows], offset + batch.num_rows
+                batch = batch.filter(pa.array(mask))
+            if batch.num_rows:
+                pending.append(asyncio.create_task(upsert(batch)))
+            if len(pending) >= args.concurrency * 2:
+                await pending.pop(0)
+        await asyncio.gather(*pending)
+        pending.clear()
+    LOG.info("Loaded %d rows in %.1fs from %s", loaded, time.monotonic() - t0, args.path)
+
+# -------------------------
+# CLI
+# -------------------------
+def parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description="Export/import federal_case_library as columnar snapshots.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    ex = sub.add_parser("export", help="Stream the table into chunked Parquet/Arrow files.")
+    ex.add_argument("--out", required=True, help="Snapshot directory.")
+    ex.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    ex.add_argument("--incremental", action="store_true", help="Append rows past the stored watermark.")
+    ex.add_argument("--by", help="Watermark column: id (default) or an update-time column. Fixed per snapshot.")
+    ex.add_argument("--page-size", type=int, default=1000, help="Rows per REST page (Supabase caps at 1000).")
+    ex.add_argument("--chunk-rows", type=int, default=50000, help="Rows per part file.")
+
+    im = sub.add_parser("import", help="Bulk-upsert a snapshot (directory or single part file).")
+    im.add_argument("path")
+    im.add_argument("--batch", type=int, default=500, help="Rows per upsert.")
+    im.add_argument("--concurrency", type=int, default=4, help="Upserts in flight.")
+    im.add_argument("--no-ids", action="store_true", help="Drop ids so the target assigns its own.")
+    return ap.parse_args()
+
+def main():
+    args = parse_args()
+    if args.cmd == "export":
+        export(args)
+    else:
+        asyncio.run(load(args))
+
+if __name__ == "__main__":
+    main()
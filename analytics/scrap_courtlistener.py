@@ -18,6 +18,39 @@ Usage:
     --topics "1983,due process,child support,title iv-d,fourteenth amendment" \
     --days 3650 --max 300 --include-unknown --page-size 50
 
+Providers fetch concurrently and share the --max budget: quota a provider
+cannot use (empty or finished early) moves to those still producing.
+Pass --sequential to fetch one provider at a time.
+
+Requests are paced per API host by an adaptive token bucket that speeds up
+while responses succeed and backs off on 429 / Retry-After / X-RateLimit-*.
+
+Opinion parsing and classification run on the event loop by default;
+--workers N moves them to a pool of N processes (HTTP stays on asyncio).
+
+Progress is checkpointed per provider/topic set in --state-file:
+  --incremental  only fetch opinions newer than the last completed walk
+  --resume       continue the last unfinished walk from its stored cursor
+
+GET responses are cached on disk (--cache-dir, default analytics/.http_cache)
+and revalidated with ETag / Last-Modified; --no-cache turns this off.
+--record DIR saves every provider HTTP exchange as a fixture; --replay DIR
+runs offline from them (no tokens, cache or rate limits). See
+analytics/scraper_bench.py for a throughput benchmark over a recording.
+
+Embeddings are cached by content + model in --embed-cache (SQLite), so
+unchanged summaries are never re-embedded; --no-embed-cache turns this off.
+Records whose stored row already has identical content are neither
+re-embedded nor re-upserted; --no-diff writes every record.
+The same opinion fetched from two providers (different citation strings) is
+caught by MinHash/LSH near-duplicate detection and stored once (preferring
+the copy with a reporter citation); sketches of
+stored opinions live in --dedup-index. --dedup-rebuild [--dedup-prune]
+re-indexes the table and reports (or deletes) duplicates already stored.
+Upserts run --upsert-concurrency at a time in payload-sized batches; a batch
+Supabase rejects is bisected to isolate the bad rows, which are appended to
+--dead-letter and can be re-sent later with --retry-dead-letter.
+
 Env vars (repo .env or analytics/.env):
   SUPABASE_URL=...
   SUPABASE_SERVICE_ROLE_KEY=...
@@ -34,22 +67,43 @@ import sys
 import math
 import json
 import time
+import random
 import argparse
 from pathlib import Path
 import asyncio
+import sqlite3
+import tempfile
+import threading
+import html
 import hashlib
 import logging
+import zlib
+from array import array
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from email.utils import parsedate_to_datetime
+from typing import IO, Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 
 import httpx
 
+try:
+    import numpy as np
+except ImportError:  # local embeddings fall back to pure Python
+    np = None
+
 try:
     from supabase import create_client
 except ImportError as e:
     raise SystemExit("Install supabase-py: pip install -U 'supabase>=2.6.0'") from e
 
+# Embedding request batching/retries are shared with the API (backend/app/utils/embed_batching.py).
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+from app.utils.embed_batching import embed_in_batches  # noqa: E402
+
 # -------------------------
 # .env loader (robust)
 # -------------------------
@@ -112,8 +166,28 @@ SUPABASE_URL               = (os.getenv("SUPABASE_URL") or "").strip().strip('"'
 SUPABASE_SERVICE_ROLE_KEY  = (os.getenv("SUPABASE_SERVICE_ROLE_KEY") or "").strip().strip('"').strip("'")
 OPENAI_API_KEY             = os.getenv("OPENAI_API_KEY")
 CAP_API_KEY                = os.getenv("CAP_API_KEY")
+GOVINFO_CONCURRENCY        = int(os.getenv("GOVINFO_CONCURRENCY", "6"))
+SCRAPER_CACHE_DIR          = os.getenv("SCRAPER_CACHE_DIR") or str(Path(__file__).resolve().parent / ".http_cache")
+SCRAPER_CACHE_MAX_MB       = int(os.getenv("SCRAPER_CACHE_MAX_MB", "512"))
+SCRAPER_STATE_FILE         = os.getenv("SCRAPER_STATE_FILE") or str(Path(__file__).resolve().parent / ".scraper_state.json")
+SCRAPER_RATE               = float(os.getenv("SCRAPER_RATE", "2.0"))       # initial req/s per host
+SCRAPER_MAX_RATE           = float(os.getenv("SCRAPER_MAX_RATE", "20.0"))  # ceiling while probing upward
+SCRAPER_EMBED_CACHE        = os.getenv("SCRAPER_EMBED_CACHE") or str(Path(__file__).resolve().parent / ".embed_cache.sqlite3")
+SCRAPER_DEDUP_INDEX        = os.getenv("SCRAPER_DEDUP_INDEX") or str(Path(__file__).resolve().parent / ".dedup_index.sqlite3")
+SCRAPER_DEDUP_THRESHOLD    = float(os.getenv("SCRAPER_DEDUP_THRESHOLD", "0.8"))  # estimated shingle Jaccard
+SCRAPER_UPSERT_CONCURRENCY = int(os.getenv("SCRAPER_UPSERT_CONCURRENCY", "4"))
+SCRAPER_UPSERT_MAX_KB      = int(os.getenv("SCRAPER_UPSERT_MAX_KB", "4096"))    # payload per upsert request
+SCRAPER_UPSERT_RETRIES     = int(os.getenv("SCRAPER_UPSERT_RETRIES", "4"))
+SCRAPER_DEAD_LETTER        = os.getenv("SCRAPER_DEAD_LETTER") or str(Path(__file__).resolve().parent / ".dead_letter.jsonl")
 
 EMBED_DIM = 1536  # matches text-embedding-3-small
+EMBED_MODEL = "text-embedding-3-small"
+LOCAL_EMBED_MODEL = f"local-hash-{EMBED_DIM}"
+# Per-request limits for the embeddings API (OpenAI allows 300k tokens / 2048 inputs).
+EMBED_MAX_TOKENS   = int(os.getenv("EMBED_MAX_TOKENS", "100000"))
+EMBED_MAX_INPUTS   = int(os.getenv("EMBED_MAX_INPUTS", "2048"))
+EMBED_CONCURRENCY  = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES  = int(os.getenv("EMBED_MAX_RETRIES", "5"))
 
 LOG = logging.getLogger("scraper")
 logging.basicConfig(
@@ -126,12 +200,18 @@ def _looks_like_jwt(s: str) -> bool:
     parts = (s or "").split(".")
     return len(parts) == 3 and all(parts)
 
-if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
-    raise SystemExit("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
-if not SUPABASE_URL.startswith("https://") or ".supabase.co" not in SUPABASE_URL:
-    raise SystemExit("SUPABASE_URL looks wrong; expected https://<ref>.supabase.co")
+_sb = None
 
-sb = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+def get_sb():
+    """Supabase client, created on first use so helpers/benchmarks can import this module without credentials."""
+    global _sb
+    if _sb is None:
+        if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
+            raise SystemExit("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+        if not SUPABASE_URL.startswith("https://") or ".supabase.co" not in SUPABASE_URL:
+            raise SystemExit("SUPABASE_URL looks wrong; expected https://<ref>.supabase.co")
+        _sb = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    return _sb
 
 # -------------------------
 # Heuristics & helpers
@@ -181,6 +261,11 @@ def detect_outcome_plaintext(plain_text: str) -> str:
     if lost and not won: return "LOST"
     return "UNKNOWN"
 
+def parse_date(date_str: str) -> datetime:
+    """ISO date/datetime -> aware UTC datetime (bare dates like '2024-01-05' are naive otherwise)."""
+    dt = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
 def short(s: str, n: int) -> str:
     s = (s or "").strip()
     if len(s) <= n: return s
@@ -214,36 +299,1187 @@ def holding_from_text(plain_text: str) -> str:
         m = re.search(r"\b(the\s+court\s+(holds|concludes|determines)[^\.]{20,300}\.)", txt, re.I)
     return m.group(1) if m else short(txt, 600)
 
+# -------------------------
+# Classification engine
+# -------------------------
+# "§?\s*1983\s+claim…" can match empty before "1983", so for a yes/no search it is the
+# same as starting at the literal "1983" – which lets re use its prefix scan.
+WIN_PATTERNS_ANCHORED = [
+    r"1983\s+claim\s+(?:survives|allowed|proceeds)" if p == r"§?\s*1983\s+claim\s+(?:survives|allowed|proceeds)" else p
+    for p in WIN_PATTERNS
+]
+
+def _is_word(c: str) -> bool:
+    # Same definition as re's \w for str patterns.
+    return c.isalnum() or c == "_"
+
+@dataclass
+class Classification:
+    outcome: str
+    tags: List[str]
+    holding: str
+
+class OpinionClassifier:
+    """
+    Outcome, tags and holding for one opinion in a single call, equivalent to
+    detect_outcome_plaintext / detect_tags / holding_from_text but cheaper:
+
+    - the body is lowercased once and whitespace-normalized once;
+    - every pattern is precompiled and starts with a literal, so `re` can skip
+      ahead with its fast prefix scan instead of trying each position. One big
+      alternation is deliberately avoided: sre drops the prefix scan for it and
+      ends up slower than the separate searches;
+    - case-insensitive tag patterns run on the lowercased text without re.I;
+    - tag patterns whose leading `\b\d{0,2}\s*` / `\b` defeats the prefix scan
+      are searched from their literal and the boundary is checked by hand.
+
+    `python analytics/bench_classify.py` checks parity with the legacy
+    functions and reports throughput.
+    """
+
+    def __init__(self):
+        self.win = [re.compile(p) for p in WIN_PATTERNS_ANCHORED]
+        self.lose = [re.compile(p) for p in LOSE_PATTERNS]
+        self.usc_1983 = re.compile(r"usc\s*§?\s*1983\b")
+        self.sect_1983 = re.compile(r"§\s*1983\b")
+        self.title42_1983 = re.compile(r"42\s*u\.?s\.?c\.?\s*§\s*1983")
+        self.tag_res = {
+            # "title\s*iv-d" is implied by "iv[- ]?d", so it needs no search of its own.
+            "due_process": [re.compile(p) for p in (r"due\s*process", r"fourteenth\s+amendment", r"14th\s+amendment")],
+            "child_support": [re.compile(p) for p in (r"child\s*support", r"iv[- ]?d")],
+            "extrinsic_fraud": [re.compile(p) for p in (r"extrinsic\s+fraud", r"fraud\s+on\s+the\s+court")],
+        }
+        self.holding_res = [
+            re.compile(r"\b(we\s+(hold|conclude|determine)[^\.]{20,300}\.)", re.I),
+            re.compile(r"\b(the\s+court\s+(holds|concludes|determines)[^\.]{20,300}\.)", re.I),
+        ]
+
+    def outcome(self, lowered: str) -> str:
+        won = any(p.search(lowered) for p in self.win)
+        lost = any(p.search(lowered) for p in self.lose)
+        if won and not lost: return "WON"
+        if lost and not won: return "LOST"
+        return "UNKNOWN"
+
+    def _section_1983(self, t: str) -> bool:
+        if "1983" not in t:
+            return False
+        if self.title42_1983.search(t):
+            return True
+        # \b§\s*1983\b: '§' is not a word char, so the \b needs a word char right before it.
+        for m in self.sect_1983.finditer(t):
+            if m.start() > 0 and _is_word(t[m.start() - 1]):
+                return True
+        # \b\d{0,2}\s*usc…: "usc" preceded by a non-word char (or nothing), or by 1-2 digits
+        # that are themselves preceded by a non-word char (or nothing).
+        for m in self.usc_1983.finditer(t):
+            i = m.start()
+            if i == 0 or not _is_word(t[i - 1]):
+                return True
+            for d in (1, 2):
+                j = i - d
+                if j >= 0 and t[j:i].isdecimal() and (j == 0 or not _is_word(t[j - 1])):
+                    return True
+        return False
+
+    def tags(self, lowered: str) -> List[str]:
+        tags = ["section_1983"] if self._section_1983(lowered) else []
+        for tag, pats in self.tag_res.items():
+            if any(p.search(lowered) for p in pats):
+                tags.append(tag)
+        return sorted(tags) or ["misc"]
+
+    def holding(self, normalized: str) -> str:
+        for p in self.holding_res:
+            m = p.search(normalized)
+            if m:
+                return m.group(1)
+        return short(normalized, 600)
+
+    def classify(self, body: str, title: str = "") -> Classification:
+        body = body or ""
+        lowered = body.lower()
+        # str.split() and re's \s agree on what whitespace is.
+        normalized = " ".join(body.split())
+        tag_text = f"{title.lower()}\n{lowered}" if title else lowered
+        return Classification(
+            outcome=self.outcome(lowered),
+            tags=self.tags(tag_text),
+            holding=self.holding(normalized),
+        )
+
+CLASSIFIER = OpinionClassifier()
+
+def classify_opinion(body: str, title: str = "") -> Classification:
+    return CLASSIFIER.classify(body, title)
+
+# -------------------------
+# HTML -> text
+# -------------------------
+class HTMLTextExtractor:
+    """
+    Incremental HTML -> plain text: feed() chunks as they arrive, close() for
+    the text. Entities are decoded, script/style and page chrome dropped, and
+    whitespace collapsed to one space within a block and one newline between
+    blocks. A tag split across chunks is carried over to the next feed().
+    Regex tokenizing keeps this several times faster than html.parser.
+    """
+
+    SKIP = frozenset({"head", "title", "noscript", "template", "iframe", "svg",
+                      "nav", "header", "footer", "aside", "form", "button", "select"})
+    RAW = frozenset({"script", "style"})  # content is not markup; skip to the closing tag
+    BLOCK = frozenset({"p", "div", "br", "hr", "li", "ul", "ol", "dd", "dt", "dl", "tr", "table",
+                       "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "section", "article",
+                       "center", "body"})
+    _TAG = re.compile(r"<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^>]*>|<![^-][^>]*>|<\?[^>]*>", re.S)
+    _OPEN = re.compile(r"<(?:[a-zA-Z/!?]|$)")
+    _RAW_END = {t: re.compile(rf"</{t}\s*>", re.I) for t in RAW}
+
+    def __init__(self):
+        self._buf = ""
+        self._raw: Optional[str] = None
+        self._skip = 0
+        self._cur: List[str] = []
+        self._lines: List[str] = []
+
+    def _flush(self) -> None:
+        if self._cur:
+            line = " ".join(html.unescape("".join(self._cur)).split())
+            if line:
+                self._lines.append(line)
+            self._cur = []
+
+    def _text(self, text: str) -> None:
+        if text and not self._skip:
+            self._cur.append(text)
+
+    def _tag(self, closing: str, name: str) -> None:
+        name = name.lower()
+        if name in self.RAW:
+            if not closing:
+                self._raw = name
+        elif name in self.SKIP:
+            self._skip = max(0, self._skip - 1) if closing else self._skip + 1
+        elif name in self.BLOCK:
+            self._flush()
+
+    def feed(self, chunk: str) -> None:
+        buf = self._buf + chunk
+        self._buf = ""
+        pos = 0
+        while pos < len(buf):
+            if self._raw:
+                m = self._RAW_END[self._raw].search(buf, pos)
+                if not m:
+                    self._buf = buf[max(pos, len(buf) - len(self._raw) - 3):]  # maybe a split "</script"
+                    return
+                self._raw = None
+                pos = m.end()
+                continue
+            for m in self._TAG.finditer(buf, pos):
+                if m.start() > pos:
+                    text = buf[pos:m.start()]
+                    if "<!--" in text:
+                        # A comment that has not ended yet; wait for the rest of it.
+                        i = text.index("<!--")
+                        self._text(text[:i])
+                        self._buf = buf[pos + i:]
+                        return
+                    if not self._skip:
+                        self._cur.append(text)
+                pos = m.end()
+                if m.group(2):
+                    self._tag(m.group(1), m.group(2))
+                    if self._raw:
+                        break
+            else:
+                rest = buf[pos:]
+                m = self._OPEN.search(rest)
+                if m:
+                    self._text(rest[:m.start()])
+                    self._buf = rest[m.start():]  # an unfinished tag; complete it next feed
+                else:
+                    self._text(rest)
+                return
+
+    def close(self) -> str:
+        if self._buf and not self._raw and not self._buf.startswith("<!--"):
+            self._text(self._buf)
+        self._buf = ""
+        self._flush()
+        return "\n".join(self._lines)
+
+_MARKUP = re.compile(r"<[a-zA-Z!/]")
+
+def html_to_text(s: str, chunk: int = 1 << 16) -> str:
+    """Plain text from an opinion body; bodies without markup only get whitespace collapsed."""
+    if not s:
+        return ""
+    if not _MARKUP.search(s):
+        return "\n".join(" ".join(line.split()) for line in s.splitlines() if line.strip())
+    ex = HTMLTextExtractor()
+    for i in range(0, len(s), chunk):
+        ex.feed(s[i:i + chunk])
+    return ex.close()
+
 # -------------------------
 # Embeddings
 # -------------------------
 async def openai_embed_texts(texts: List[str]) -> List[List[float]]:
-    async with httpx.AsyncClient(timeout=60) as c:
-        r = await c.post(
-            "https://api.openai.com/v1/embeddings",
-            headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
-            json={"model": "text-embedding-3-small", "input": texts},
-        )
-        r.raise_for_status()
-        data = r.json()
-        return [d["embedding"] for d in data["data"]]
+    """Embed `texts` in token-budgeted sub-batches; retries and splitting as in the API's embeddings service."""
+    async with httpx.AsyncClient(timeout=60, headers={"Authorization": f"Bearer {OPENAI_API_KEY}"}) as c:
+        return await embed_in_batches(
+            c, "https://api.openai.com/v1/embeddings", EMBED_MODEL, texts,
+            max_tokens=EMBED_MAX_TOKENS, max_inputs=EMBED_MAX_INPUTS,
+            concurrency=EMBED_CONCURRENCY, retries=EMBED_MAX_RETRIES, log=LOG)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+@lru_cache(maxsize=200_000)
+def token_bucket(tok: str, dim: int) -> int:
+    return int.from_bytes(hashlib.sha1(tok.encode()).digest(), "big") % dim
 
 def local_hash_embedding(text: str, dim: int = EMBED_DIM) -> List[float]:
+    if np is not None:
+        return local_hash_embeddings([text], dim)[0]
     vec = [0.0] * dim
-    for tok in re.findall(r"[a-z0-9]+", text.lower()):
-        h = int(hashlib.sha1(tok.encode()).hexdigest(), 16)
-        idx = h % dim
-        vec[idx] += 1.0
+    for tok in TOKEN_RE.findall(text.lower()):
+        vec[token_bucket(tok, dim)] += 1.0
     norm = math.sqrt(sum(v * v for v in vec)) or 1.0
     return [v / norm for v in vec]
 
-async def embed_texts(texts: List[str]) -> List[List[float]]:
+def local_hash_embeddings(texts: List[str], dim: int = EMBED_DIM) -> List[List[float]]:
+    """
+    Batched local_hash_embedding: each distinct token is hashed once (and
+    memoized across calls), then one weighted bincount covers the batch and
+    a single pass normalizes it. Counts are small integers, so the norm and
+    every vector are bit-identical to the pure-Python path.
+    """
+    if np is None:
+        return [local_hash_embedding(t, dim) for t in texts]
+    if not texts:
+        return []
+    idx, weights = [], []
+    for row, text in enumerate(texts):
+        counts = Counter(TOKEN_RE.findall(text.lower()))
+        offset = row * dim
+        idx.extend(token_bucket(t, dim) + offset for t in counts)
+        weights.extend(counts.values())
+    flat = np.bincount(np.asarray(idx, dtype=np.int64), weights=np.asarray(weights, dtype=np.float64),
+                       minlength=len(texts) * dim)
+    vecs = flat.reshape(len(texts), dim)
+    norms = np.sqrt(np.einsum("ij,ij->i", vecs, vecs))
+    norms[norms == 0] = 1.0
+    return (vecs / norms[:, None]).tolist()
+
+async def embed_texts_with_model(texts: List[str]) -> Tuple[List[List[float]], str]:
+    """embed_texts, plus the name of the model that actually produced the vectors."""
     if OPENAI_API_KEY:
         try:
-            return await openai_embed_texts(texts)
+            return await openai_embed_texts(texts), EMBED_MODEL
         except Exception as e:
             LOG.warning("OpenAI embeddings failed, falling back to local: %s", e)
-    return [local_hash_embedding(t) for t in texts]
+    return local_hash_embeddings(texts), LOCAL_EMBED_MODEL
+
+async def embed_texts(texts: List[str]) -> List[List[float]]:
+    return (await embed_texts_with_model(texts))[0]
+
+# -------------------------
+# Embedding cache
+# -------------------------
+class EmbeddingCache:
+    """
+    Persistent content-addressed embedding store (SQLite). The key is
+    sha256(model, text), so identical summary/holding text is embedded once
+    per model, and a model change never serves stale vectors. Vectors are
+    stored as float64 blobs and read back bit-identical; one of another
+    dimension (EMBED_DIM changed) counts as a miss and is overwritten.
+    """
+
+    _CHUNK = 500  # stay under SQLite's bound-parameter limit
+
+    def __init__(self, path: str, dim: int = EMBED_DIM):
+        self.dim = dim
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        uniq = list(dict.fromkeys(keys))
+        for i in range(0, len(uniq), self._CHUNK):
+            chunk = uniq[i:i + self._CHUNK]
+            rows = self.db.execute(
+                f"SELECT key, vec FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for k, blob in rows:
+                if len(blob) == self.dim * 8:
+                    found[k] = array("d", blob).tolist()
+        return found
+
+    def put_many(self, items: List[Tuple[str, List[float]]]) -> None:
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                                [(k, array("d", v).tobytes()) for k, v in items])
+
+    def close(self) -> None:
+        self.db.close()
+
+async def embed_texts_cached(texts: List[str], cache: Optional[EmbeddingCache]) -> List[List[float]]:
+    """embed_texts, answering from `cache` where possible; only misses are embedded."""
+    if cache is None or not texts:
+        return await embed_texts(texts)
+    model = EMBED_MODEL if OPENAI_API_KEY else LOCAL_EMBED_MODEL
+    keys = [cache.key(model, t) for t in texts]
+    found = cache.get_many(keys)
+    hits = sum(1 for k in keys if k in found)
+    cache.hits += hits
+    cache.misses += len(keys) - hits
+
+    todo = {k: t for k, t in zip(keys, texts) if k not in found}  # also dedups within the batch
+    if todo:
+        embs, used = await embed_texts_with_model(list(todo.values()))
+        found.update(zip(todo, embs))
+        # Vectors from the local fallback are filed under their own model.
+        cache.put_many([(k if used == model else cache.key(used, t), emb)
+                        for (k, t), emb in zip(todo.items(), embs)])
+    return [found[k] for k in keys]
+
+# -------------------------
+# Near-duplicate detection
+# -------------------------
+# The same opinion often arrives from several providers under different
+# citation strings (or a GovInfo package ID), so record_key() cannot see it.
+# Each opinion's text is reduced to a MinHash signature of its word 5-shingles;
+# LSH over the signature finds candidates, and the share of equal MinHash
+# values (an estimate of shingle Jaccard similarity) decides.
+SHINGLE_WORDS = 5
+MIN_SHINGLES  = 40    # shorter texts (e.g. a bare case name) are too generic to compare
+MINHASH_PERM  = 128
+LSH_BANDS     = 16    # 16 bands x 8 rows: pairs above ~0.7 similarity become candidates
+MINHASH_VERSION = "ms64-1"  # bump when signatures change; NearDupIndex drops sketches of another version
+_MASK64 = (1 << 64) - 1
+_perm_rng = random.Random(1983)  # fixed seed: signatures must be comparable across runs
+_PERM_A = [_perm_rng.randrange(1 << 64) | 1 for _ in range(MINHASH_PERM)]
+_PERM_B = [_perm_rng.randrange(1 << 64) for _ in range(MINHASH_PERM)]
+
+def shingle_hashes(text: str, k: int = SHINGLE_WORDS) -> set:
+    toks = TOKEN_RE.findall((text or "").lower())
+    return {zlib.crc32(" ".join(toks[i:i + k]).encode()) for i in range(len(toks) - k + 1)}
+
+def minhash_signature(text: str) -> Optional[array]:
+    """MINHASH_PERM uint32 minima of ((a*x + b) mod 2^64) >> 32 over the shingle hashes, or None if too short."""
+    # Multiply-shift hashing (a odd): the permutations are independent enough for the similarity
+    # estimate to have its binomial spread. An earlier (a*x + b) mod 2^61-1 with 32-bit a was
+    # order-preserving whenever a*x < 2^61, so most "permutations" picked the same minimum.
+    shingles = shingle_hashes(text)
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    if np is None:
+        return array("I", [min(((a * x + b) & _MASK64) >> 32 for x in shingles)
+                           for a, b in zip(_PERM_A, _PERM_B)])
+    x = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    a = np.asarray(_PERM_A, dtype=np.uint64)[:, None]
+    b = np.asarray(_PERM_B, dtype=np.uint64)[:, None]
+    mins = ((a * x + b) >> np.uint64(32)).min(axis=1)  # uint64 arithmetic wraps, i.e. mod 2^64
+    return array("I", mins.astype(np.uint32).tobytes())
+
+def signature_similarity(a: array, b: array) -> float:
+    if np is not None:
+        return float(np.count_nonzero(np.frombuffer(a, np.uint32) == np.frombuffer(b, np.uint32))) / len(a)
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+def lsh_buckets(sig: array) -> List[int]:
+    rows = len(sig) // LSH_BANDS
+    raw = sig.tobytes()
+    return [int.from_bytes(hashlib.blake2b(bytes([band]) + raw[band * rows * 4:(band + 1) * rows * 4],
+                                           digest_size=8).digest(), "big", signed=True)
+            for band in range(LSH_BANDS)]
+
+_REPORTER_CITE = re.compile(r"^\d+\s+\S.*\s\d+")   # "123 F.4th 456", "5 U.S. 137 (1803)"
+_HASH_KEY = re.compile(r"^[0-9a-f]{64}$")            # stable_id()
+
+def key_rank(key: str) -> Tuple[int, str]:
+    """
+    Order in which copies of one opinion are preferred as canonical: reporter
+    citations, then other identifiers (GovInfo package IDs), then stable_id()
+    hashes; ties go to the smaller key.
+    """
+    if _REPORTER_CITE.match(key):
+        return 0, key
+    return (2 if _HASH_KEY.match(key) else 1), key
+
+class NearDupIndex:
+    """
+    LSH index of opinion signatures keyed by record_key(). Entries added during
+    a run are matched in memory; persist() files them in SQLite once their rows
+    are stored, so later runs also collapse against federal_case_library.
+
+    Providers run concurrently, so the copy seen first is arbitrary. Of a set of
+    near-duplicates the one with the best key_rank() is canonical, whatever the
+    arrival order: a better copy takes the indexed one's place, and the key it
+    replaces is kept in `superseded` (old -> new). Once the new row is stored,
+    persist() drops the old sketch and lists the old key in `replaced`, for the
+    caller to delete its row.
+
+    apersist() does the SQLite writes in a worker thread; the connection is
+    shared under a lock.
+    """
+
+    _CHUNK = 500
+
+    def __init__(self, path: Optional[str], threshold: float = SCRAPER_DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self.db = None
+        self._lock = threading.Lock()
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS sketches (key TEXT PRIMARY KEY, sig BLOB NOT NULL)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS bands (bucket INTEGER NOT NULL, key TEXT NOT NULL)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS bands_bucket ON bands (bucket)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (k TEXT PRIMARY KEY, v TEXT NOT NULL)")
+            row = self.db.execute("SELECT v FROM meta WHERE k = 'minhash'").fetchone()
+            if row is None or row[0] != MINHASH_VERSION:
+                if self.db.execute("SELECT 1 FROM sketches LIMIT 1").fetchone():
+                    LOG.warning("Near-dup index %s has %s signatures; clearing it (see --dedup-rebuild)",
+                                path, row[0] if row else "older")
+                with self.db:
+                    self.db.execute("DELETE FROM bands")
+                    self.db.execute("DELETE FROM sketches")
+                    self.db.execute("INSERT OR REPLACE INTO meta (k, v) VALUES ('minhash', ?)", (MINHASH_VERSION,))
+        self.buckets: Dict[int, List[str]] = defaultdict(list)
+        self.sigs: Dict[str, array] = {}
+        self.superseded: Dict[str, str] = {}
+        self.replaced: List[str] = []
+        self.duplicates = 0
+
+    def _stored(self, buckets: List[int]) -> Dict[str, array]:
+        if self.db is None:
+            return {}
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT DISTINCT s.key, s.sig FROM bands b JOIN sketches s ON s.key = b.key "
+                f"WHERE b.bucket IN ({','.join('?' * len(buckets))})", buckets).fetchall()
+        return {k: array("I", blob) for k, blob in rows}
+
+    def match(self, key: str, sig: Optional[array]) -> Optional[str]:
+        """
+        Key of the closest indexed opinion at or above the threshold if that one
+        stays canonical, else None and `key` is indexed (superseding the match,
+        if there was one).
+        """
+        if sig is None:
+            return None
+        buckets = lsh_buckets(sig)
+        cands = self._stored(buckets)
+        for bucket in buckets:
+            for other in self.buckets.get(bucket, ()):
+                cands[other] = self.sigs[other]
+        cands.pop(key, None)  # the same row seen again is the diff's business, not a duplicate
+        for old in [k for k in cands if k in self.superseded or k in self.replaced]:
+            del cands[old]  # replaced rows whose sketches are not deleted yet
+        best, best_sim = None, self.threshold
+        for other, other_sig in cands.items():
+            sim = signature_similarity(sig, other_sig)
+            if sim >= best_sim:
+                best, best_sim = other, sim
+        if best is not None:
+            self.duplicates += 1
+            if key_rank(best) <= key_rank(key):
+                return best
+            LOG.debug("%s supersedes its near-duplicate %s", key, best)
+            self._unindex(best)
+            for old, new in self.superseded.items():
+                if new == best:
+                    self.superseded[old] = key
+            self.superseded[best] = key
+        if key not in self.sigs:
+            self.sigs[key] = sig
+            for bucket in buckets:
+                self.buckets[bucket].append(key)
+        return None
+
+    def _unindex(self, key: str) -> None:
+        sig = self.sigs.pop(key, None)
+        if sig is not None:
+            for bucket in lsh_buckets(sig):
+                self.buckets[bucket].remove(key)
+
+    def persist(self, keys: List[str]) -> None:
+        """File the signatures of these stored rows; rows they supersede move to `replaced`."""
+        self._write(*self._settle(keys))
+
+    async def apersist(self, keys: List[str]) -> None:
+        items, gone = self._settle(keys)
+        if self.db is not None and (items or gone):
+            await asyncio.to_thread(self._write, items, gone)
+
+    def _settle(self, keys: List[str]) -> Tuple[List[Tuple[str, array]], List[str]]:
+        # In-memory bookkeeping stays on the caller's thread, next to match().
+        stored = set(keys)
+        gone = [old for old, new in self.superseded.items() if new in stored]
+        for old in gone:
+            del self.superseded[old]
+        self.replaced.extend(gone)
+        return [(k, self.sigs[k]) for k in dict.fromkeys(keys) if k in self.sigs], gone
+
+    def _write(self, items: List[Tuple[str, array]], gone: List[str]) -> None:
+        if self.db is None or not (items or gone):
+            return
+        with self._lock, self.db:
+            for i in range(0, len(gone), self._CHUNK):
+                chunk = gone[i:i + self._CHUNK]
+                self.db.execute(f"DELETE FROM bands WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+                self.db.execute(f"DELETE FROM sketches WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            for i in range(0, len(items), self._CHUNK):
+                chunk = [k for k, _ in items[i:i + self._CHUNK]]
+                self.db.execute(f"DELETE FROM bands WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            self.db.executemany("INSERT OR REPLACE INTO sketches (key, sig) VALUES (?, ?)",
+                                [(k, sig.tobytes()) for k, sig in items])
+            self.db.executemany("INSERT INTO bands (bucket, key) VALUES (?, ?)",
+                                [(b, k) for k, sig in items for b in lsh_buckets(sig)])
+
+    def clear(self) -> None:
+        self.buckets.clear()
+        self.sigs.clear()
+        self.superseded.clear()
+        self.replaced.clear()
+        if self.db is not None:
+            with self._lock, self.db:
+                self.db.execute("DELETE FROM bands")
+                self.db.execute("DELETE FROM sketches")
+
+    def close(self) -> None:
+        if self.db is not None:
+            self.db.close()
+
+# -------------------------
+# HTTP response cache
+# -------------------------
+class ResponseCache:
+    """
+    On-disk cache of successful GET responses, keyed by the full request URL
+    (query params included). Each entry is one file: a JSON header line with
+    the status, headers and validators, followed by the raw body. Recency is
+    tracked via file mtime, and the least recently used entries are evicted
+    once the directory grows past `max_bytes`.
+
+    An entry is written to a temp file (open_entry) and only renamed into
+    place by commit(), so a body can be cached while it streams. Disk work is
+    meant for worker threads; the index is guarded by a lock.
+    """
+
+    # Headers that describe the wire encoding, not the (already decoded) body we store.
+    _DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = self.revalidated = self.misses = 0
+        self._lock = threading.RLock()
+        entries = []
+        for f in self.root.glob("*.entry"):
+            try:
+                st = f.stat()
+                entries.append((st.st_mtime, f.stem, st.st_size))
+            except OSError:
+                continue
+        self._lru: "OrderedDict[str, int]" = OrderedDict((k, size) for _, k, size in sorted(entries))
+        self._size = sum(self._lru.values())
+
+    @staticmethod
+    def key(method: str, url: str) -> str:
+        return hashlib.sha256(f"{method.upper()} {url}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.entry"
+
+    def load(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        if key not in self._lru:
+            return None
+        try:
+            with self._path(key).open("rb") as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            self.drop(key)
+            return None
+        with self._lock:
+            if key in self._lru:
+                self._lru.move_to_end(key)
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return meta, body
+
+    def open_entry(self, key: str, status: int, headers: httpx.Headers) -> Optional[IO[bytes]]:
+        """Temp file holding the entry's header line; write the body to it, then commit() or discard()."""
+        meta = {
+            "status": status,
+            "headers": [(k, v) for k, v in headers.multi_items() if k.lower() not in self._DROP_HEADERS],
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "stored_at": time.time(),
+        }
+        try:
+            f = tempfile.NamedTemporaryFile("wb", dir=self.root, prefix=key[:16], suffix=".tmp", delete=False)
+        except OSError as e:
+            LOG.debug("cache write failed: %s", e)
+            return None
+        try:
+            f.write(json.dumps(meta).encode() + b"\n")
+        except OSError as e:
+            LOG.debug("cache write failed: %s", e)
+            self.discard(f)
+            return None
+        return f
+
+    def commit(self, key: str, f: IO[bytes]) -> None:
+        path = self._path(key)
+        try:
+            f.close()
+            os.replace(f.name, path)
+            size = path.stat().st_size
+        except OSError as e:
+            LOG.debug("cache write failed: %s", e)
+            self.discard(f)
+            return
+        with self._lock:
+            self._size += size - self._lru.pop(key, 0)
+            self._lru[key] = size
+            self._evict()
+
+    @staticmethod
+    def discard(f: IO[bytes]) -> None:
+        try:
+            f.close()
+            os.unlink(f.name)
+        except OSError:
+            pass
+
+    def store(self, key: str, status: int, headers: httpx.Headers, body: bytes) -> None:
+        f = self.open_entry(key, status, headers)
+        if f is None:
+            return
+        try:
+            f.write(body)
+        except OSError as e:
+            LOG.debug("cache write failed: %s", e)
+            self.discard(f)
+            return
+        self.commit(key, f)
+
+    def drop(self, key: str) -> None:
+        with self._lock:
+            self._size -= self._lru.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        with self._lock:
+            while self._size > self.max_bytes and len(self._lru) > 1:
+                oldest = next(iter(self._lru))
+                self.drop(oldest)
+
+def _max_age(headers: Any) -> Optional[int]:
+    cc = (headers.get("Cache-Control") or headers.get("cache-control") or "").lower()
+    if "no-store" in cc or "no-cache" in cc:
+        return None
+    m = re.search(r"max-age=(\d+)", cc)
+    return int(m.group(1)) if m else None
+
+class _CacheTee(httpx.AsyncByteStream):
+    """
+    A cacheable response's decoded body, handed to the reader as it arrives
+    and copied into a cache entry on the way. The entry is committed only if
+    the body was read to the end without outgrowing the cache.
+    """
+
+    def __init__(self, cache: ResponseCache, key: str, source: httpx.Response):
+        self.cache = cache
+        self.key = key
+        self.source = source
+        self._entry: Optional[IO[bytes]] = None
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        src = self.source
+        self._entry = await asyncio.to_thread(self.cache.open_entry, self.key, src.status_code, src.headers)
+        size = 0
+        try:
+            async for chunk in src.aiter_bytes():
+                if self._entry is not None:
+                    size += len(chunk)
+                    try:
+                        if size > self.cache.max_bytes:
+                            raise OSError("larger than the whole cache")
+                        self._entry.write(chunk)
+                    except OSError as e:
+                        LOG.debug("not caching %s: %s", src.request.url, e)
+                        self._discard()
+                yield chunk
+            if self._entry is not None:
+                entry, self._entry = self._entry, None
+                await asyncio.to_thread(self.cache.commit, self.key, entry)
+        finally:
+            self._discard()
+
+    def _discard(self) -> None:
+        if self._entry is not None:
+            self.cache.discard(self._entry)
+            self._entry = None
+
+    async def aclose(self) -> None:
+        self._discard()  # closed before the end of the body: nothing to cache
+        await self.source.aclose()
+
+class CachingTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps a transport with ResponseCache. GETs are revalidated with
+    If-None-Match / If-Modified-Since when the stored entry has validators;
+    a 304 is answered from disk as the original 200. Responses still fresh
+    per Cache-Control max-age are served without touching the network.
+    New bodies stream through to the caller and are cached as they are read
+    (GovInfo package text is extracted while it downloads); cache disk I/O
+    runs in worker threads.
+    """
+
+    def __init__(self, cache: ResponseCache, inner: httpx.AsyncBaseTransport):
+        self.cache = cache
+        self.inner = inner
+
+    def _from_cache(self, request: httpx.Request, meta: Dict[str, Any], body: bytes) -> httpx.Response:
+        return httpx.Response(meta["status"], headers=meta["headers"], content=body, request=request)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != "GET":
+            return await self.inner.handle_async_request(request)
+
+        key = ResponseCache.key(request.method, str(request.url))
+        cached = await asyncio.to_thread(self.cache.load, key)
+        if cached:
+            meta, body = cached
+            age = _max_age(httpx.Headers(meta["headers"]))
+            if age is not None and time.time() - meta.get("stored_at", 0) < age:
+                self.cache.hits += 1
+                return self._from_cache(request, meta, body)
+            if meta.get("etag"):
+                request.headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                request.headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = await self.inner.handle_async_request(request)
+
+        if resp.status_code == 304 and cached:
+            await resp.aclose()
+            self.cache.revalidated += 1
+            meta, body = cached
+            await asyncio.to_thread(self.cache.store, key, meta["status"], httpx.Headers(meta["headers"]), body)
+            return self._from_cache(request, meta, body)
+
+        self.cache.misses += 1
+        cacheable = (
+            resp.status_code == 200
+            and (resp.headers.get("ETag") or resp.headers.get("Last-Modified") or _max_age(resp.headers))
+            and "no-store" not in (resp.headers.get("Cache-Control") or "").lower()
+        )
+        if not cacheable:
+            return resp
+
+        # The tee decodes, so the response handed back drops the wire encoding headers.
+        decoded = httpx.Response(resp.status_code, headers=resp.headers, stream=resp.stream, request=request)
+        headers = [(k, v) for k, v in resp.headers.multi_items() if k.lower() not in ResponseCache._DROP_HEADERS]
+        return httpx.Response(resp.status_code, headers=headers, stream=_CacheTee(self.cache, key, decoded),
+                              request=request, extensions=resp.extensions)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+# -------------------------
+# Record / replay fixtures
+# -------------------------
+class FixtureStore:
+    """
+    Provider HTTP exchanges captured for offline runs. One file per exchange,
+    keyed by method + URL + request body with secrets (api_key) stripped, in
+    the same layout as ResponseCache entries. manifest.json pins the recording
+    time so a replay rebuilds the same date window.
+    """
+
+    SECRET_PARAMS = ("api_key",)
+
+    def __init__(self, root: str, mode: str):
+        self.root = Path(root)
+        self.mode = mode  # "record" | "replay"
+        if mode == "record":
+            self.root.mkdir(parents=True, exist_ok=True)
+        elif not self.root.is_dir():
+            raise SystemExit(f"No fixtures found at {root}")
+        self.recorded = self.replayed = self.missing = 0
+
+    @classmethod
+    def redact(cls, url: httpx.URL) -> str:
+        for p in cls.SECRET_PARAMS:
+            url = url.copy_remove_param(p)
+        return str(url)
+
+    def key(self, request: httpx.Request, body: bytes) -> str:
+        h = hashlib.sha256(f"{request.method} {self.redact(request.url)}\n".encode())
+        h.update(body)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.entry"
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        try:
+            return json.loads((self.root / "manifest.json").read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def write_manifest(self, **info: Any) -> None:
+        (self.root / "manifest.json").write_text(json.dumps(info, indent=2))
+
+    def load(self, key: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        try:
+            with self._path(key).open("rb") as f:
+                return json.loads(f.readline()), f.read()
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key: str, request: httpx.Request, status: int, headers: httpx.Headers, body: bytes) -> None:
+        meta = {
+            "method": request.method,
+            "url": self.redact(request.url),
+            "status": status,
+            "headers": [(k, v) for k, v in headers.multi_items() if k.lower() not in ResponseCache._DROP_HEADERS],
+        }
+        with self._path(key).open("wb") as f:
+            f.write(json.dumps(meta).encode() + b"\n")
+            f.write(body)
+        self.recorded += 1
+
+class RecordReplayTransport(httpx.AsyncBaseTransport):
+    """Records exchanges passing through to `inner`, or (replay, inner=None) answers from fixtures only."""
+
+    def __init__(self, fixtures: FixtureStore, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.fixtures = fixtures
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = self.fixtures.key(request, await request.aread())
+        if self.inner is None:
+            hit = self.fixtures.load(key)
+            if hit is None:
+                self.fixtures.missing += 1
+                raise httpx.ConnectError(f"no fixture for {request.method} {self.fixtures.redact(request.url)}",
+                                         request=request)
+            self.fixtures.replayed += 1
+            meta, body = hit
+            return httpx.Response(meta["status"], headers=meta["headers"], content=body, request=request)
+
+        resp = await self.inner.handle_async_request(request)
+        decoded = httpx.Response(resp.status_code, headers=resp.headers, stream=resp.stream, request=request)
+        body = await decoded.aread()
+        self.fixtures.store(key, request, resp.status_code, resp.headers, body)
+        headers = [(k, v) for k, v in resp.headers.multi_items() if k.lower() not in ResponseCache._DROP_HEADERS]
+        return httpx.Response(resp.status_code, headers=headers, content=body, request=request,
+                              extensions=resp.extensions)
+
+    async def aclose(self) -> None:
+        if self.inner is not None:
+            await self.inner.aclose()
+
+# -------------------------
+# Stage timing
+# -------------------------
+class StageTimes:
+    """Busy seconds per pipeline stage. Concurrent work overlaps, so the sum can exceed wall time."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - t0
+            self.calls[stage] += 1
+
+    def describe(self) -> str:
+        return " ".join(f"{s}={self.seconds[s]:.2f}s/{self.calls[s]}" for s in self.seconds) or "none"
+
+    def reset(self) -> None:
+        self.seconds.clear()
+        self.calls.clear()
+
+STAGE_TIMES = StageTimes()
+
+class TimedTransport(httpx.AsyncBaseTransport):
+    """Charges each request (rate-limit waits and cache included) to the "fetch" stage."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with STAGE_TIMES.timed("fetch"):
+            return await self.inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+# -------------------------
+# Adaptive per-host rate limiting
+# -------------------------
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    # Retry-After is either delta-seconds or an HTTP date.
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _header_float(headers: Any, name: str) -> Optional[float]:
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+class HostRateLimiter:
+    """
+    Token bucket for one API host, shared by every client that talks to it.
+
+    The rate adapts AIMD-style: each successful response adds `step` req/s up
+    to `max_rate`; a throttling status halves it and pauses the bucket for
+    Retry-After (or an exponential backoff). X-RateLimit-Remaining/-Reset cap
+    the rate at what the server says is left in the window. All waits carry
+    jitter so concurrent clients do not retry in lockstep.
+    """
+
+    def __init__(self, host: str, rate: float, throttle: Tuple[int, ...] = (429, 503),
+                 max_rate: float = SCRAPER_MAX_RATE, min_rate: float = 0.05, step: float = 0.1, burst: float = 2.0):
+        self.host = host
+        self.rate = max(min_rate, min(rate, max_rate))
+        self.throttle = throttle
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.step = step
+        self.burst = burst
+        self.next_free = 0.0
+        self.paused_until = 0.0
+        self.failures = 0
+
+    async def acquire(self) -> None:
+        # Virtual-clock scheduling: each caller reserves the next free slot, so no lock is needed.
+        while True:
+            now = time.monotonic()
+            if self.paused_until > now:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            slot = max(self.next_free, now - self.burst / self.rate)
+            self.next_free = slot + 1.0 / self.rate
+            if slot <= now:
+                return
+            await asyncio.sleep((slot - now) * random.uniform(1.0, 1.1))
+            if self.paused_until <= time.monotonic():
+                return
+
+    def _pause(self, seconds: float) -> None:
+        until = time.monotonic() + seconds * random.uniform(1.0, 1.25)
+        self.paused_until = max(self.paused_until, until)
+        self.next_free = max(self.next_free, self.paused_until)
+
+    def _backoff(self) -> float:
+        self.failures += 1
+        return min(60.0, 2.0 ** self.failures)
+
+    def observe(self, status: int, headers: Any) -> None:
+        ra = _retry_after(headers.get("Retry-After"))
+        if status in self.throttle:
+            self.rate = max(self.min_rate, self.rate / 2)
+            wait = ra if ra is not None else self._backoff()
+            LOG.warning("[rate] %s throttled (HTTP %s); %.2f req/s, pausing %.1fs", self.host, status, self.rate, wait)
+            self._pause(wait)
+            return
+        if status >= 500:
+            self._pause(ra if ra is not None else self._backoff())
+            return
+        self.failures = 0
+
+        remaining = _header_float(headers, "X-RateLimit-Remaining")
+        reset = _header_float(headers, "X-RateLimit-Reset")
+        if reset is not None and reset > 1e9:  # epoch seconds rather than a delta
+            reset = reset - time.time()
+        if remaining is not None:
+            if remaining <= 1:
+                self._pause(reset if reset and reset > 0 else 2.0)
+            if reset and reset > 0:
+                self.rate = max(self.min_rate, min(self.max_rate, self.rate + self.step, remaining / reset))
+                return
+        self.rate = min(self.max_rate, self.rate + self.step)
+
+    def failure(self) -> None:
+        # Network error: keep the rate, but back off before the next request.
+        self._pause(self._backoff())
+
+class RateLimiterRegistry:
+    def __init__(self):
+        self.hosts: Dict[str, HostRateLimiter] = {}
+
+    def get(self, host: str, rate: float, throttle: Tuple[int, ...]) -> HostRateLimiter:
+        # The first provider to reach a host picks its starting rate.
+        if host not in self.hosts:
+            self.hosts[host] = HostRateLimiter(host, rate, throttle)
+        return self.hosts[host]
+
+    def describe(self) -> str:
+        return " ".join(f"{h}={lim.rate:.2f}/s" for h, lim in self.hosts.items()) or "none"
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """Acquires a token from the request host's limiter and feeds it the outcome."""
+
+    def __init__(self, limiters: RateLimiterRegistry, inner: httpx.AsyncBaseTransport,
+                 rate: float, throttle: Tuple[int, ...]):
+        self.limiters = limiters
+        self.inner = inner
+        self.rate = rate
+        self.throttle = throttle
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        lim = self.limiters.get(request.url.host, self.rate, self.throttle)
+        await lim.acquire()
+        try:
+            resp = await self.inner.handle_async_request(request)
+        except httpx.TransportError:
+            lim.failure()
+            raise
+        lim.observe(resp.status_code, resp.headers)
+        return resp
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+RATE_LIMITS = RateLimiterRegistry()
+
+# -------------------------
+# Checkpoints (incremental / resumable runs)
+# -------------------------
+class Checkpoint:
+    """
+    Progress of one provider's walk over one topic set.
+
+    A walk pages from newest to oldest. Providers report every date they
+    accept with `seen()`, each consumed page with `page_done(next_cursor)`,
+    and call `complete()` once they reach the `since` boundary. Nothing is
+    persisted until the run's records are stored and CheckpointStore.commit()
+    is called.
+    """
+
+    def __init__(self, key: str = "", mode: str = "full", entry: Optional[Dict[str, Any]] = None,
+                 resume: bool = False):
+        entry = entry or {}
+        walk = (entry.get("walks") or {}).get(mode) or {}
+        self.key = key
+        self.mode = mode
+        self.watermark = parse_date(entry["watermark"]) if entry.get("watermark") else None
+        self.start_cursor: Optional[str] = walk.get("cursor") if resume else None
+        self.cursor = self.start_cursor
+        self.newest = parse_date(walk["newest"]) if resume and walk.get("newest") else None
+        self.done = False
+        self.failed = False   # fetch did not finish cleanly: keep snapshots, not the end state
+        self.frozen = False   # some records were lost downstream: stop committing altogether
+
+    def since(self, since: datetime) -> datetime:
+        # Incremental walks stop at what earlier runs already ingested.
+        if self.mode == "incremental" and self.watermark and self.watermark > since:
+            return self.watermark
+        return since
+
+    def seen(self, dt: datetime) -> None:
+        if self.newest is None or dt > self.newest:
+            self.newest = dt
+
+    def page_done(self, next_cursor: Optional[str]) -> None:
+        self.cursor = next_cursor
+        if not next_cursor:
+            self.done = True
+
+    def complete(self) -> None:
+        self.done = True
+
+    def snapshot(self) -> Tuple[Optional[str], Optional[datetime]]:
+        """Position of the walk as of now: every record yielded after this is past `cursor`."""
+        return self.cursor, self.newest
+
+class CheckpointStore:
+    """
+    JSON state file of per provider/topic-set watermarks and walk cursors:
+
+      {"<provider>|<topics hash>": {"watermark": iso, "topics": [...],
+                                    "walks": {"full": {"cursor": ..., "newest": iso},
+                                              "incremental": {...}}}}
+
+    `watermark` is the newest date filed/issued of a walk that reached its
+    `since` boundary. Unfinished walks keep their cursor so --resume (full
+    walks) or the next --incremental run can continue from there.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.state: Dict[str, Any] = {}
+        if self.path.exists():
+            try:
+                self.state = json.loads(self.path.read_text())
+            except (OSError, ValueError) as e:
+                LOG.warning("Ignoring unreadable state file %s: %s", self.path, e)
+
+    @staticmethod
+    def key(provider: str, topics: List[str]) -> str:
+        norm = ",".join(sorted({t.strip().lower() for t in topics if t.strip()}))
+        return f"{provider}|{hashlib.sha1(norm.encode()).hexdigest()[:12]}"
+
+    def get(self, provider: str, topics: List[str], mode: str = "full", resume: bool = False) -> Checkpoint:
+        key = self.key(provider, topics)
+        return Checkpoint(key, mode, self.state.get(key), resume=resume or mode == "incremental")
+
+    def commit(self, cp: Checkpoint, topics: List[str],
+               snapshot: Optional[Tuple[Optional[str], Optional[datetime]]] = None) -> None:
+        """Record `cp`'s final state, or an intermediate `snapshot` of an unfinished walk."""
+        if not cp.key or cp.frozen or (snapshot is None and cp.failed):
+            return
+        entry = self.state.setdefault(cp.key, {"topics": sorted(topics)})
+        walks = entry.setdefault("walks", {})
+        if snapshot is None and cp.done:
+            walks.pop(cp.mode, None)
+            if cp.newest and (cp.watermark is None or cp.newest > cp.watermark):
+                entry["watermark"] = cp.newest.isoformat()
+        else:
+            cursor, newest = snapshot or cp.snapshot()
+            walks[cp.mode] = {"cursor": cursor, "newest": newest.isoformat() if newest else None}
+        entry["updated_at"] = datetime.now(timezone.utc).isoformat()
+
+    def save(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.state, indent=2, sort_keys=True))
+        os.replace(tmp, self.path)
 
 # -------------------------
 # Provider interface
@@ -261,20 +1497,220 @@ class Record:
     source_link: str
     provider: str
 
+class ScrapeBudget:
+    """
+    Global --max budget shared by providers that fetch side by side.
+
+    Every provider starts with an equal reservation. When a provider finishes
+    (source exhausted, nothing matched, or it failed) its unused reservation
+    goes back to a shared pool that providers still producing can draw from.
+    A provider that used up its own reservation waits while another *running*
+    provider still holds unclaimed quota, so a slow provider's leftovers are
+    not stranded. Providers that have not started yet keep their reservation.
+    """
+
+    def __init__(self, total: int, names: List[str]):
+        self.total = max(0, total)
+        base, extra = divmod(self.total, max(1, len(names)))
+        self.quota: Dict[str, int] = {n: base + (1 if i < extra else 0) for i, n in enumerate(names)}
+        self.used: Dict[str, int] = {n: 0 for n in names}
+        self.state: Dict[str, str] = {n: "pending" for n in names}
+        self.pool = 0
+        self._cond = asyncio.Condition()
+
+    def start(self, name: str) -> None:
+        self.state[name] = "running"
+
+    async def finish(self, name: str, state: str = "done") -> None:
+        async with self._cond:
+            self.pool += self.quota[name] - self.used[name]
+            self.quota[name] = self.used[name]
+            self.state[name] = state
+            self._cond.notify_all()
+
+    def _others_holding(self, name: str) -> bool:
+        return any(
+            o != name and self.state[o] == "running" and self.quota[o] > self.used[o]
+            for o in self.quota
+        )
+
+    def headroom(self, name: str) -> int:
+        """Most records `name` could still be granted (own + pool + running providers' unclaimed quota)."""
+        others = sum(self.quota[o] - self.used[o] for o in self.quota if o != name and self.state[o] == "running")
+        return self.quota[name] - self.used[name] + self.pool + others
+
+    async def take(self, name: str) -> bool:
+        """Claim one record slot for `name`. Returns False once no slot can ever be granted."""
+        async with self._cond:
+            while True:
+                if self.used[name] < self.quota[name]:
+                    self.used[name] += 1
+                    return True
+                if self.pool > 0:
+                    self.pool -= 1
+                    self.quota[name] += 1
+                    self.used[name] += 1
+                    return True
+                if not self._others_holding(name):
+                    return False
+                await self._cond.wait()
+
+    def progress(self) -> str:
+        parts = [f"{n}={self.used[n]} ({self.state[n]})" for n in self.quota]
+        return f"{' '.join(parts)} total={sum(self.used.values())}/{self.total}"
+
+# -------------------------
+# Parsing offload (process pool)
+# -------------------------
+def _parse_chunk(fn: Callable[..., Any], items: List[tuple]) -> List[Tuple[Any, Optional[str]]]:
+    # Per-item errors come back as strings so one bad opinion never sinks its chunk.
+    out: List[Tuple[Any, Optional[str]]] = []
+    for args in items:
+        try:
+            out.append((fn(*args), None))
+        except Exception as e:
+            out.append((None, f"{type(e).__name__}: {e}"))
+    return out
+
+class RecordParser:
+    """
+    Turns raw API items into Records. With workers=0 parsing runs inline on
+    the event loop; otherwise each page is split into one chunk per worker
+    and parsed in a ProcessPoolExecutor, so a multi-MB opinion no longer
+    stalls in-flight requests. `fn` must be a module-level or static function.
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = max(0, workers)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers else None
+
+    async def map(self, fn: Callable[..., Any], items: List[tuple]) -> List[Tuple[Any, Optional[str]]]:
+        """Return (result, error) per item, in input order."""
+        if not items:
+            return []
+        with STAGE_TIMES.timed("parse"):
+            if self._pool is None:
+                return _parse_chunk(fn, items)
+            loop = asyncio.get_running_loop()
+            n = max(1, math.ceil(len(items) / self.workers))
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(self._pool, _parse_chunk, fn, items[i:i + n])
+                for i in range(0, len(items), n)
+            ))
+        return [res for part in parts for res in part]
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
 class Provider:
     name: str = "base"
-    async def fetch(self, since: datetime, topics: List[str], max_results: int, page_size: int) -> List[Record]:
+    cache: Optional[ResponseCache] = None
+    parser: RecordParser = RecordParser()
+    rate_limits: Optional[RateLimiterRegistry] = RATE_LIMITS
+    fixtures: Optional[FixtureStore] = None
+    rate: float = SCRAPER_RATE                     # starting req/s for this provider's hosts
+    throttle_statuses: Tuple[int, ...] = (429, 503)
+
+    def stream(self, since: datetime, topics: List[str], page_size: int, budget: ScrapeBudget,
+               checkpoint: Optional[Checkpoint] = None) -> AsyncIterator[Record]:
+        """Yield records newest-first as pages arrive, claiming a budget slot for each."""
         raise NotImplementedError
 
+    async def fetch(self, since: datetime, topics: List[str], max_results: int, page_size: int,
+                    budget: Optional[ScrapeBudget] = None, checkpoint: Optional[Checkpoint] = None) -> List[Record]:
+        budget = self._budget(budget, max_results)
+        return [rec async for rec in self.stream(since, topics, page_size, budget, checkpoint)]
+
+    def _budget(self, budget: Optional[ScrapeBudget], max_results: int) -> ScrapeBudget:
+        # Standalone calls get a private budget so max_results keeps its old meaning.
+        if budget is None:
+            budget = ScrapeBudget(max_results, [self.name])
+            budget.start(self.name)
+        return budget
+
+    @property
+    def replaying(self) -> bool:
+        return self.fixtures is not None and self.fixtures.mode == "replay"
+
+    def _client(self, limits: Optional[httpx.Limits] = None, **kwargs: Any) -> httpx.AsyncClient:
+        # [recorder] -> cache -> per-host rate limiter -> network; cache hits never spend
+        # rate tokens. A replay answers from fixtures alone.
+        transport: httpx.AsyncBaseTransport
+        if self.replaying:
+            transport = RecordReplayTransport(self.fixtures)
+        else:
+            pool = {"limits": limits} if limits else {}
+            transport = httpx.AsyncHTTPTransport(**pool)
+            if self.rate_limits is not None:
+                transport = RateLimitedTransport(self.rate_limits, transport, self.rate, self.throttle_statuses)
+            if self.cache is not None:
+                transport = CachingTransport(self.cache, transport)
+            if self.fixtures is not None:
+                transport = RecordReplayTransport(self.fixtures, transport)
+        return httpx.AsyncClient(transport=TimedTransport(transport), **kwargs)
+
 class CourtListenerProvider(Provider):
     name = "courtlistener"
+    rate = 1.25
+    throttle_statuses = (403, 429, 503)  # CL answers throttled clients with 403
+
+    @staticmethod
+    def parse_item(obj: Dict[str, Any]) -> Record:
+        case_name = obj.get("case_name") or obj.get("caseName") or "Unknown case"
+
+        # Use html/html_with_citations (no full_text now). It's lighter and avoids 403.
+        plain = html_to_text(obj.get("html_with_citations") or obj.get("html") or obj.get("plain_text") or "")
+
+        # Do not re-filter by topics; CL already applied q=
+        link = obj.get("absolute_url") or obj.get("absoluteUrl") or ""
+        source_link = f"https://www.courtlistener.com{link}" if link.startswith("/") else (link or "https://www.courtlistener.com/")
+
+        citation = None
+        if isinstance(obj.get("citations"), list):
+            for c in obj["citations"]:
+                for key in ("cite", "citation", "cite_string"):
+                    if c.get(key):
+                        citation = str(c[key]); break
+                if citation: break
+        for key in ("citation", "cite", "citation_string"):
+            if obj.get(key) and not citation:
+                citation = str(obj[key])
+        citation = normalize_citation(citation) or stable_id(case_name, source_link)
+
+        jurisdiction = "federal"
+        court_level = ""
+        court_val = obj.get("court")
+        if isinstance(court_val, dict):
+            jurisdiction = court_val.get("jurisdiction") or jurisdiction
+            court_level = court_val.get("name_abbreviation") or court_val.get("name") or court_level
+        elif isinstance(court_val, str):
+            court_level = court_val.rstrip("/").split("/")[-1] or court_level
+
+        cls = classify_opinion(plain, case_name)
+        return Record(
+            case_name=case_name,
+            jurisdiction=jurisdiction,
+            court_level=court_level,
+            summary=short(plain or case_name, 5000),
+            holding=short(cls.holding or case_name, 1800),
+            citation=citation,
+            outcome=cls.outcome,
+            tags=cls.tags,
+            source_link=source_link,
+            provider=CourtListenerProvider.name,
+        )
 
-    async def fetch(self, since: datetime, topics: List[str], max_results: int, page_size: int) -> List[Record]:
+    async def stream(self, since: datetime, topics: List[str], page_size: int, budget: ScrapeBudget,
+                     checkpoint: Optional[Checkpoint] = None) -> AsyncIterator[Record]:
         if not COURTLISTENER_TOKEN:
             LOG.error("[CL] COURTLISTENER_TOKEN missing; skipping provider.")
-            return []
+            return
 
-        collected: List[Record] = []
+        cp = checkpoint or Checkpoint()
+        since = cp.since(since)
+        collected = 0
 
         # Keep page size small; heavy queries trigger throttling faster.
         page_size = max(10, min(page_size, 25))
@@ -296,118 +1732,76 @@ class CourtListenerProvider(Provider):
 
         limits = httpx.Limits(max_keepalive_connections=2, max_connections=4)
 
-        async with httpx.AsyncClient(timeout=40, headers=headers, follow_redirects=True, limits=limits) as client:
-            next_url: Optional[str] = url
-            # Soft cap pages based on requested max
-            max_pages = max(1, math.ceil(max_results / page_size))
+        async with self._client(timeout=40, headers=headers, follow_redirects=True, limits=limits) as client:
+            next_url: Optional[str] = cp.start_cursor or url
+            first_params = None if cp.start_cursor else params
             pages = 0
+            out_of_budget = False
 
-            while next_url and len(collected) < max_results and pages < max_pages:
-                # gentle pacing between pages
-                await asyncio.sleep(0.8)
+            # Soft cap pages based on what the budget could still grant us
+            while (next_url and not out_of_budget
+                   and pages < max(1, math.ceil((collected + budget.headroom(self.name)) / page_size))):
+                # Pacing and backoff come from the host rate limiter; retries just go again.
                 for attempt in range(6):
                     try:
-                        r = await client.get(next_url, params=params if attempt == 0 else None)
+                        r = await client.get(next_url, params=first_params if attempt == 0 else None)
                         if r.status_code in (403, 429):
-                            ra = r.headers.get("Retry-After")
-                            wait = int(ra) if (ra and ra.isdigit()) else max(2, 2 ** attempt)
-                            LOG.warning("[CL] rate-limited (%s). Backing off %ss…", r.status_code, wait)
-                            await asyncio.sleep(wait)
                             continue
                         r.raise_for_status()
-
-                        # If close to limit, slow down a bit
-                        rem = r.headers.get("X-RateLimit-Remaining")
-                        try:
-                            if rem is not None and int(rem) <= 1:
-                                await asyncio.sleep(2.0)
-                        except Exception:
-                            pass
-
                         data = r.json()
                         break
                     except httpx.HTTPStatusError as e:
                         if e.response.status_code in (502, 503, 504):
-                            wait = max(2, 2 ** attempt)
-                            LOG.warning("[CL] HTTP %s; retry in %ss…", e.response.status_code, wait)
-                            await asyncio.sleep(wait)
+                            LOG.warning("[CL] HTTP %s; retrying…", e.response.status_code)
                             continue
                         raise
                     except httpx.RequestError as e:
-                        wait = max(2, 2 ** attempt)
-                        LOG.warning("[CL] network error, retry in %ss… (%s)", wait, e)
-                        await asyncio.sleep(wait)
+                        LOG.warning("[CL] network error, retrying… (%s)", e)
                 else:
-                    raise RuntimeError("[CL] exceeded retries")
+                    # Keep what we have; the checkpoint still points at this page.
+                    LOG.error("[CL] exceeded retries; stopping at current page")
+                    break
 
                 pages += 1
+                first_params = None
                 results = data.get("results", [])
+                dated = []
                 for obj in results:
                     try:
                         date_str = obj.get("date_filed") or obj.get("dateFiled") or obj.get("date")
                         if not date_str:
                             continue
-                        dt_filed = datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+                        dt_filed = parse_date(date_str)
                         if dt_filed < since:
                             continue
-
-                        case_name = obj.get("case_name") or obj.get("caseName") or "Unknown case"
-
-                        # Use html/html_with_citations (no full_text now). It's lighter and avoids 403.
-                        plain = obj.get("html_with_citations") or obj.get("html") or ""
-
-                        # Do not re-filter by topics; CL already applied q=
-                        link = obj.get("absolute_url") or obj.get("absoluteUrl") or ""
-                        source_link = f"https://www.courtlistener.com{link}" if link.startswith("/") else (link or "https://www.courtlistener.com/")
-
-                        citation = None
-                        if isinstance(obj.get("citations"), list):
-                            for c in obj["citations"]:
-                                for key in ("cite", "citation", "cite_string"):
-                                    if c.get(key):
-                                        citation = str(c[key]); break
-                                if citation: break
-                        for key in ("citation", "cite", "citation_string"):
-                            if obj.get(key) and not citation:
-                                citation = str(obj[key])
-                        citation = normalize_citation(citation) or stable_id(case_name, source_link)
-
-                        jurisdiction = "federal"
-                        court_level = ""
-                        court_val = obj.get("court")
-                        if isinstance(court_val, dict):
-                            jurisdiction = court_val.get("jurisdiction") or jurisdiction
-                            court_level = court_val.get("name_abbreviation") or court_val.get("name") or court_level
-                        elif isinstance(court_val, str):
-                            court_level = court_val.rstrip("/").split("/")[-1] or court_level
-
-                        outcome = detect_outcome_plaintext(plain)
-                        tags = detect_tags(f"{case_name}\n{plain}")
-                        summary = short(plain or case_name, 5000)
-                        holding = short(holding_from_text(plain) or case_name, 1800)
-
-                        rec = Record(
-                            case_name=case_name,
-                            jurisdiction=jurisdiction,
-                            court_level=court_level,
-                            summary=summary,
-                            holding=holding,
-                            citation=citation,
-                            outcome=outcome,
-                            tags=tags,
-                            source_link=source_link,
-                            provider=self.name,
-                        )
-                        collected.append(rec)
-                        if len(collected) >= max_results:
-                            break
+                        dated.append((dt_filed, obj))
                     except Exception as e:
                         LOG.debug("[CL] parse skip: %s | obj.keys=%s", e, list(obj.keys()))
+                in_range = len(dated)
 
+                parsed = await self.parser.map(self.parse_item, [(obj,) for _, obj in dated])
+                for (dt_filed, obj), (rec, err) in zip(dated, parsed):
+                    if rec is None:
+                        LOG.debug("[CL] parse skip: %s | obj.keys=%s", err, list(obj.keys()))
+                        continue
+                    if not await budget.take(self.name):
+                        out_of_budget = True
+                        break
+                    cp.seen(dt_filed)
+                    collected += 1
+                    yield rec
+
+                LOG.info("[CL] page %d: %d collected so far", pages, collected)
+                if results and not in_range:
+                    # Results are newest-first: a page entirely before `since` ends the walk.
+                    cp.complete()
+                    break
+                if out_of_budget:
+                    break
                 next_url = data.get("next")
+                cp.page_done(next_url)
 
-        LOG.info("[CL] collected %d", len(collected))
-        return collected
+        LOG.info("[CL] collected %d", collected)
 
 # -------------------------
 # CAP provider (optional)
@@ -415,9 +1809,70 @@ class CourtListenerProvider(Provider):
 class CAPProvider(Provider):
     name = "cap"
 
-    async def fetch(self, since: datetime, topics: List[str], max_results: int, page_size: int) -> List[Record]:
+    @staticmethod
+    def parse_item(obj: Dict[str, Any], topic_res: List[re.Pattern]) -> Optional[Record]:
+        # None means the opinion does not mention any topic.
+        case_name = obj.get("name") or obj.get("name_abbreviation") or "Unknown case"
+        citation = None
+        cits = obj.get("citations") or []
+        for c in cits:
+            if c.get("type") == "official" and c.get("cite"):
+                citation = c["cite"]; break
+        if not citation:
+            for c in cits:
+                if c.get("cite"):
+                    citation = c["cite"]; break
+        citation = normalize_citation(citation)
+
+        court = obj.get("court") or {}
+        court_level = court.get("name") or court.get("name_abbreviation") or ""
+        jurisdiction_obj = obj.get("jurisdiction") or {}
+        jurisdiction = jurisdiction_obj.get("name_long") or jurisdiction_obj.get("name") or "unknown"
+
+        body = ""
+        casebody = obj.get("casebody") or {}
+        if "data" in casebody:
+            data_body = casebody["data"]
+            if isinstance(data_body, dict):
+                body = " ".join(filter(None, [
+                    data_body.get("attorneys"),
+                    data_body.get("head_matter"),
+                    " ".join(sec.get("text","") for sec in (data_body.get("opinions") or []))
+                ]))
+            elif isinstance(data_body, list):
+                body = " ".join([sec.get("text","") for sec in data_body])
+        body = html_to_text(body)
+        text = f"{case_name}\n{body}"
+
+        if topic_res and not text_matches_topics(text, topic_res):
+            return None
+
+        cls = classify_opinion(body, case_name)
+        src = obj.get("frontend_url") or obj.get("url") or ""
+        if not src and citation:
+            src = f"https://api.case.law/v1/cases/?search={citation}"
+        if not citation:
+            citation = stable_id(case_name, src or f"cap:{obj.get('id')}")
+
+        return Record(
+            case_name=case_name,
+            jurisdiction=jurisdiction,
+            court_level=court_level,
+            summary=short(body, 5000),
+            holding=short(cls.holding, 1800),
+            citation=citation,
+            outcome=cls.outcome,
+            tags=cls.tags,
+            source_link=src,
+            provider=CAPProvider.name,
+        )
+
+    async def stream(self, since: datetime, topics: List[str], page_size: int, budget: ScrapeBudget,
+                     checkpoint: Optional[Checkpoint] = None) -> AsyncIterator[Record]:
         topic_res = compile_topics(topics)
-        collected: List[Record] = []
+        cp = checkpoint or Checkpoint()
+        since = cp.since(since)
+        collected = 0
         headers = {
             "User-Agent": "OperationCODE1983/1.0 (+local)",
             "Accept": "application/json",
@@ -433,119 +1888,154 @@ class CAPProvider(Provider):
         }
         url = f"{CAP_BASE}/cases/"
 
-        async with httpx.AsyncClient(timeout=30, headers=headers, follow_redirects=True) as client:
-            next_url: Optional[str] = url
-            while next_url and len(collected) < max_results:
+        async with self._client(timeout=30, headers=headers, follow_redirects=True) as client:
+            next_url: Optional[str] = cp.start_cursor or url
+            first_params = None if cp.start_cursor else params
+            out_of_budget = False
+            while next_url and not out_of_budget and budget.headroom(self.name) > 0:
                 for attempt in range(5):
                     try:
-                        r = await client.get(next_url, params=params if attempt == 0 else None)
+                        r = await client.get(next_url, params=first_params if attempt == 0 else None)
                         r.raise_for_status()
                         data = r.json()
                         break
                     except httpx.HTTPStatusError as e:
-                        if e.response.status_code in (429, 502, 503, 504, 301, 302, 307, 308):
+                        status = e.response.status_code
+                        if status in (429, 502, 503, 504):
+                            LOG.warning("[CAP] HTTP %s; retrying…", status)
+                            continue
+                        if status in (301, 302, 307, 308):
+                            # Not a throttle, so the limiter does not back off for us.
                             wait = 2 ** attempt
-                            LOG.warning("[CAP] HTTP %s; retry in %ss…", e.response.status_code, wait)
+                            LOG.warning("[CAP] HTTP %s; retry in %ss…", status, wait)
                             await asyncio.sleep(wait)
                             continue
                         raise
                     except httpx.RequestError as e:
-                        wait = 2 ** attempt
-                        LOG.warning("[CAP] network error, retrying in %ss… (%s)", wait, e)
-                        await asyncio.sleep(wait)
+                        LOG.warning("[CAP] network error, retrying… (%s)", e)
                 else:
-                    raise RuntimeError("[CAP] exceeded retries")
+                    LOG.error("[CAP] exceeded retries; stopping at current page")
+                    break
 
+                first_params = None
                 results = data.get("results", [])
+                dated = []
                 for obj in results:
                     try:
                         date_str = obj.get("decision_date")
                         if not date_str: 
                             continue
-                        dt_filed = datetime.fromisoformat(date_str)
-                        if dt_filed.replace(tzinfo=timezone.utc) < since:
-                            continue
-
-                        case_name = obj.get("name") or obj.get("name_abbreviation") or "Unknown case"
-                        citation = None
-                        cits = obj.get("citations") or []
-                        for c in cits:
-                            if c.get("type") == "official" and c.get("cite"):
-                                citation = c["cite"]; break
-                        if not citation:
-                            for c in cits:
-                                if c.get("cite"):
-                                    citation = c["cite"]; break
-                        citation = normalize_citation(citation)
-
-                        court = obj.get("court") or {}
-                        court_level = court.get("name") or court.get("name_abbreviation") or ""
-                        jurisdiction_obj = obj.get("jurisdiction") or {}
-                        jurisdiction = jurisdiction_obj.get("name_long") or jurisdiction_obj.get("name") or "unknown"
-
-                        body = ""
-                        casebody = obj.get("casebody") or {}
-                        if "data" in casebody:
-                            data_body = casebody["data"]
-                            if isinstance(data_body, dict):
-                                body = " ".join(filter(None, [
-                                    data_body.get("attorneys"),
-                                    data_body.get("head_matter"),
-                                    " ".join(sec.get("text","") for sec in (data_body.get("opinions") or []))
-                                ]))
-                            elif isinstance(data_body, list):
-                                body = " ".join([sec.get("text","") for sec in data_body])
-                        text = f"{case_name}\n{body}"
-
-                        if topics and not text_matches_topics(text, topic_res):
+                        dt_filed = parse_date(date_str)
+                        if dt_filed < since:
                             continue
-
-                        outcome = detect_outcome_plaintext(body)
-                        tags = detect_tags(text)
-                        summary = short(body, 5000)
-                        holding = short(holding_from_text(body), 1800)
-                        src = obj.get("frontend_url") or obj.get("url") or ""
-                        if not src and citation:
-                            src = f"https://api.case.law/v1/cases/?search={citation}"
-                        if not citation:
-                            citation = stable_id(case_name, src or f"cap:{obj.get('id')}")
-
-                        rec = Record(
-                            case_name=case_name,
-                            jurisdiction=jurisdiction,
-                            court_level=court_level,
-                            summary=summary,
-                            holding=holding,
-                            citation=citation,
-                            outcome=outcome,
-                            tags=tags,
-                            source_link=src,
-                            provider=self.name,
-                        )
-                        collected.append(rec)
-                        if len(collected) >= max_results: 
-                            break
+                        dated.append((dt_filed, obj))
                     except Exception as e:
                         LOG.debug("[CAP] parse skip: %s", e)
 
+                parsed = await self.parser.map(self.parse_item, [(obj, topic_res) for _, obj in dated])
+                for (dt_filed, _), (rec, err) in zip(dated, parsed):
+                    if rec is None:
+                        if err:
+                            LOG.debug("[CAP] parse skip: %s", err)
+                        continue
+                    if not await budget.take(self.name):
+                        out_of_budget = True
+                        break
+                    cp.seen(dt_filed)
+                    collected += 1
+                    yield rec
+
+                LOG.info("[CAP] %d collected so far", collected)
+                if out_of_budget:
+                    break
                 next_url = data.get("next")
+                cp.page_done(next_url)
 
-        LOG.info("[CAP] collected %d", len(collected))
-        return collected
+        LOG.info("[CAP] collected %d", collected)
 
 # -------------------------
 # GovInfo USCOURTS provider
 # -------------------------
 class GovInfoProvider(Provider):
     name = "govinfo"
+    rate = 5.0  # api.data.gov reports X-RateLimit-Remaining; the limiter tracks it
+
+    def __init__(self, concurrency: int = GOVINFO_CONCURRENCY):
+        # Max package downloads in flight per results page.
+        self.concurrency = concurrency
+
+    @staticmethod
+    def parse_item(r: Dict[str, Any], raw: str, fmt: str, topic_res: List[re.Pattern]) -> Optional[Record]:
+        # None means the opinion does not mention any topic.
+        # "text" bodies were already extracted while streaming in (see package_text).
+        plain = raw if fmt == "text" else html_to_text(raw)
+        pkg_id = r.get("packageId") or ""
+        title = r.get("title") or "Unknown opinion"
+        court_name = r.get("courtName") or ""
+        court_type = r.get("courtType") or ""
+        jurisdiction = "federal"
+
+        cat_text = f"{title}\n{plain}"
+        if topic_res and not text_matches_topics(cat_text, topic_res):
+            return None
+
+        cls = classify_opinion(plain, title)
+        return Record(
+            case_name=title,
+            jurisdiction=jurisdiction,
+            court_level=court_name or court_type,
+            summary=short(plain or title, 5000),
+            holding=short(cls.holding if plain else title, 1800),
+            citation=normalize_citation(r.get("citation")) or pkg_id,
+            outcome=cls.outcome,
+            tags=cls.tags,
+            source_link=f"https://www.govinfo.gov/app/details/{pkg_id}",
+            provider=GovInfoProvider.name,
+        )
 
-    async def fetch(self, since: datetime, topics: List[str], max_results: int, page_size: int) -> List[Record]:
+    async def stream(self, since: datetime, topics: List[str], page_size: int, budget: ScrapeBudget,
+                     checkpoint: Optional[Checkpoint] = None) -> AsyncIterator[Record]:
         api_key = GOVINFO_API_KEY
         if not api_key:
             LOG.warning("[GovInfo] GOVINFO_API_KEY not set; skipping.")
-            return []
+            return
+
+        cp = checkpoint or Checkpoint()
+        since = cp.since(since)
+        topic_res = compile_topics(topics)
+        collected = 0
+        sem = asyncio.Semaphore(max(1, self.concurrency))
+
+        async def package_text(client: httpx.AsyncClient, pkg_id: str) -> Tuple[str, str]:
+            # GET txt, falling back to htm; a non-200 is as good as a HEAD probe.
+            # The package summary is not fetched: nothing in the record uses it.
+            # Returns (body, format). Inline, bodies are extracted chunk by chunk as
+            # they download (format "text"); with --workers the raw body goes to the pool.
+            if not pkg_id:
+                return "", "text"
+            async with sem:
+                for fmt in ("txt", "htm"):
+                    url = f"https://api.govinfo.gov/packages/{pkg_id}/{fmt}?api_key={api_key}"
+                    try:
+                        if self.parser.workers:
+                            resp = await client.get(url)
+                            if resp.status_code == 200:
+                                return resp.text, fmt
+                            continue
+                        async with client.stream("GET", url) as resp:
+                            if resp.status_code != 200:
+                                continue
+                            if "html" not in resp.headers.get("content-type", "html"):
+                                await resp.aread()
+                                return html_to_text(resp.text), "text"
+                            ex = HTMLTextExtractor()
+                            async for chunk in resp.aiter_text():
+                                ex.feed(chunk)
+                            return ex.close(), "text"
+                    except httpx.RequestError as e:
+                        LOG.debug("[GovInfo] %s %s failed: %s", pkg_id, fmt, e)
+            return "", "text"
 
-        collected: List[Record] = []
         def qterm(t: str) -> str:
             t = t.strip()
             if not t: return ""
@@ -556,8 +2046,8 @@ class GovInfoProvider(Provider):
             q += " AND (" + " OR ".join(qterm(t) for t in topics if t) + ")"
 
         search_url = f"https://api.govinfo.gov/search?api_key={api_key}"
-        offset_mark = "*"
-        total_needed = max_results
+        offset_mark = cp.start_cursor or "*"
+        out_of_budget = False
         per_page = max(1, min(page_size, 100))
 
         headers = {
@@ -565,159 +2055,603 @@ class GovInfoProvider(Provider):
             "Accept": "application/json",
         }
 
-        async with httpx.AsyncClient(timeout=45, headers=headers, follow_redirects=True) as client:
-            while total_needed > 0 and offset_mark:
+        async with self._client(timeout=45, headers=headers, follow_redirects=True) as client:
+            while not out_of_budget and offset_mark and budget.headroom(self.name) > 0:
                 body = {"query": q, "sort": "date desc", "pageSize": per_page, "offsetMark": offset_mark}
-                try:
-                    resp = await client.post(search_url, json=body)
-                    resp.raise_for_status()
-                except httpx.HTTPStatusError as e:
-                    if e.response.status_code in (429, 502, 503, 504):
-                        LOG.warning("[GovInfo] HTTP %s; backing off...", e.response.status_code)
-                        await asyncio.sleep(2)
-                        continue
-                    raise
+                for attempt in range(5):
+                    try:
+                        resp = await client.post(search_url, json=body)
+                        resp.raise_for_status()
+                        break
+                    except httpx.HTTPStatusError as e:
+                        status = e.response.status_code
+                        # A replayed error is the same fixture every time: retrying would spin forever.
+                        if status not in (429, 502, 503, 504) or self.replaying:
+                            raise
+                        if self.rate_limits is None:
+                            wait = 2 ** attempt * random.uniform(0.5, 1.0)
+                            LOG.warning("[GovInfo] HTTP %s; retry in %.1fs…", status, wait)
+                            await asyncio.sleep(wait)
+                        else:  # the host limiter has already paused
+                            LOG.warning("[GovInfo] HTTP %s; retrying…", status)
+                else:
+                    # Keep what we have; the checkpoint still points at this page.
+                    LOG.error("[GovInfo] exceeded retries; stopping at current page")
+                    break
 
                 data = resp.json()
                 results = data.get("results", [])
-                offset_mark = data.get("nextOffsetMark")
 
+                # Cheap filtering first, then download the survivors' bodies concurrently.
+                hits = []
                 for r in results:
                     try:
-                        pkg_id = r.get("packageId") or ""
                         date_issued = r.get("dateIssued")
-                        if not date_issued: 
+                        if not date_issued:
                             continue
-                        dt = datetime.fromisoformat(date_issued.replace("Z", "+00:00"))
-                        if dt < since:
+                        if parse_date(date_issued) < since:
                             continue
-
-                        summary_url = f"https://api.govinfo.gov/packages/{pkg_id}/summary?api_key={api_key}"
-                        s = await client.get(summary_url)
-                        s.raise_for_status()
-
-                        candidate_txt = f"https://api.govinfo.gov/packages/{pkg_id}/txt?api_key={api_key}"
-                        candidate_htm = f"https://api.govinfo.gov/packages/{pkg_id}/htm?api_key={api_key}"
-
-                        txt_url = None
-                        htm_url = None
-                        try:
-                            h = await client.head(candidate_txt)
-                            if h.status_code == 200: txt_url = candidate_txt
-                        except Exception:
-                            pass
-                        if not txt_url:
-                            try:
-                                h = await client.head(candidate_htm)
-                                if h.status_code == 200: htm_url = candidate_htm
-                            except Exception:
-                                pass
-
-                        plain = ""
-                        if txt_url:
-                            t = await client.get(txt_url)
-                            if t.status_code == 200:
-                                plain = t.text
-                        elif htm_url:
-                            h = await client.get(htm_url)
-                            if h.status_code == 200:
-                                plain = re.sub(r"<[^>]+>", " ", h.text)
-
-                        title = r.get("title") or "Unknown opinion"
-                        court_name = r.get("courtName") or ""
-                        court_type = r.get("courtType") or ""
-                        jurisdiction = "federal"
-
-                        cat_text = f"{title}\n{plain}"
-                        if topics and not text_matches_topics(cat_text, compile_topics(topics)):
-                            continue
-
-                        outcome = detect_outcome_plaintext(plain)
-                        tags = detect_tags(cat_text)
-                        summary = short(plain or title, 5000)
-                        holding = short(holding_from_text(plain) if plain else title, 1800)
-                        citation = normalize_citation(r.get("citation")) or pkg_id
-                        details_page = f"https://www.govinfo.gov/app/details/{pkg_id}"
-
-                        rec = Record(
-                            case_name=title,
-                            jurisdiction=jurisdiction,
-                            court_level=court_name or court_type,
-                            summary=summary,
-                            holding=holding,
-                            citation=citation,
-                            outcome=outcome,
-                            tags=tags,
-                            source_link=details_page,
-                            provider=self.name,
-                        )
-                        collected.append(rec)
-                        total_needed -= 1
-                        if total_needed <= 0:
-                            break
+                        hits.append(r)
                     except Exception as e:
                         LOG.debug("[GovInfo] parse skip: %s", e)
 
-                await asyncio.sleep(0.4)
+                bodies = await asyncio.gather(*(package_text(client, r.get("packageId") or "") for r in hits))
+
+                parsed = await self.parser.map(
+                    self.parse_item, [(r, raw, fmt, topic_res) for r, (raw, fmt) in zip(hits, bodies)])
+                for r, (rec, err) in zip(hits, parsed):
+                    if rec is None:
+                        if err:
+                            LOG.debug("[GovInfo] parse skip: %s", err)
+                        continue
+                    if not await budget.take(self.name):
+                        out_of_budget = True
+                        break
+                    cp.seen(parse_date(r["dateIssued"]))
+                    collected += 1
+                    yield rec
+
+                LOG.info("[GovInfo] %d collected so far", collected)
+                if results and not hits:
+                    cp.complete()
+                    break
+                if out_of_budget:
+                    break
+                offset_mark = data.get("nextOffsetMark")
+                cp.page_done(offset_mark)
 
-        LOG.info("[GovInfo] collected %d", len(collected))
-        return collected
+        LOG.info("[GovInfo] collected %d", collected)
 
 # -------------------------
 # Persistence
 # -------------------------
-async def upsert_records(records: List[Record]) -> Tuple[int, int]:
-    if not records: return (0, 0)
-
-    dedup: Dict[str, Record] = {}
-    for r in records:
-        key = normalize_citation(r.citation) or stable_id(r.case_name, r.source_link)
-        dedup[key] = r
-    items = list(dedup.values())
-
-    texts = [(r.summary or "") + "\n" + (r.holding or "") for r in items]
+def record_key(r: Record) -> str:
+    return normalize_citation(r.citation) or stable_id(r.case_name, r.source_link)
+
+def embedding_input(r: Record) -> str:
+    return (r.summary or "") + "\n" + (r.holding or "")
+
+def record_row(r: Record, emb: List[float]) -> Dict[str, Any]:
+    return {
+        "case_name": r.case_name,
+        "jurisdiction": r.jurisdiction,
+        "court_level": r.court_level,
+        "summary": r.summary,
+        "holding": r.holding,
+        "citation": r.citation,
+        "outcome": r.outcome,
+        "tags": r.tags,
+        "vector_embedding": emb,
+        "source_link": r.source_link,
+        "provider": r.provider,
+    }
+
+# Columns compared to decide whether a stored row is unchanged (everything but the embedding).
+CONTENT_FIELDS = ("case_name", "jurisdiction", "court_level", "summary", "holding",
+                  "citation", "outcome", "tags", "source_link", "provider")
+
+def content_fingerprint(row: Dict[str, Any]) -> str:
+    # NULL and "" (or [] for tags) compare equal, so round-tripped rows still match.
+    vals = [row.get(f) or ([] if f == "tags" else "") for f in CONTENT_FIELDS]
+    return hashlib.sha1(json.dumps(vals, ensure_ascii=False).encode()).hexdigest()
+
+async def fetch_fingerprints(citations: List[str]) -> Dict[str, set]:
+    """Fingerprints of the stored rows for `citations`, fetched in bulk (no embeddings)."""
+    found: Dict[str, set] = {}
+    uniq = list(dict.fromkeys(c for c in citations if c))
+    for i in range(0, len(uniq), 100):  # keep the in.() filter within URL limits
+        chunk = uniq[i:i + 100]
+        res = await asyncio.to_thread(lambda: get_sb().table("federal_case_library")
+                                      .select(",".join(CONTENT_FIELDS)).in_("citation", chunk).execute())
+        for row in res.data or []:
+            found.setdefault(row.get("citation"), set()).add(content_fingerprint(row))
+    return found
+
+async def classify_changes(records: List[Record]) -> List[str]:
+    """'new', 'changed' or 'unchanged' per record, compared with federal_case_library."""
     try:
-        embs = await embed_texts(texts)
+        stored = await fetch_fingerprints([r.citation for r in records])
     except Exception as e:
-        LOG.error("Embedding failed: %s", e)
-        return (0, len(items))
-
-    payload: List[Dict[str, Any]] = []
-    for r, emb in zip(items, embs):
-        payload.append({
-            "case_name": r.case_name,
-            "jurisdiction": r.jurisdiction,
-            "court_level": r.court_level,
-            "summary": r.summary,
-            "holding": r.holding,
-            "citation": r.citation,
-            "outcome": r.outcome,
-            "tags": r.tags,
-            "vector_embedding": emb,
-            "source_link": r.source_link,
-            "provider": r.provider,
-        })
-
-    inserted = 0
-    skipped = 0
-    batch = 50
-    for i in range(0, len(payload), batch):
-        chunk = payload[i:i+batch]
-        try:
-            res = sb.table("federal_case_library").upsert(chunk).execute()
-            cnt = len(res.data or [])
-            inserted += cnt
-            LOG.info("Upserted %d records", cnt)
-        except Exception as e:
-            LOG.error("Supabase upsert failed: %s", e)
-            skipped += len(chunk)
+        LOG.warning("Could not fetch stored fingerprints; upserting all %d records: %s", len(records), e)
+        return ["new"] * len(records)
+    kinds = []
+    for r in records:
+        prints = stored.get(r.citation)
+        if not prints:
+            kinds.append("new")
+        elif content_fingerprint(record_row(r, [])) in prints:
+            kinds.append("unchanged")
+        else:
+            kinds.append("changed")
+    return kinds
+
+async def delete_rows(citations: List[str]) -> int:
+    for i in range(0, len(citations), 100):
+        chunk = citations[i:i + 100]
+        await asyncio.to_thread(lambda: get_sb().table("federal_case_library").delete().in_("citation", chunk).execute())
+    return len(citations)
+
+async def write_rows(rows: List[Dict[str, Any]]) -> int:
+    # supabase-py is synchronous; keep it off the event loop so fetching continues meanwhile.
+    # returning=minimal: echoing every row (and its vector) back would double the traffic.
+    await asyncio.to_thread(lambda: get_sb().table("federal_case_library")
+                            .upsert(rows, returning="minimal").execute())
+    return len(rows)
+
+def row_bytes(row: Dict[str, Any]) -> int:
+    # Rough JSON size; the embedding (~20 bytes per float) dominates.
+    n = 0
+    for v in row.values():
+        if isinstance(v, list):
+            n += 20 * len(v) if v and isinstance(v[0], float) else sum(len(str(x)) + 3 for x in v)
+        else:
+            n += len(v) if isinstance(v, str) else 16
+    return n + 16 * len(row)
+
+def _write_error_kind(e: Exception) -> str:
+    """'transient' (retry as is), 'too_big' (split and shrink the batch size) or 'bad' (split to find the row)."""
+    if isinstance(e, httpx.TimeoutException):
+        return "too_big"
+    if isinstance(e, httpx.TransportError):
+        return "transient"
+    code = getattr(e, "code", None)
+    if isinstance(code, int):  # non-JSON error page from the gateway
+        return "too_big" if code == 413 else "transient" if code == 429 or code >= 500 else "bad"
+    code = str(code or "")
+    if code == "57014":  # statement timeout
+        return "too_big"
+    if code[:2] in ("08", "40", "53", "57"):  # connection, deadlock/serialization, resources, shutdown
+        return "transient"
+    return "bad"
+
+class BatchWriter:
+    """
+    Bulk upserts into federal_case_library. Rows are packed into requests of
+    at most `target` payload bytes (vectors make row counts a poor measure),
+    and up to `concurrency` requests run at once. The target shrinks when a
+    request is too large or times out and creeps back up on success.
+
+    A failed request is retried with backoff if the error looks transient;
+    otherwise it is split in half until the offending rows are isolated, so
+    one bad row no longer costs its whole batch. Rows that still fail are
+    appended to the `dead_letter` JSONL file (see --retry-dead-letter).
+    """
+
+    MIN_BYTES = 64 * 1024
+
+    def __init__(self, concurrency: int = SCRAPER_UPSERT_CONCURRENCY, max_bytes: int = SCRAPER_UPSERT_MAX_KB * 1024,
+                 retries: int = SCRAPER_UPSERT_RETRIES, dead_letter: Optional[str] = None):
+        self.concurrency = max(1, concurrency)
+        self.sem = asyncio.Semaphore(self.concurrency)
+        self.max_bytes = max(self.MIN_BYTES, max_bytes)
+        self.target = self.max_bytes
+        self.retries = retries
+        self.dead_letter = dead_letter
+        self.requests = 0
+        self.splits = 0
+        self.dead = 0
+
+    def pack(self, rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        batches: List[List[Dict[str, Any]]] = []
+        cur: List[Dict[str, Any]] = []
+        size = 0
+        for row in rows:
+            n = row_bytes(row)
+            if cur and size + n > self.target:
+                batches.append(cur)
+                cur, size = [], 0
+            cur.append(row)
+            size += n
+        if cur:
+            batches.append(cur)
+        return batches
+
+    async def write(self, rows: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Upsert `rows`; returns (stored, failed rows). Failed rows are already dead-lettered if configured."""
+        if not rows:
+            return 0, []
+        results = await asyncio.gather(*(self._send(b) for b in self.pack(rows)))
+        failed = [(row, err) for _, f in results for row, err in f]
+        if failed:
+            self._dead_letter(failed)
+        return sum(n for n, _ in results), [row for row, _ in failed]
+
+    async def _send(self, rows: List[Dict[str, Any]]) -> Tuple[int, List[Tuple[Dict[str, Any], str]]]:
+        for attempt in range(self.retries + 1):
+            async with self.sem:
+                self.requests += 1
+                try:
+                    await write_rows(rows)
+                except Exception as e:
+                    err = e
+                else:
+                    self.target = min(self.max_bytes, self.target + self.target // 16)
+                    return len(rows), []
+            kind = _write_error_kind(err)
+            if kind == "too_big":
+                self.target = max(self.MIN_BYTES, min(self.target, sum(map(row_bytes, rows)) // 2))
+            if kind != "transient" or attempt == self.retries:
+                break
+            wait = min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+            LOG.warning("Supabase upsert of %d rows failed (%s); retry in %.1fs…", len(rows), err, wait)
+            await asyncio.sleep(wait)
+        # Transient errors that outlast the retries would fail every half too.
+        if len(rows) == 1 or kind == "transient":
+            LOG.error("Supabase upsert failed for %d rows: %s", len(rows), err)
+            return 0, [(row, str(err)) for row in rows]
+        self.splits += 1
+        mid = len(rows) // 2
+        a, b = await asyncio.gather(self._send(rows[:mid]), self._send(rows[mid:]))
+        return a[0] + b[0], a[1] + b[1]
+
+    def _dead_letter(self, failed: List[Tuple[Dict[str, Any], str]]) -> None:
+        self.dead += len(failed)
+        if not self.dead_letter:
+            return
+        at = datetime.now(timezone.utc).isoformat()
+        with open(self.dead_letter, "a", encoding="utf-8") as f:
+            for row, err in failed:
+                f.write(json.dumps({"at": at, "error": err, "row": row}, ensure_ascii=False) + "\n")
+        LOG.warning("Wrote %d failed rows to %s", len(failed), self.dead_letter)
+
+async def retry_dead_letter(writer: BatchWriter) -> Tuple[int, int]:
+    """Re-upsert rows from writer.dead_letter; rows that fail again are written back to it."""
+    path = Path(writer.dead_letter or "")
+    work = path.with_name(path.name + ".retrying")
+    if not work.exists():  # else a previous retry was interrupted: finish that one first
+        if not path.is_file():
+            return 0, 0
+        os.replace(path, work)
+    rows = [json.loads(line)["row"] for line in work.read_text(encoding="utf-8").splitlines() if line.strip()]
+    stored, failed = await writer.write(rows)
+    work.unlink()
+    return stored, len(failed)
+
+def row_key(row: Dict[str, Any]) -> str:
+    return normalize_citation(row.get("citation")) or stable_id(row.get("case_name") or "", row.get("source_link") or "")
+
+async def rebuild_near_dup_index(index: NearDupIndex, prune: bool = False, page_size: int = 1000) -> int:
+    """
+    Re-index federal_case_library from scratch in id order; of each set of
+    near-duplicates the copy with the best key_rank() is canonical. Returns
+    how many stored rows duplicate a canonical one; with `prune` those rows
+    are deleted.
+    """
+    index.clear()
+    dup_ids: List[Any] = []
+    last_id = None
+    while True:
+        def page():
+            q = get_sb().table("federal_case_library").select("id,citation,case_name,source_link,summary")
+            if last_id is not None:
+                q = q.gt("id", last_id)
+            return q.order("id").limit(page_size).execute()
+        rows = (await asyncio.to_thread(page)).data or []
+        keys = []
+        for row in rows:
+            key = row_key(row)
+            canonical = index.match(key, minhash_signature(row.get("summary") or ""))
+            if canonical:
+                LOG.info("Row %s (%s) is a near-duplicate of %s", row.get("id"), key, canonical)
+                dup_ids.append(row.get("id"))
+            else:
+                keys.append(key)
+        await index.apersist(keys)
+        if len(rows) < page_size:
+            break
+        last_id = rows[-1].get("id")
+
+    replaced = list(index.replaced)
+    if prune:
+        for i in range(0, len(dup_ids), 100):
+            chunk = dup_ids[i:i + 100]
+            await asyncio.to_thread(lambda: get_sb().table("federal_case_library").delete().in_("id", chunk).execute())
+        await delete_rows(replaced)
+        index.replaced.clear()
+        LOG.info("Deleted %d near-duplicate rows", len(dup_ids) + len(replaced))
+    return len(dup_ids) + len(replaced)
 
-    return inserted, skipped
+# -------------------------
+# Streaming pipeline
+# -------------------------
+_STOP = object()
+
+@dataclass
+class PipelineStats:
+    fetched: int = 0
+    kept: int = 0
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    near_dups: int = 0
+    embedded: int = 0
+    inserted: int = 0
+    skipped: int = 0
+
+    def __str__(self) -> str:
+        return (f"fetched={self.fetched} kept={self.kept} new={self.new} changed={self.changed} "
+                f"unchanged={self.unchanged} near_dups={self.near_dups} embedded={self.embedded} "
+                f"stored={self.inserted} skipped={self.skipped}")
+
+def keep_outcome(r: Record, include_unknown: bool) -> bool:
+    if r.outcome == "WON":
+        return True
+    return r.outcome == "UNKNOWN" and include_unknown
+
+class ScrapePipeline:
+    """
+    fetch -> outcome filter -> diff + embed -> upsert, as concurrent stages joined by
+    bounded asyncio queues. A full queue blocks the stage feeding it, so a slow
+    embedding endpoint or Supabase throttles fetching instead of letting records
+    pile up; memory stays flat regardless of --max. Embedding and upsert work
+    on micro-batches that are flushed when full or after `flush_after` seconds
+    without new input, so rows land in federal_case_library continuously.
+
+    Each queued record carries its provider's checkpoint snapshot from when it
+    was fetched. Stages are FIFO, so once a batch is stored every earlier record
+    of that provider is stored too and the snapshot can be committed.
+
+    With `diff`, each embed batch is first compared with the stored rows;
+    unchanged records skip embedding and upsert but still travel down the
+    queue (as row None) so their snapshots commit in order.
+
+    With `near_dups`, kept records whose text nearly matches an opinion already
+    kept this run (or stored earlier) are dropped at the filter stage, unless
+    they are the better copy (see NearDupIndex): then they are kept, and the
+    rows they replace are deleted once the run has stored everything.
+
+    Upserts go through `writer` (a BatchWriter). Rows it dead-letters count as
+    skipped but do not hold back checkpoints; without a dead-letter file they do.
+    """
+
+    def __init__(self, keep: Callable[[Record], bool], checkpoints: Optional[Dict[str, Checkpoint]] = None,
+                 store: Optional[CheckpointStore] = None, topics: Optional[List[str]] = None,
+                 embed_batch: int = 32, upsert_batch: int = 50, queue_size: int = 100, flush_after: float = 2.0,
+                 embed_cache: Optional[EmbeddingCache] = None, diff: bool = True,
+                 near_dups: Optional[NearDupIndex] = None, writer: Optional[BatchWriter] = None):
+        self.keep = keep
+        self.writer = writer or BatchWriter()
+        self.embed_cache = embed_cache
+        self.diff = diff
+        self.near_dups = near_dups
+        self.checkpoints = checkpoints or {}
+        self.store = store
+        self.topics = topics or []
+        self.embed_batch = max(1, embed_batch)
+        self.upsert_batch = max(1, upsert_batch)
+        self.flush_after = flush_after
+        self.q_fetched: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.q_kept: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.q_rows: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.stats = PipelineStats()
+
+    async def _batch(self, q: asyncio.Queue, size: int) -> Tuple[List[Any], bool]:
+        """Next micro-batch from `q`, and whether the stream has ended."""
+        first = await q.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        while len(batch) < size:
+            # Not wait_for(): on 3.11 it can swallow a cancel that races the get, leaving the
+            # stage running after run() has torn the pipeline down.
+            get = asyncio.ensure_future(q.get())
+            try:
+                done, _ = await asyncio.wait((get,), timeout=self.flush_after)
+            except BaseException:
+                get.cancel()
+                raise
+            if not done:
+                get.cancel()  # an item that arrives now stays queued for the next batch
+                break
+            item = get.result()
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _freeze(self, providers: List[str]) -> None:
+        # Records of these providers were lost: stop advancing their checkpoints.
+        for name in set(providers):
+            if name in self.checkpoints:
+                self.checkpoints[name].frozen = True
+
+    async def _fetch_stage(self, providers: List[Provider], budget: ScrapeBudget, since: datetime,
+                           page_size: int, sequential: bool) -> None:
+        async def run_provider(prov: Provider) -> None:
+            budget.start(prov.name)
+            cp = self.checkpoints.get(prov.name)
+            state = "done"
+            try:
+                async for rec in prov.stream(since, self.topics, page_size, budget, cp):
+                    self.stats.fetched += 1
+                    await self.q_fetched.put((rec, cp.snapshot() if cp else None))
+            except Exception as e:
+                state = "failed"
+                LOG.error("[%s] provider failed: %s", prov.name, e)
+                if cp:
+                    # Records already queued still land, but the walk's end state is unknown.
+                    cp.failed = True
+            finally:
+                # Hand any unused reservation to providers that are still producing.
+                await budget.finish(prov.name, state)
+
+        cancelled = False
+        try:
+            if sequential:
+                for prov in providers:
+                    await run_provider(prov)
+            else:
+                await asyncio.gather(*(run_provider(p) for p in providers))
+        except asyncio.CancelledError:
+            cancelled = True  # run() is tearing the stages down; nobody is left to read _STOP
+            raise
+        finally:
+            if not cancelled:
+                await self.q_fetched.put(_STOP)
+
+    async def _filter_stage(self) -> None:
+        seen: set = set()
+        while (item := await self.q_fetched.get()) is not _STOP:
+            rec = item[0]
+            key = record_key(rec)
+            if not self.keep(rec) or key in seen:
+                continue
+            seen.add(key)
+            if self.near_dups:
+                with STAGE_TIMES.timed("dedup"):
+                    canonical = self.near_dups.match(key, minhash_signature(rec.summary))
+                if canonical:
+                    LOG.debug("[%s] %s is a near-duplicate of %s; dropped", rec.provider, key, canonical)
+                    self.stats.near_dups += 1
+                    continue
+            self.stats.kept += 1
+            await self.q_kept.put(item)
+        await self.q_kept.put(_STOP)
+
+    async def _embed_stage(self) -> None:
+        ended = False
+        while not ended:
+            batch, ended = await self._batch(self.q_kept, self.embed_batch)
+            if not batch:
+                continue
+            if self.diff:
+                with STAGE_TIMES.timed("diff"):
+                    kinds = await classify_changes([rec for rec, _ in batch])
+                self.stats.new += kinds.count("new")
+                self.stats.changed += kinds.count("changed")
+                self.stats.unchanged += kinds.count("unchanged")
+            else:
+                kinds = ["new"] * len(batch)
+            todo = [i for i, k in enumerate(kinds) if k != "unchanged"]
+            if self.near_dups and len(todo) < len(batch):
+                # Unchanged rows are already stored; index them too.
+                await self.near_dups.apersist([record_key(batch[i][0]) for i, k in enumerate(kinds) if k == "unchanged"])
+            try:
+                with STAGE_TIMES.timed("embed"):
+                    embs = await embed_texts_cached([embedding_input(batch[i][0]) for i in todo], self.embed_cache)
+            except Exception as e:
+                LOG.error("Embedding failed for %d records: %s", len(todo), e)
+                self.stats.skipped += len(todo)
+                self._freeze([rec.provider for rec, _ in batch])
+                continue
+            self.stats.embedded += len(todo)
+            emb_at = dict(zip(todo, embs))
+            for i, (rec, snap) in enumerate(batch):
+                row = record_row(rec, emb_at[i]) if i in emb_at else None
+                await self.q_rows.put((row, rec.provider, snap))
+        await self.q_rows.put(_STOP)
+
+    async def _write(self, batch: List[Tuple[Dict[str, Any], str, Any]]) -> List[Dict[str, Any]]:
+        rows = [row for row, _, _ in batch if row is not None]
+        if not rows:
+            return []
+        with STAGE_TIMES.timed("upsert"):
+            cnt, failed = await self.writer.write(rows)
+        self.stats.inserted += cnt
+        self.stats.skipped += len(failed)
+        LOG.info("Upserted %d records", cnt)
+        if self.near_dups:
+            bad = {id(row) for row in failed}
+            await self.near_dups.apersist([row_key(row) for row in rows if id(row) not in bad])
+        return failed
+
+    async def _upsert_stage(self) -> None:
+        # Batches are written concurrently but settled in queue order, so a
+        # snapshot is only committed once every earlier record has landed.
+        inflight: deque = deque()
+        ended = False
+        try:
+            while not ended or inflight:
+                if not ended:
+                    batch, ended = await self._batch(self.q_rows, self.upsert_batch)
+                    if batch:
+                        inflight.append((asyncio.ensure_future(self._write(batch)), batch))
+                while inflight and (ended or inflight[0][0].done() or len(inflight) >= self.writer.concurrency):
+                    task, batch = inflight.popleft()
+                    failed = await task
+                    if failed and not self.writer.dead_letter:
+                        self._freeze([prov for _, prov, _ in batch])
+                    self._commit_snapshots(batch)
+        finally:
+            for task, _ in inflight:
+                task.cancel()
+
+    def _commit_snapshots(self, batch: List[Tuple[Dict[str, Any], str, Any]]) -> None:
+        if not self.store:
+            return
+        latest: Dict[str, Any] = {}
+        for _, prov, snap in batch:
+            if snap is not None:
+                latest[prov] = snap
+        for prov, snap in latest.items():
+            self.store.commit(self.checkpoints[prov], self.topics, snapshot=snap)
+        if latest:
+            self.store.save()
+
+    async def _report(self, budget: ScrapeBudget, every: float) -> None:
+        while True:
+            await asyncio.sleep(every)
+            LOG.info("Progress: %s | %s | rates %s", budget.progress(), self.stats, RATE_LIMITS.describe())
+
+    async def run(self, providers: List[Provider], since: datetime, max_total: int, page_size: int,
+                  sequential: bool = False, progress_every: float = 15.0) -> PipelineStats:
+        budget = ScrapeBudget(max_total, [p.name for p in providers])
+        reporter = asyncio.create_task(self._report(budget, progress_every)) if progress_every > 0 else None
+        t0 = time.monotonic()
+        stages = [asyncio.ensure_future(s) for s in (
+            self._fetch_stage(providers, budget, since, page_size, sequential),
+            self._filter_stage(),
+            self._embed_stage(),
+            self._upsert_stage(),
+        )]
+        try:
+            await asyncio.gather(*stages)
+        except BaseException:
+            # One stage failed (or we were cancelled): the others would wait on their queues forever.
+            for s in stages:
+                s.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            raise
+        finally:
+            if reporter:
+                reporter.cancel()
+        if self.near_dups and self.near_dups.replaced:
+            replaced = await delete_rows(self.near_dups.replaced)
+            self.near_dups.replaced.clear()
+            self.stats.near_dups += replaced
+            LOG.info("Deleted %d rows replaced by a better copy", replaced)
+        LOG.info("Pipeline finished in %.1fs: %s | %s", time.monotonic() - t0, budget.progress(), self.stats)
+
+        if self.store:
+            for cp in self.checkpoints.values():
+                self.store.commit(cp, self.topics)
+            self.store.save()
+        return self.stats
 
 # -------------------------
 # CLI
 # -------------------------
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     ap = argparse.ArgumentParser(description="Multi-source case scraper (API-only).")
     ap.add_argument("--providers", type=str, default="courtlistener,govinfo",
                     help="Comma-separated providers: courtlistener, govinfo, cap")
@@ -728,7 +2662,62 @@ def parse_args() -> argparse.Namespace:
     ap.add_argument("--page-size", type=int, default=50, help="Page size per provider request.")
     ap.add_argument("--only-wins", action="store_true", help="Keep opinions classified as WON only.")
     ap.add_argument("--include-unknown", action="store_true", help="Also keep UNKNOWN outcomes (in addition to wins).")
-    return ap.parse_args()
+    ap.add_argument("--govinfo-concurrency", type=int, default=GOVINFO_CONCURRENCY,
+                    help="Max GovInfo package downloads in flight per results page.")
+    ap.add_argument("--cache-dir", type=str, default=SCRAPER_CACHE_DIR,
+                    help="Directory for the on-disk HTTP response cache.")
+    ap.add_argument("--cache-max-mb", type=int, default=SCRAPER_CACHE_MAX_MB,
+                    help="Evict least recently used cache entries beyond this size.")
+    ap.add_argument("--no-cache", action="store_true", help="Disable the HTTP response cache.")
+    ap.add_argument("--workers", type=int, default=0,
+                    help="Parse/classify opinions in N worker processes (0 = inline on the event loop).")
+    ap.add_argument("--sequential", action="store_true",
+                    help="Fetch providers one after another instead of concurrently.")
+    ap.add_argument("--progress-every", type=float, default=15.0,
+                    help="Seconds between per-provider progress lines while fetching (0 disables).")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true",
+                      help="Only fetch opinions newer than each provider's stored watermark.")
+    mode.add_argument("--resume", action="store_true",
+                      help="Continue each provider's last unfinished walk from its stored cursor.")
+    ap.add_argument("--state-file", type=str, default=SCRAPER_STATE_FILE,
+                    help="JSON file holding per provider/topic-set watermarks and cursors.")
+    ap.add_argument("--embed-batch", type=int, default=32, help="Records per embedding request.")
+    ap.add_argument("--embed-cache", type=str, default=SCRAPER_EMBED_CACHE,
+                    help="SQLite file caching embeddings by content and model.")
+    ap.add_argument("--no-embed-cache", action="store_true", help="Disable the embedding cache.")
+    ap.add_argument("--local-embeddings", action="store_true",
+                    help="Use the local hash embedding model even if OPENAI_API_KEY is set.")
+    ap.add_argument("--upsert-batch", type=int, default=200,
+                    help="Rows gathered per write; split further to stay under --upsert-max-kb per request.")
+    ap.add_argument("--upsert-max-kb", type=int, default=SCRAPER_UPSERT_MAX_KB,
+                    help="Largest upsert payload; shrinks automatically on 413s and timeouts.")
+    ap.add_argument("--upsert-concurrency", type=int, default=SCRAPER_UPSERT_CONCURRENCY,
+                    help="Supabase upserts in flight.")
+    ap.add_argument("--dead-letter", type=str, default=SCRAPER_DEAD_LETTER,
+                    help="JSONL file collecting rows Supabase keeps rejecting.")
+    ap.add_argument("--retry-dead-letter", action="store_true",
+                    help="Re-upsert the rows in --dead-letter and exit.")
+    ap.add_argument("--no-diff", action="store_true",
+                    help="Upsert every record instead of skipping rows whose stored content is unchanged.")
+    ap.add_argument("--dedup-index", type=str, default=SCRAPER_DEDUP_INDEX,
+                    help="SQLite file holding MinHash/LSH sketches of stored opinions (near-duplicate detection).")
+    ap.add_argument("--dedup-threshold", type=float, default=SCRAPER_DEDUP_THRESHOLD,
+                    help="Estimated text similarity (0-1) at which two opinions count as the same.")
+    ap.add_argument("--no-dedup", action="store_true", help="Disable near-duplicate detection.")
+    ap.add_argument("--dedup-rebuild", action="store_true",
+                    help="Rebuild the near-duplicate index from federal_case_library, report duplicates and exit.")
+    ap.add_argument("--dedup-prune", action="store_true",
+                    help="With --dedup-rebuild: delete stored rows that duplicate an older row.")
+    ap.add_argument("--queue-size", type=int, default=100,
+                    help="Capacity of each queue between pipeline stages (bounds memory).")
+    ap.add_argument("--flush-secs", type=float, default=2.0,
+                    help="Flush a partial embed/upsert batch after this many idle seconds.")
+    fx = ap.add_mutually_exclusive_group()
+    fx.add_argument("--record", type=str, metavar="DIR", help="Save every provider HTTP exchange under DIR.")
+    fx.add_argument("--replay", type=str, metavar="DIR",
+                    help="Serve provider HTTP from fixtures in DIR (offline; no cache or rate limits).")
+    return ap.parse_args(argv)
 
 PROVIDER_MAP = {
     "courtlistener": CourtListenerProvider,
@@ -736,10 +2725,64 @@ PROVIDER_MAP = {
     "cap": CAPProvider,
 }
 
-async def main_async():
-    args = parse_args()
+async def main_async(argv: Optional[List[str]] = None, sb: Any = None) -> PipelineStats:
+    """
+    One scraper run. `sb` replaces the Supabase client built from the env
+    (scraper_bench.py passes a local stand-in). The run overrides some module
+    settings (`sb`, --local-embeddings, the --replay credentials); they are
+    restored when it returns, so in-process callers can run it again.
+    """
+    global COURTLISTENER_TOKEN, GOVINFO_API_KEY, OPENAI_API_KEY, _sb
+    saved = COURTLISTENER_TOKEN, GOVINFO_API_KEY, OPENAI_API_KEY, _sb
+    try:
+        return await _main(parse_args(argv), sb)
+    finally:
+        COURTLISTENER_TOKEN, GOVINFO_API_KEY, OPENAI_API_KEY, _sb = saved
+
+async def _main(args: argparse.Namespace, sb: Any) -> PipelineStats:
+    global COURTLISTENER_TOKEN, GOVINFO_API_KEY, OPENAI_API_KEY, _sb
+    if sb is not None:
+        _sb = sb
+    get_sb()  # fail fast on missing/invalid credentials
+    if args.local_embeddings:
+        OPENAI_API_KEY = None
+    STAGE_TIMES.reset()  # per run, so in-process callers read this run's numbers
+    writer = BatchWriter(args.upsert_concurrency, args.upsert_max_kb * 1024, dead_letter=args.dead_letter)
+    if args.retry_dead_letter:
+        stored, failed = await retry_dead_letter(writer)
+        LOG.info("Dead letter retry: %d stored, %d still failing (%s)", stored, failed, args.dead_letter)
+        return PipelineStats(inserted=stored, skipped=failed)
+    if args.dedup_rebuild:
+        index = NearDupIndex(args.dedup_index, args.dedup_threshold)
+        try:
+            dups = await rebuild_near_dup_index(index, prune=args.dedup_prune)
+        finally:
+            index.close()
+        LOG.info("Near-duplicate index rebuilt: %d duplicate rows%s", dups, " deleted" if args.dedup_prune else "")
+        return PipelineStats(near_dups=dups)
     topics = [t.strip() for t in args.topics.split(",") if t.strip()]
-    since = datetime.now(timezone.utc) - timedelta(days=args.days)
+    now = datetime.now(timezone.utc)
+
+    fixtures = None
+    if args.record:
+        fixtures = FixtureStore(args.record, "record")
+        fixtures.write_manifest(recorded_at=now.isoformat(), providers=args.providers, topics=topics, days=args.days)
+    elif args.replay:
+        fixtures = FixtureStore(args.replay, "replay")
+        if fixtures.manifest.get("recorded_at"):
+            now = datetime.fromisoformat(fixtures.manifest["recorded_at"])
+        # Providers skip themselves without credentials; fixtures never contain them.
+        COURTLISTENER_TOKEN = COURTLISTENER_TOKEN or "replay"
+        GOVINFO_API_KEY = GOVINFO_API_KEY or "replay"
+        args.no_cache = True
+    since = now - timedelta(days=args.days)
+
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    parser = RecordParser(args.workers)
+    embed_cache = None if args.no_embed_cache else EmbeddingCache(args.embed_cache)
+    # Replays start from an in-memory index so runs are repeatable.
+    near_dups = None if args.no_dedup else NearDupIndex(None if args.replay else args.dedup_index,
+                                                        args.dedup_threshold)
 
     prov_names = [p.strip() for p in args.providers.split(",") if p.strip()]
     providers: List[Provider] = []
@@ -748,38 +2791,66 @@ async def main_async():
         if not cls:
             LOG.warning("Unknown provider '%s' (skipping)", p)
             continue
-        providers.append(cls())
+        prov = cls()
+        prov.cache = cache
+        prov.parser = parser
+        prov.fixtures = fixtures
+        if args.replay:
+            prov.rate_limits = None
+        if isinstance(prov, GovInfoProvider):
+            prov.concurrency = args.govinfo_concurrency
+        providers.append(prov)
     if not providers:
         raise SystemExit("No valid providers selected")
 
+    store = CheckpointStore(args.state_file)
+    walk = "incremental" if args.incremental else "full"
+    checkpoints = {p.name: store.get(p.name, topics, walk, resume=args.resume) for p in providers}
+    for name, cp in checkpoints.items():
+        if cp.start_cursor:
+            LOG.info("[%s] continuing %s walk from stored cursor", name, walk)
+        if args.incremental and cp.watermark:
+            LOG.info("[%s] incremental since %s", name, cp.watermark.isoformat())
+
     LOG.info("Starting scrape: providers=%s topics=%s days=%s max=%s",
              [p.name for p in providers], topics, args.days, args.max)
 
-    per_provider_max = max(1, args.max // max(1, len(providers)))
-    all_records: List[Record] = []
-    for prov in providers:
-        try:
-            batch = await prov.fetch(since=since, topics=topics, max_results=per_provider_max, page_size=args.page_size)
-            all_records.extend(batch)
-        except Exception as e:
-            LOG.error("[%s] provider failed: %s", prov.name, e)
-
-    LOG.info("Fetched %d records before filtering", len(all_records))
-
-    filtered: List[Record] = []
-    for r in all_records:
-        if r.outcome == "WON":
-            filtered.append(r)
-        elif r.outcome == "UNKNOWN" and args.include_unknown:
-            filtered.append(r)
-        elif not args.only_wins and r.outcome == "LOST":
-            pass
-
-    LOG.info("Keeping %d records after outcome filter (WON%s)",
-             len(filtered), " + UNKNOWN" if args.include_unknown else "")
-
-    inserted, skipped = await upsert_records(filtered)
-    LOG.info("Done. Inserted/updated=%d, skipped=%d", inserted, skipped)
+    pipeline = ScrapePipeline(
+        keep=lambda r: keep_outcome(r, args.include_unknown),
+        checkpoints=checkpoints, store=store, topics=topics,
+        embed_batch=args.embed_batch, upsert_batch=args.upsert_batch,
+        queue_size=args.queue_size, flush_after=args.flush_secs, embed_cache=embed_cache,
+        diff=not args.no_diff, near_dups=near_dups, writer=writer,
+    )
+    try:
+        stats = await pipeline.run(providers, since, args.max, args.page_size,
+                                   sequential=args.sequential, progress_every=args.progress_every)
+    finally:
+        parser.close()
+        if embed_cache:
+            embed_cache.close()
+        if near_dups:
+            near_dups.close()
+
+    if cache:
+        LOG.info("HTTP cache: %d fresh hits, %d revalidated (304), %d fetched",
+                 cache.hits, cache.revalidated, cache.misses)
+    if embed_cache:
+        LOG.info("Embedding cache: %d hits, %d misses", embed_cache.hits, embed_cache.misses)
+    if fixtures:
+        LOG.info("Fixtures (%s): %d recorded, %d replayed, %d missing",
+                 fixtures.mode, fixtures.recorded, fixtures.replayed, fixtures.missing)
+    else:
+        LOG.info("Rate limits: %s", RATE_LIMITS.describe())
+    LOG.info("Stage time: %s", STAGE_TIMES.describe())
+    LOG.info("Upserts: %d requests, %d splits, batch target %d KB", writer.requests, writer.splits, writer.target // 1024)
+    if writer.dead:
+        LOG.warning("%d rows could not be stored; see %s (--retry-dead-letter)", writer.dead, args.dead_letter)
+    LOG.info("Done. Kept %d of %d fetched (WON%s); near-duplicates dropped=%d; new=%d changed=%d unchanged=%d; "
+             "inserted/updated=%d, skipped=%d",
+             stats.kept, stats.fetched, " + UNKNOWN" if args.include_unknown else "", stats.near_dups,
+             stats.new, stats.changed, stats.unchanged, stats.inserted, stats.skipped)
+    return stats
 
 def main():
     try:
@@ -0,0 +1,167 @@
+# analytics/scraper_bench.py
+"""
+Offline throughput benchmark for the scraper
+--------------------------------------------
+Replays provider HTTP fixtures recorded with
+
+  python analytics/scrap_courtlistener.py --record analytics/fixtures/nightly ...
+
+through the full pipeline (fetch -> parse -> diff -> embed -> upsert) against
+an in-memory stand-in for the Supabase REST (PostgREST) endpoints, then reports
+records/s and busy time per stage. No API tokens, quota or Supabase project
+are needed; embeddings use the local hash model unless --openai is given.
+
+Usage:
+  python analytics/scraper_bench.py --fixtures analytics/fixtures/nightly
+  python analytics/scraper_bench.py --fixtures DIR --runs 2 -- --workers 4 --embed-batch 64
+
+Arguments after "--" (or any this script does not know) go to the scraper.
+The stand-in keeps its rows across --runs, so run 2+ measures the
+unchanged-row (diff) path of a nightly re-scrape.
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qsl, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import scrap_courtlistener as sc  # noqa: E402
+
+# -------------------------
+# Local PostgREST stand-in
+# -------------------------
+def _in_values(expr: str) -> List[str]:
+    # PostgREST in.(a,"b,c",d) -> ["a", "b,c", "d"]
+    body = expr[len("in.("):-1]
+    out, cur, quoted = [], [], False
+    for ch in body:
+        if ch == '"':
+            quoted = not quoted
+        elif ch == "," and not quoted:
+            out.append("".join(cur)); cur = []
+        else:
+            cur.append(ch)
+    out.append("".join(cur))
+    return out
+
+class LocalPostgREST(ThreadingHTTPServer):
+    """
+    Just enough of /rest/v1/<table> for the scraper: bulk upsert (POST, keyed by
+    citation) and select with an in.() filter (GET). Rows live in memory.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, addr: Tuple[str, int] = ("127.0.0.1", 0)):
+        super().__init__(addr, _Handler)
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.requests = 0
+        self.bytes_in = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+class _Handler(BaseHTTPRequestHandler):
+    server: LocalPostgREST
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _reply(self, status: int, payload: Any) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _table(self) -> Dict[str, Dict[str, Any]]:
+        name = urlsplit(self.path).path.rsplit("/", 1)[-1]
+        return self.server.tables.setdefault(name, {})
+
+    def do_POST(self) -> None:
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        rows = json.loads(raw or b"[]")
+        rows = rows if isinstance(rows, list) else [rows]
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.bytes_in += len(raw)
+            table = self._table()
+            for row in rows:
+                table[row.get("citation") or str(len(table))] = row
+        minimal = "return=minimal" in (self.headers.get("Prefer") or "")
+        self._reply(201, [] if minimal else rows)
+
+    def do_GET(self) -> None:
+        query = dict(parse_qsl(urlsplit(self.path).query))
+        cols = [c for c in query.pop("select", "*").split(",") if c]
+        with self.server.lock:
+            self.server.requests += 1
+            rows = list(self._table().values())
+        for col, expr in query.items():
+            if expr.startswith("in.("):
+                wanted = set(_in_values(expr))
+                rows = [r for r in rows if str(r.get(col)) in wanted]
+            elif expr.startswith("eq."):
+                rows = [r for r in rows if str(r.get(col)) == expr[3:]]
+        if cols != ["*"]:
+            rows = [{c: r.get(c) for c in cols} for r in rows]
+        self._reply(200, rows)
+
+# -------------------------
+# Benchmark
+# -------------------------
+def report(run: int, wall: float, stats: "sc.PipelineStats", server: LocalPostgREST) -> None:
+    stored = stats.inserted
+    print(f"\nrun {run}: {wall:.2f}s wall | {stats}")
+    print(f"  throughput : {stats.fetched / wall:8.1f} fetched/s  {stored / wall:8.1f} stored/s")
+    print(f"  stand-in   : {server.requests} requests, {server.bytes_in / 1e6:.1f} MB upserted")
+    print("  stage        busy s   calls   % of wall")
+    for stage, secs in sc.STAGE_TIMES.seconds.items():
+        print(f"  {stage:<10} {secs:8.2f} {sc.STAGE_TIMES.calls[stage]:7d} {100 * secs / wall:10.1f}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay recorded fixtures through the scraper and time each stage.")
+    ap.add_argument("--fixtures", required=True, help="Directory written by scrap_courtlistener.py --record.")
+    ap.add_argument("--runs", type=int, default=1, help="Replay this many times against the same stand-in.")
+    ap.add_argument("--openai", action="store_true", help="Use OpenAI embeddings (spends quota) instead of local.")
+    args, scraper_args = ap.parse_known_args()
+    scraper_args = [a for a in scraper_args if a != "--"]
+
+    manifest = sc.FixtureStore(args.fixtures, "replay").manifest
+    server = LocalPostgREST()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    sb = sc.create_client(server.url, "local.postgrest.standin")
+
+    base = ["--replay", args.fixtures, "--no-embed-cache", "--progress-every", "0"]
+    if not args.openai:
+        base.append("--local-embeddings")
+    for key in ("providers", "topics", "days"):
+        if manifest.get(key) is not None and f"--{key}" not in scraper_args:
+            val = manifest[key]
+            base += [f"--{key}", ",".join(val) if isinstance(val, list) else str(val)]
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for run in range(1, args.runs + 1):
+                server.requests = server.bytes_in = 0
+                argv = base + ["--state-file", str(Path(tmp) / f"state{run}.json")] + scraper_args
+                t0 = time.perf_counter()
+                stats = asyncio.run(sc.main_async(argv, sb=sb))
+                report(run, time.perf_counter() - t0, stats, server)
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,36 @@ from typing import Optional
 from fastapi import Depends, HTTPException, Header
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import jwt
-import httpx
 
 from .config import settings
+from .services.http_clients import client
+from .utils.cache import TTLCache
 from .utils.mfa import verify_mfa_token
 
 bearer = HTTPBearer()
 
+# user_id -> (role, found). Roles rarely change; admin changes call invalidate_role().
+_roles = TTLCache(settings.ROLE_CACHE_SIZE, settings.ROLE_CACHE_TTL)
+
+async def _fetch_role(user_id: str):
+    # Fetch role from profiles (via Supabase RPC; the pooled client carries the service key)
+    r = await client("supabase").post("/rest/v1/rpc/get_role", json={"uid": user_id})
+    if r.status_code == 404:
+        return "user", False
+    r.raise_for_status()
+    data = r.json()
+    return (data.get("role", "user") if isinstance(data, dict) else "user"), True
+
+async def get_role(user_id: str) -> str:
+    role, _ = await _roles.get_or_load(
+        user_id, lambda: _fetch_role(user_id),
+        ttl_for=lambda v: None if v[1] else settings.ROLE_CACHE_NEGATIVE_TTL)
+    return role
+
+def invalidate_role(user_id: Optional[str] = None) -> None:
+    """Forget a cached role (or all of them) after it changes."""
+    _roles.invalidate(user_id)
+
 async def get_user(creds: HTTPAuthorizationCredentials = Depends(bearer)):
     token = creds.credentials
     try:
@@ -25,23 +48,7 @@ async def get_user(creds: HTTPAuthorizationCredentials = Depends(bearer)):
         if not user_id:
             raise ValueError("no sub")
 
-        # Fetch role from profiles (via Supabase RPC)
-        async with httpx.AsyncClient() as c:
-            r = await c.post(
-                f"{settings.SUPABASE_URL}/rest/v1/rpc/get_role",
-                headers={
-                    "apikey": settings.SUPABASE_SERVICE_ROLE_KEY,
-                    "Authorization": f"Bearer {settings.SUPABASE_SERVICE_ROLE_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={"uid": user_id},
-            )
-            if r.status_code == 404:
-                role = "user"
-            else:
-                r.raise_for_status()
-                data = r.json()
-                role = data.get("role", "user") if isinstance(data, dict) else "user"
+        role = await get_role(user_id)
 
         return {"user_id": user_id, "role": role, "token": token}
     except Exception:
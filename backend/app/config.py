@@ -1,6 +1,16 @@
-from pydantic import BaseSettings
+from pathlib import Path
+
+try:
+    from pydantic import BaseSettings, validator
+except ImportError:  # pydantic 2 (requirements.txt) keeps the v1 API here
+    from pydantic.v1 import BaseSettings, validator
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
 
 class Settings(BaseSettings):
+    # Local state (SQLite caches). Relative paths resolve against backend/, never the working directory.
+    DATA_DIR: str = "."
+
     # Supabase
     SUPABASE_URL: str
     SUPABASE_ANON_KEY: str
@@ -17,6 +27,14 @@ class Settings(BaseSettings):
 
     # CourtListener
     COURTLISTENER_BASE: str = "https://www.courtlistener.com/api/rest/v3"
+    CITATION_VERIFY_CONCURRENCY: int = 8
+    CITATION_CACHE_PATH: str = ".citation_cache.sqlite3"
+    CITATION_CACHE_TTL: float = 7 * 24 * 3600   # found
+    CITATION_MISS_TTL: float = 24 * 3600        # not found
+    CITATION_CACHE_SIZE: int = 5000             # in memory, in front of the SQLite file
+    CITATION_INDEX_ENABLED: bool = True         # resolve against federal_case_library first
+    CITATION_INDEX_REFRESH: float = 300.0       # pull new library rows this often
+    CITATION_INDEX_FULL_EVERY: float = 24 * 3600
 
     # Vault (Transit) – optional for now
     VAULT_ADDR: str = "http://localhost:8200"
@@ -27,12 +45,45 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str | None = None
     ANTHROPIC_API_KEY: str | None = None
     EMBEDDING_DIM: int = 1536
+    EMBED_MAX_TOKENS: int = 100_000   # per request; OpenAI allows 300k tokens / 2048 inputs
+    EMBED_MAX_INPUTS: int = 2048
+    EMBED_CONCURRENCY: int = 4
+    EMBED_MAX_RETRIES: int = 5
+    EMBED_CACHE_SIZE: int = 5000          # query embeddings kept in memory (~6 KB each)
+    EMBED_CACHE_TTL: float = 24 * 3600
+
+    # /match_cases: "rpc" (match_federal_cases in Postgres) or "ann" (in-process index, services/ann.py)
+    MATCH_BACKEND: str = "rpc"
+    MATCH_ANN_NPROBE: int = 8             # IVF cells scanned per query; higher = better recall, slower
+    MATCH_ANN_REFRESH: float = 300.0      # pull new library rows this often
+    MATCH_ANN_FULL_EVERY: float = 6 * 3600  # rebuild (retrain cells, pick up edits/deletes)
+    MATCH_BATCH_MAX: int = 100            # texts per /match_cases/batch call
+    MATCH_MAX_N: int = 50                 # matches per query
+    MATCH_RPC_CONCURRENCY: int = 8
+
+    # /metrics/public snapshot (services/public_metrics.py)
+    METRICS_REFRESH: float = 60.0        # rebuild interval; older snapshots are served while one refreshes
+    METRICS_CACHE_MAX_AGE: int = 30      # Cache-Control max-age for browsers/CDN
+
+    # Outbound HTTP (services/http_clients.py)
+    HTTP_POOL_SIZE: int = 20      # keep-alive connections per upstream
+    DB_TIMEOUT: float = 10.0      # per PostgREST/Storage call (services/db.py)
+    HTTP2_ENABLED: bool = True    # used when the h2 package is installed
+
+    # auth.get_user role cache
+    ROLE_CACHE_TTL: float = 300.0           # seconds
+    ROLE_CACHE_NEGATIVE_TTL: float = 60.0   # users without a profile row (404)
+    ROLE_CACHE_SIZE: int = 10_000
 
     # Security
     REQUIRE_MFA: bool = True
     BACKEND_SECRET: str = "dev-secret-change-me"  # used to sign short-lived MFA tokens
     DEV_AUTH_ENABLED: bool = True  # set False in prod!
     
+    @validator("CITATION_CACHE_PATH")
+    def _under_data_dir(cls, v, values):
+        return str(BACKEND_DIR / Path(values.get("DATA_DIR") or ".").expanduser() / Path(v).expanduser())
+
     class Config:
         env_file = ".env"
 
@@ -1,7 +1,6 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from backend.ingestion.supabase_insert import insert_signature
 from app.routes import webauthn, upload, citations, analyze, match_cases, generate_motion
 from app.config import settings
 from app.middleware.rate_limit import RateLimitMiddleware
@@ -13,23 +12,47 @@ from app.routes import admin
 from app.routes import dev_auth
 from app.routes import doh
 from app.auth import require_mfa, get_user
+from app.services.http_clients import clients
+from app.services.db import petition_signatures
+from app.services.citation_index import citation_index
+from app.services.ann import ann_matcher
+from app.services.public_metrics import public_metrics
+from contextlib import asynccontextmanager
+import asyncio
 import uvicorn
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
-app = FastAPI(title="Operation CODE 1983 API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled outbound HTTP clients live as long as the app.
+    clients.start()
+    tasks = [asyncio.create_task(public_metrics.run())]
+    if settings.CITATION_INDEX_ENABLED:
+        tasks.append(asyncio.create_task(citation_index.run()))
+    if settings.MATCH_BACKEND == "ann":
+        tasks.append(asyncio.create_task(ann_matcher.run()))  # RPC serves until the first load completes
+    try:
+        yield
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await public_metrics.aclose()
+        await clients.aclose()
+
+app = FastAPI(title="Operation CODE 1983 API", lifespan=lifespan)
 
 # Allow frontend calls (adjust origin for production)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[settings.CORS_ORIGINS],  # Change to specific domain in prod
+    allow_origins=[settings.CORS_ORIGIN],  # Change to specific domain in prod
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-app = FastAPI(title="Operation CODE 1983 API")
 app.include_router(analyze.router)
 app.include_router(match_cases.router)
 app.include_router(generate_motion.router)
@@ -66,7 +89,8 @@ class Signature(BaseModel):
 @app.post("/submit")
 async def submit_signature(data: Signature):
     try:
-        result = insert_signature(data)
+        rows = await petition_signatures.insert(data.model_dump())
+        result = rows[0] if rows else None
         return {"status": "success", "message": "Signature submitted", "result": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
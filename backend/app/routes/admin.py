@@ -1,10 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
-from supabase import create_client
-from app.config import settings
-from app.auth import get_user
+from app.auth import get_user, invalidate_role
+from app.services.db import federal_case_library, motion_templates
 
 router = APIRouter(prefix="/admin", tags=["admin"])
-sb = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
 
 def _require_curator(user):
     if user.get("role") not in ("curator","admin"):
@@ -13,36 +11,42 @@ def _require_curator(user):
 @router.get("/cases")
 async def list_cases(user=Depends(get_user)):
     _require_curator(user)
-    res = sb.table("federal_case_library").select("*").limit(200).execute()
-    return res.data or []
+    return await federal_case_library.select(limit=200)
 
 @router.post("/cases")
 async def upsert_case(payload: dict, user=Depends(get_user)):
     _require_curator(user)
     # if id present -> update; else insert
-    res = sb.table("federal_case_library").upsert(payload).execute()
-    return {"ok": True, "count": len(res.data or [])}
+    rows = await federal_case_library.upsert(payload)
+    return {"ok": True, "count": len(rows)}
 
 @router.delete("/cases/{id}")
 async def delete_case(id: str, user=Depends(get_user)):
     _require_curator(user)
-    sb.table("federal_case_library").delete().eq("id", id).execute()
+    await federal_case_library.delete(where={"id": id})
+    return {"ok": True}
+
+@router.post("/roles/invalidate")
+async def invalidate_roles(payload: dict, user=Depends(get_user)):
+    # Call after changing a profile's role so it applies before the cache TTL runs out.
+    if user.get("role") != "admin":
+        raise HTTPException(403, "Admin role required")
+    invalidate_role(payload.get("user_id"))
     return {"ok": True}
 
 @router.get("/templates")
 async def list_templates(user=Depends(get_user)):
     _require_curator(user)
-    res = sb.table("motion_templates").select("*").limit(200).execute()
-    return res.data or []
+    return await motion_templates.select(limit=200)
 
 @router.post("/templates")
 async def upsert_template(payload: dict, user=Depends(get_user)):
     _require_curator(user)
-    res = sb.table("motion_templates").upsert(payload).execute()
-    return {"ok": True, "count": len(res.data or [])}
+    rows = await motion_templates.upsert(payload)
+    return {"ok": True, "count": len(rows)}
 
 @router.delete("/templates/{id}")
 async def delete_template(id: str, user=Depends(get_user)):
     _require_curator(user)
-    sb.table("motion_templates").delete().eq("id", id).execute()
+    await motion_templates.delete(where={"id": id})
     return {"ok": True}
\ No newline at end of file
@@ -6,16 +6,11 @@ from typing import Any, Dict, List, Optional
 
 import httpx
 from fastapi import APIRouter, HTTPException, Query
-from supabase import create_client
 
-router = APIRouter(prefix="/doh", tags=["public-data"])
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-if not SUPABASE_URL or not SUPABASE_SERVICE_ROLE_KEY:
-    raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+from app.services.db import doh_child_support_metrics
+from app.services.http_clients import client
 
-sb = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+router = APIRouter(prefix="/doh", tags=["public-data"])
 
 DOH_DATA_URL = os.getenv(
     "DOH_DATA_URL",
@@ -88,10 +83,9 @@ def _normalize_to_records(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return out
 
 async def _fetch_doh_json() -> Any:
-    async with httpx.AsyncClient(timeout=45) as c:
-        r = await c.get(DOH_DATA_URL)
-        r.raise_for_status()
-        return r.json()
+    r = await client("public").get(DOH_DATA_URL)
+    r.raise_for_status()
+    return r.json()
 
 @router.post("/refresh")
 async def refresh(limit: int = Query(500, ge=1, le=5000)) -> Dict[str, int]:
@@ -129,8 +123,8 @@ async def refresh(limit: int = Query(500, ge=1, le=5000)) -> Dict[str, int]:
     for i in range(0, len(norm), batch):
         chunk = norm[i:i+batch]
         try:
-            res = sb.table("doh_child_support_metrics").insert(chunk).execute()
-            inserted += len(res.data or [])
+            await doh_child_support_metrics.insert(chunk, returning="minimal")
+            inserted += len(chunk)
         except Exception as e:
             # non-fatal; continue inserting other chunks
             print("Upsert error:", e)
@@ -142,12 +136,9 @@ async def metrics(state: Optional[str] = None, limit: int = Query(12, ge=1, le=2
     """
     Return recent rows for quick UI cards. Filter by state if provided.
     """
-    q = sb.table("doh_child_support_metrics").select("*").order("fetched_at", desc=True)
-    if state:
-        q = q.eq("state", state)
-    q = q.limit(limit)
     try:
-        res = q.execute()
+        items = await doh_child_support_metrics.select(
+            where={"state": state} if state else None, order="fetched_at", desc=True, limit=limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Supabase error: {e}") from e
-    return {"items": res.data or []}
\ No newline at end of file
+    return {"items": items}
\ No newline at end of file
@@ -1,23 +1,48 @@
 # backend/app/routes/match_cases.py
+import asyncio
+from typing import Annotated, List
 from fastapi import APIRouter, Depends, HTTPException
-from supabase import create_client
+from pydantic import BaseModel, Field
 from app.config import settings
 from app.auth import get_user
 from app.services.embeddings import embed_texts
+from app.services.ann import ann_matcher
+from app.services.db import rpc
 
 router = APIRouter(prefix="/match_cases", tags=["match"])
-sb = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
+
+async def match_embedding(embedding: List[float], n: int) -> List[dict]:
+    if settings.MATCH_BACKEND == "ann" and ann_matcher.ready:
+        return ann_matcher.match(embedding, n)
+    # PostgREST casts the JSON array to the function's vector argument.
+    return await rpc("match_federal_cases", {"query": embedding, "n": n}) or []
 
 @router.post("")
 async def match_cases(payload: dict, user=Depends(get_user)):
     text = payload.get("text", "")
     embedding = payload.get("embedding")
     n = int(payload.get("n", 3))
+    if not 1 <= n <= settings.MATCH_MAX_N:
+        raise HTTPException(400, f"'n' must be between 1 and {settings.MATCH_MAX_N}")
     if not embedding:
         if not text:
             raise HTTPException(400, "Provide 'text' or precomputed 'embedding'")
         embedding = (await embed_texts([text]))[0]
-    # Supabase RPC requires vector as array -> postgres vector literal
-    # The supabase-py client converts JSON array fine.
-    res = sb.rpc("match_federal_cases", {"query": embedding, "n": n}).execute()
-    return {"matches": res.data or []}
\ No newline at end of file
+    return {"matches": await match_embedding(embedding, n)}
+
+class MatchBatch(BaseModel):
+    texts: List[Annotated[str, Field(min_length=1)]] = Field(min_length=1, max_length=settings.MATCH_BATCH_MAX)
+    n: int = Field(3, ge=1, le=settings.MATCH_MAX_N)
+
+@router.post("/batch")
+async def match_cases_batch(payload: MatchBatch, user=Depends(get_user)):
+    """{"texts": [...], "n": 3} -> {"results": [{"matches": [...]}, ...]} in input order; texts are embedded in one call."""
+    n = payload.n
+    embeddings = await embed_texts(payload.texts)
+    sem = asyncio.Semaphore(max(1, settings.MATCH_RPC_CONCURRENCY))
+
+    async def one(embedding: List[float]) -> dict:
+        async with sem:
+            return {"matches": await match_embedding(embedding, n)}
+
+    return {"results": await asyncio.gather(*(one(e) for e in embeddings))}
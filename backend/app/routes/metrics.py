@@ -1,30 +1,37 @@
 # backend/app/routes/metrics.py
-from fastapi import APIRouter, Depends
-from supabase import create_client
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Response
 from app.config import settings
 from app.auth import get_user
+from app.services.db import generated_motions, rpc, user_cases
+from app.services.public_metrics import etag_matches, public_metrics as snapshot
 
 router = APIRouter(prefix="/metrics", tags=["metrics"])
-sb = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
 
 @router.get("/public")
-async def public_metrics():
-    v = sb.table("v_public_metrics").select("*").execute()
-    heat = sb.table("v_state_activity").select("*").execute()
-    return {"totals": v.data[0] if v.data else {}, "heatmap": heat.data or []}
+async def public_metrics(if_none_match: Optional[str] = Header(None)):
+    snap = await snapshot.get()
+    headers = {
+        "ETag": snap.etag,
+        "Cache-Control": f"public, max-age={settings.METRICS_CACHE_MAX_AGE}, "
+                         f"stale-while-revalidate={int(settings.METRICS_REFRESH)}",
+    }
+    if etag_matches(if_none_match, snap.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(snap.body, media_type="application/json", headers=headers)
 
 @router.get("/private")
 async def private_metrics(user=Depends(get_user)):
     # Example: user's own counts
-    cases = sb.table("user_cases").select("id", count="exact").eq("user_id", user["user_id"]).execute()
-    motions = sb.table("generated_motions").select("id", count="exact").execute()
+    cases, motions = await asyncio.gather(
+        user_cases.count(where={"user_id": user["user_id"]}), generated_motions.count())
     return {
-        "my_cases": cases.count or 0,
-        "my_motions": motions.count or 0
+        "my_cases": cases,
+        "my_motions": motions
     }
 
 @router.get("/class_action/{threshold}")
 async def class_action(threshold: int, user=Depends(get_user)):
     # any authenticated user can see the states that reached the threshold
-    res = sb.rpc("class_action_trigger_states", {"threshold": threshold}).execute()
-    return {"triggered": res.data or []}
\ No newline at end of file
+    return {"triggered": await rpc("class_action_trigger_states", {"threshold": threshold}) or []}
\ No newline at end of file
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from supabase import create_client
 from app.config import settings
 from app.auth import require_mfa, get_user
+from app.services.db import generated_motions, secure_shares, signed_url
 import secrets, datetime as dt
 
 router = APIRouter(prefix="/shares", tags=["shares"])
-sb = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
 
 @router.post("/create")
 async def create_share(payload: dict, user=Depends(require_mfa)):
@@ -14,16 +13,16 @@ async def create_share(payload: dict, user=Depends(require_mfa)):
     if not motion_id: raise HTTPException(400, "motion_id required")
     secret = secrets.token_urlsafe(24)
     exp = (dt.datetime.utcnow() + dt.timedelta(minutes=ttl)).isoformat() + "Z"
-    sb.table("secure_shares").insert({
+    await secure_shares.insert({
         "motion_id": motion_id,
         "one_time_secret": secret,
         "expires_at": exp
-    }).execute()
+    }, returning="minimal")
     return {"url": f"/share/{secret}"}  # frontend route
 
 @router.get("/redeem/{secret}")
 async def redeem(secret: str):
-    row = sb.table("secure_shares").select("*").eq("one_time_secret", secret).maybe_single().execute().data
+    row = await secure_shares.first(where={"one_time_secret": secret})
     if not row:
         raise HTTPException(404, "Not found")
     if row.get("redeemed"):
@@ -33,13 +32,16 @@ async def redeem(secret: str):
         raise HTTPException(410, "Expired")
 
     # look up the motion's pdf path
-    mot = sb.table("generated_motions").select("pdf_path").eq("id", row["motion_id"]).maybe_single().execute().data
+    mot = await generated_motions.first("pdf_path", where={"id": row["motion_id"]})
     if not mot or not mot.get("pdf_path"):
         raise HTTPException(404, "Missing PDF")
 
-    # mark redeemed
-    sb.table("secure_shares").update({"redeemed": True}).eq("id", row["id"]).execute()
+    # mark redeemed; conditional so concurrent redeems of one secret can't both win
+    # (not.is.true: create_share leaves redeemed NULL)
+    if not await secure_shares.update({"redeemed": True}, where={"id": row["id"]},
+                                      filters={"redeemed": "not.is.true"}, returning="representation"):
+        raise HTTPException(410, "Already redeemed")
 
     # generate a short signed URL for the PDF
-    signed = sb.storage.from_(settings.STORAGE_PDF_BUCKET).create_signed_url(mot["pdf_path"], 60*10)
-    return {"signed_url": signed.get("signedURL")}
\ No newline at end of file
+    signed = await signed_url(settings.STORAGE_PDF_BUCKET, mot["pdf_path"], 60*10)
+    return {"signed_url": signed}
\ No newline at end of file
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
-from supabase import create_client
 from app.config import settings
 from app.auth import require_mfa
+from app.services.db import signed_url
 import time
 
 router = APIRouter(prefix="/uploads", tags=["storage"])
-sb = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
 
 @router.post("/signed-url")
 async def create_signed_upload(payload: dict, user=Depends(require_mfa)):
@@ -20,5 +19,5 @@ async def create_signed_upload(payload: dict, user=Depends(require_mfa)):
     key = f"{uid}/{int(time.time())}_{filename}"
     # Supabase Storage doesn't do PUT pre-signing like S3; we return a signed URL for GET and use upload via API.
     # For simplicity, use service role for server-side upload endpoint in MVP, or client can upload via supabase-js with user token.
-    signed = sb.storage.from_(settings.STORAGE_UPLOADS_BUCKET).create_signed_url(key, 60 * 15)
-    return {"path": key, "signed_url": signed.get("signedURL")}
\ No newline at end of file
+    signed = await signed_url(settings.STORAGE_UPLOADS_BUCKET, key, 60 * 15)
+    return {"path": key, "signed_url": signed}
\ No newline at end of file
@@ -1,9 +1,8 @@
 # backend/app/routes/webauthn.py
 from fastapi import APIRouter, Depends, HTTPException
 from app.auth import get_user
-from app.config import settings
 from app.utils.mfa import issue_mfa_token
-from supabase import create_client
+from app.services.db import webauthn_credentials
 
 from webauthn import (
     generate_registration_options,
@@ -25,7 +24,6 @@ from webauthn.helpers.structs import (
 import os, base64
 
 router = APIRouter(prefix="/webauthn", tags=["webauthn"])
-sb = create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_ROLE_KEY)
 
 RP_ID = os.environ.get("RP_ID", "localhost")              # set to your apex domain in prod
 RP_NAME = os.environ.get("RP_NAME", "Operation CODE 1983")
@@ -98,12 +96,12 @@ async def finish_registration(payload: dict, user=Depends(get_user)):
     public_key_b64 = _b64url(public_key_bytes)
 
     # Persist credential
-    sb.table("webauthn_credentials").insert({
+    await webauthn_credentials.insert({
         "user_id": uid,
         "credential_id": cred_id,
         "public_key": public_key_b64,
         "sign_count": 0,
-    }).execute()
+    }, returning="minimal")
 
     _challenges.pop(uid, None)
 
@@ -115,7 +113,7 @@ async def start_authentication(user=Depends(get_user)):
     uid = user["user_id"]
 
     # Build allowCredentials list so the browser can pick the right authenticator
-    creds = sb.table("webauthn_credentials").select("*").eq("user_id", uid).execute().data or []
+    creds = await webauthn_credentials.select(where={"user_id": uid})
     allow: list[PublicKeyCredentialDescriptor] = []
     for c in creds:
         try:
@@ -156,7 +154,7 @@ async def finish_authentication(payload: dict, user=Depends(get_user)):
     if not expected_challenge:
         raise HTTPException(400, "Missing authentication challenge")
 
-    creds = sb.table("webauthn_credentials").select("*").eq("user_id", uid).execute().data or []
+    creds = await webauthn_credentials.select(where={"user_id": uid})
     if not creds:
         raise HTTPException(400, "No credentials")
 
@@ -179,7 +177,7 @@ async def finish_authentication(payload: dict, user=Depends(get_user)):
     try:
         new_cnt = getattr(verification, "new_sign_count", None)
         if isinstance(new_cnt, int):
-            sb.table("webauthn_credentials").update({"sign_count": new_cnt}).eq("id", cred["id"]).execute()
+            await webauthn_credentials.update({"sign_count": new_cnt}, where={"id": cred["id"]})
     except Exception:
         pass
 
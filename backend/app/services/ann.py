@@ -0,0 +1,191 @@
+# backend/app/services/ann.py
+"""
+In-process approximate nearest-neighbour matching over federal_case_library
+(MATCH_BACKEND=ann), instead of the match_federal_cases RPC.
+
+IVFIndex is an inverted-file index over unit vectors: spherical k-means
+splits the library into ~sqrt(N) cells, and a query scans only the
+MATCH_ANN_NPROBE cells whose centroids are closest. Small libraries (or
+nprobe >= cells) are scanned exactly. Scores are cosine similarities, the
+same ordering as pgvector's <=> operator. bench_match.py measures recall
+against exact search (or the live RPC).
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.library import library_pages
+from app.utils.vectors import parse_vector
+
+log = logging.getLogger(__name__)
+
+def _unit(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+class IVFIndex:
+    MIN_CELL = 40        # below ~40 rows per cell, exact search is as fast
+    TRAIN_SAMPLE = 20_000
+    ITERATIONS = 8
+
+    def __init__(self, dim: int, nprobe: int = 8, seed: int = 0):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.seed = seed
+        self.vecs = np.zeros((0, dim), dtype=np.float32)
+        self.cells = np.zeros(0, dtype=np.int32)   # -1 = removed
+        self.ids: List[Any] = []
+        self.pos: Dict[Any, int] = {}
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.pos)
+
+    def _assign(self, x: np.ndarray) -> np.ndarray:
+        if not len(self.centroids):
+            return np.zeros(len(x), dtype=np.int32)
+        out = np.empty(len(x), dtype=np.int32)
+        for i in range(0, len(x), 4096):
+            out[i:i + 4096] = np.argmax(x[i:i + 4096] @ self.centroids.T, axis=1)
+        return out
+
+    def train(self, x: np.ndarray) -> None:
+        """Spherical k-means on a sample of (unit) vectors x."""
+        ncells = int(np.sqrt(len(x)))
+        if ncells < 2 or len(x) < ncells * self.MIN_CELL:
+            self.centroids = np.zeros((0, self.dim), dtype=np.float32)
+            return
+        rng = np.random.default_rng(self.seed)
+        sample = x[rng.choice(len(x), min(len(x), self.TRAIN_SAMPLE), replace=False)]
+        cent = sample[rng.choice(len(sample), ncells, replace=False)].copy()
+        for _ in range(self.ITERATIONS):
+            self.centroids = cent
+            labels = self._assign(sample)
+            sums = np.zeros_like(cent)
+            np.add.at(sums, labels, sample)
+            empty = np.bincount(labels, minlength=ncells) == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]  # reseed empty cells
+            cent = _unit(sums).astype(np.float32)
+        self.centroids = cent
+
+    def build(self, ids: List[Any], vecs: np.ndarray) -> None:
+        x = _unit(np.asarray(vecs, dtype=np.float32))
+        self.train(x)
+        self.vecs, self.ids = x, list(ids)
+        self.pos = {id_: i for i, id_ in enumerate(self.ids)}
+        self.cells = self._assign(x)
+        self.size = len(x)
+
+    def add(self, ids: List[Any], vecs: np.ndarray) -> None:
+        """Insert or replace rows; cells stay as trained until the next build()."""
+        x = _unit(np.asarray(vecs, dtype=np.float32))
+        cells = self._assign(x)
+        fresh = []
+        for i, id_ in enumerate(ids):
+            p = self.pos.get(id_)
+            if p is None:
+                fresh.append(i)
+            else:
+                self.vecs[p], self.cells[p] = x[i], cells[i]
+        if not fresh:
+            return
+        need = self.size + len(fresh)
+        if need > len(self.vecs):
+            cap = max(need, len(self.vecs) * 2)
+            self.vecs = np.concatenate([self.vecs[:self.size], np.zeros((cap - self.size, self.dim), np.float32)])
+            self.cells = np.concatenate([self.cells[:self.size], np.full(cap - self.size, -1, np.int32)])
+        self.vecs[self.size:need] = x[fresh]
+        self.cells[self.size:need] = cells[fresh]
+        for i in fresh:
+            self.pos[ids[i]] = len(self.ids)
+            self.ids.append(ids[i])
+        self.size = need
+
+    def remove(self, ids: List[Any]) -> None:
+        for id_ in ids:
+            p = self.pos.pop(id_, None)
+            if p is not None:
+                self.cells[p] = -1
+
+    def search(self, q: np.ndarray, k: int) -> List[Tuple[Any, float]]:
+        if not self.pos:
+            return []
+        q = _unit(np.asarray(q, dtype=np.float32).reshape(-1))
+        cells = self.cells[:self.size]
+        if len(self.centroids) > self.nprobe:
+            probe = np.argpartition(-(self.centroids @ q), self.nprobe)[:self.nprobe]
+            cand = np.flatnonzero(np.isin(cells, probe))
+        else:
+            cand = np.flatnonzero(cells >= 0)
+        if not len(cand):
+            return []
+        scores = self.vecs[cand] @ q
+        k = min(k, len(cand))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.ids[cand[i]], float(scores[i])) for i in top]
+
+COLUMNS = "id,case_name,jurisdiction,court_level,summary,holding,citation,outcome,tags,source_link,vector_embedding"
+
+class AnnMatcher:
+    """Library rows + IVFIndex, loaded at startup and refreshed like the citation index."""
+
+    def __init__(self):
+        self.index = IVFIndex(settings.EMBEDDING_DIM, settings.MATCH_ANN_NPROBE)
+        self.rows: Dict[Any, Dict[str, Any]] = {}
+        self.last_id: Optional[int] = None  # highest id read; ids are increasing integers (library.py)
+        self.full_at = 0.0
+        self.ready = False
+        self._lock = asyncio.Lock()
+
+    async def _read(self, after: Any) -> Tuple[List[Any], List[np.ndarray], Dict[Any, Dict[str, Any]], Any]:
+        ids, vecs, rows = [], [], {}
+        async for page in library_pages(COLUMNS, after):
+            for row in page:
+                vec = parse_vector(row.pop("vector_embedding", None), settings.EMBEDDING_DIM)
+                if vec is not None:
+                    ids.append(row["id"])
+                    vecs.append(vec)
+                    rows[row["id"]] = row
+            after = page[-1].get("id")
+        return ids, vecs, rows, after
+
+    async def refresh(self, full: bool = False) -> int:
+        async with self._lock:
+            full = full or not self.ready
+            ids, vecs, rows, after = await self._read(None if full else self.last_id)
+            if full:
+                index = IVFIndex(settings.EMBEDDING_DIM, settings.MATCH_ANN_NPROBE)
+                mat = np.stack(vecs) if vecs else np.zeros((0, settings.EMBEDDING_DIM), np.float32)
+                await asyncio.to_thread(index.build, ids, mat)  # k-means is CPU-bound
+                self.index, self.rows, self.full_at = index, rows, time.monotonic()
+            elif ids:
+                self.index.add(ids, np.stack(vecs))
+                self.rows.update(rows)
+            self.last_id = after if after is not None else self.last_id
+            self.ready = True
+            return len(ids)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                full = time.monotonic() - self.full_at >= settings.MATCH_ANN_FULL_EVERY
+                n = await self.refresh(full=full)
+                if n or full:
+                    log.info("ann index: %d rows (%s), %d total, %d cells",
+                             n, "full" if full else "new", len(self.index), len(self.index.centroids))
+            except Exception as e:
+                log.warning("ann index refresh failed: %s", e)
+            await asyncio.sleep(settings.MATCH_ANN_REFRESH)
+
+    def match(self, embedding: List[float], n: int) -> List[Dict[str, Any]]:
+        return [{**self.rows[id_], "similarity": score}
+                for id_, score in self.index.search(np.asarray(embedding, np.float32), n)]
+
+ann_matcher = AnnMatcher()
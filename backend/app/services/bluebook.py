@@ -12,6 +12,21 @@ def normalize_citation(cite: str) -> str:
     year = m.group(2)
     return f"{m.group(1)} ({year})" if year else m.group(1)
 
+# volume, reporter, page: "410 U.S. 113", "123 F. 3d 456", "5 F.Supp.2d 7"
+_KEY_RE = re.compile(r"\b(\d{1,4})\s+([A-Za-z][A-Za-z0-9.' ]*?)\s*(\d{1,6})\b")
+
+def citation_key(cite: str) -> str:
+    # Spacing/punctuation-insensitive lookup key, e.g. "123 F. 3d 456" -> "123 f3d 456".
+    m = _KEY_RE.search(cite or "")
+    if not m:
+        return " ".join((cite or "").lower().split())
+    reporter = re.sub(r"[^a-z0-9]", "", m.group(2).lower())
+    return f"{int(m.group(1))} {reporter} {int(m.group(3))}"
+
+def citation_keys(text: str) -> list[str]:
+    # Every citation in a field like "410 U.S. 113, 93 S. Ct. 705".
+    return [citation_key(m.group(0)) for m in _KEY_RE.finditer(text or "")]
+
 def filter_to_allowed_citations(text: str, allowed: list[str]) -> str:
     def repl(m):
         normalized = normalize_citation(m.group(0))
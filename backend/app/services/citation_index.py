@@ -0,0 +1,84 @@
+# backend/app/services/citation_index.py
+"""
+In-process citation index over federal_case_library.
+
+Generated motions may only cite cases from our own library (see rag.py), so
+most /citations/verify lookups can be answered from memory: every citation in
+the library is indexed by bluebook.citation_key(). New rows are pulled in by
+id every CITATION_INDEX_REFRESH seconds (integer ids only, see library.py); a
+full reload every CITATION_INDEX_FULL_EVERY seconds picks up edits and
+deletions.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.services.bluebook import citation_key, citation_keys
+from app.services.library import library_pages
+
+log = logging.getLogger(__name__)
+
+COLUMNS = "id,case_name,citation,source_link,court_level,jurisdiction,outcome"
+
+class CitationIndex:
+    def __init__(self):
+        self.by_key: Dict[str, Dict[str, Any]] = {}
+        self.last_id: Optional[int] = None  # highest id read; ids are increasing integers (library.py)
+        self.loaded_at: Optional[float] = None
+        self.full_at: float = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.by_key)
+
+    def lookup(self, cite: str) -> Optional[Dict[str, Any]]:
+        return self.by_key.get(citation_key(cite))
+
+    async def refresh(self, full: bool = False) -> int:
+        """Index rows added since the last refresh (or rebuild everything); returns rows read."""
+        async with self._lock:
+            full = full or self.loaded_at is None
+            by_key = {} if full else self.by_key
+            after = None if full else self.last_id
+            seen = 0
+            async for rows in library_pages(COLUMNS, after):
+                for row in rows:
+                    for key in citation_keys(row.get("citation") or ""):
+                        by_key[key] = row
+                seen += len(rows)
+                after = rows[-1].get("id")
+            # A rebuild is swapped in whole, so lookups never see half an index.
+            self.by_key, self.last_id, self.loaded_at = by_key, after, time.monotonic()
+            if full:
+                self.full_at = self.loaded_at
+            return seen
+
+    async def run(self) -> None:
+        """Background refresh loop, started from the app lifespan."""
+        while True:
+            try:
+                full = time.monotonic() - self.full_at >= settings.CITATION_INDEX_FULL_EVERY
+                n = await self.refresh(full=full)
+                if n:
+                    log.info("citation index: %d rows read (%s), %d citations", n, "full" if full else "new", len(self))
+            except Exception as e:
+                log.warning("citation index refresh failed: %s", e)
+            await asyncio.sleep(settings.CITATION_INDEX_REFRESH)
+
+citation_index = CitationIndex()
+
+def library_result(cite: str, row: Dict[str, Any]) -> dict:
+    # Same shape as lookup_citation(); "source" tells the two apart.
+    return {
+        "citation": cite,
+        "found": True,
+        "case_name": row.get("case_name"),
+        "date_filed": None,
+        "cluster": None,
+        "court": row.get("court_level") or row.get("jurisdiction"),
+        "url": row.get("source_link"),
+        "treatment": "unknown",
+        "source": "library",
+    }
@@ -1,6 +1,7 @@
 import os
 from typing import Literal, Tuple
 from app.config import settings
+from app.services.http_clients import client
 
 Provider = Literal["openai", "anthropic", "local"]
 
@@ -15,24 +16,17 @@ def choose_provider(prompt_tokens: int, latency_sensitive: bool = False) -> Prov
 async def llm_complete(system: str, user: str) -> str:
     prov = choose_provider(len(user.split()))
     if prov == "openai":
-        # lazy import to keep deps optional
-        import httpx, json
         model = "gpt-4o-mini"  # cheap + capable
-        async with httpx.AsyncClient(timeout=60) as c:
-            r = await c.post("https://api.openai.com/v1/chat/completions",
-                headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"},
-                json={"model": model, "messages":[{"role":"system","content":system},{"role":"user","content":user}],
-                      "temperature":0.2})
-            r.raise_for_status()
-            return r.json()["choices"][0]["message"]["content"]
+        r = await client("openai").post("/v1/chat/completions",
+            json={"model": model, "messages":[{"role":"system","content":system},{"role":"user","content":user}],
+                  "temperature":0.2})
+        r.raise_for_status()
+        return r.json()["choices"][0]["message"]["content"]
     elif prov == "anthropic":
-        import httpx
-        async with httpx.AsyncClient(timeout=60) as c:
-            r = await c.post("https://api.anthropic.com/v1/messages",
-                headers={"x-api-key": settings.ANTHROPIC_API_KEY, "anthropic-version":"2023-06-01"},
-                json={"model":"claude-3-haiku-20240307","max_tokens":800,"system":system,"messages":[{"role":"user","content":user}]})
-            r.raise_for_status()
-            return r.json()["content"][0]["text"]
+        r = await client("anthropic").post("/v1/messages",
+            json={"model":"claude-3-haiku-20240307","max_tokens":800,"system":system,"messages":[{"role":"user","content":user}]})
+        r.raise_for_status()
+        return r.json()["content"][0]["text"]
     else:
         # local fallback: echo/heuristic summarizer
         return user[:800]
\ No newline at end of file
@@ -1,14 +1,23 @@
-import httpx
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
 from app.config import settings
+from app.services.bluebook import citation_key
+from app.services.citation_index import citation_index, library_result
+from app.services.http_clients import client
+from app.utils.cache import TTLCache
 
 async def lookup_citation(cite: str) -> dict:
     # Simple search by citation string
-    url = f"{settings.COURTLISTENER_BASE}/opinions/"
     params = {"q": cite, "page_size": 1, "order_by": "dateFiled desc"}
-    async with httpx.AsyncClient(timeout=15) as c:
-        r = await c.get(url, params=params)
-        r.raise_for_status()
-        data = r.json()
+    r = await client("courtlistener").get("opinions/", params=params)
+    r.raise_for_status()
+    data = r.json()
     if not data.get("results"):
         return {"citation": cite, "found": False}
     top = data["results"][0]
@@ -24,4 +33,65 @@ async def lookup_citation(cite: str) -> dict:
         "treatment": "unknown"  # enhance with citator sources later
     }
 
-print("Scraper placeholder: call CourtListener, filter to plaintiff-won, insert into federal_case_library")
\ No newline at end of file
+print("Scraper placeholder: call CourtListener, filter to plaintiff-won, insert into federal_case_library")
+
+class CitationStore:
+    """Lookup results by citation_key() in SQLite, so they survive restarts."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS citations (key TEXT PRIMARY KEY, result TEXT NOT NULL, expires REAL NOT NULL)")
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[dict, float]]:
+        with self.lock:
+            row = self.db.execute("SELECT result, expires FROM citations WHERE key = ?", (key,)).fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        return json.loads(row[0]), row[1] - time.time()
+
+    def put(self, key: str, result: dict, ttl: float) -> None:
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO citations (key, result, expires) VALUES (?, ?, ?)",
+                            (key, json.dumps(result), time.time() + ttl))
+
+_store: Optional[CitationStore] = None
+# Front cache; also coalesces identical lookups that are in flight.
+_recent = TTLCache(settings.CITATION_CACHE_SIZE, settings.CITATION_CACHE_TTL)
+
+def _citation_store() -> CitationStore:
+    global _store
+    if _store is None:
+        _store = CitationStore(settings.CITATION_CACHE_PATH)
+    return _store
+
+async def _load(cite: str, key: str) -> Tuple[dict, float]:
+    hit = await asyncio.to_thread(_citation_store().get, key)
+    if hit:
+        return hit
+    res = await lookup_citation(cite)
+    ttl = settings.CITATION_CACHE_TTL if res.get("found") else settings.CITATION_MISS_TTL
+    await asyncio.to_thread(_citation_store().put, key, res, ttl)
+    return res, ttl
+
+async def verify_citation(cite: str) -> dict:
+    row = citation_index.lookup(cite)
+    if row:
+        return library_result(cite, row)
+    key = citation_key(cite)
+    try:
+        res, _ = await _recent.get_or_load(key, lambda: _load(cite, key), ttl_for=lambda v: v[1])
+    except Exception:
+        return {"citation": cite, "found": None, "error": "lookup failed"}  # not cached; retried next time
+    return {**res, "citation": cite}
+
+async def verify_citations(cites: List[str]) -> List[dict]:
+    """verify_citation for each, CITATION_VERIFY_CONCURRENCY at a time, in input order."""
+    sem = asyncio.Semaphore(max(1, settings.CITATION_VERIFY_CONCURRENCY))
+
+    async def one(c: str) -> dict:
+        async with sem:
+            return await verify_citation(c)
+
+    return await asyncio.gather(*(one(c) for c in cites))
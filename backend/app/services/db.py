@@ -0,0 +1,135 @@
+# backend/app/services/db.py
+"""
+Async data access for route handlers: PostgREST (and Storage) over the pooled
+"supabase" client from http_clients.py, instead of supabase-py, whose
+.execute() is synchronous and blocks the event loop for the whole round trip.
+
+Every call takes a timeout (default DB_TIMEOUT seconds) and raises
+httpx.HTTPStatusError / httpx.TimeoutException on failure. Tables use the
+service-role client unless declared with upstream="supabase_anon" (public
+endpoints, where RLS must apply).
+
+    rows = await federal_case_library.select(limit=200)
+    share = await secure_shares.first(where={"one_time_secret": secret})
+    await secure_shares.update({"redeemed": True}, where={"id": share["id"]})
+    states = await rpc("class_action_trigger_states", {"threshold": 10})
+"""
+from typing import Any, Dict, Generic, List, Optional, TypedDict, TypeVar, Union
+
+from app.config import settings
+from app.services.http_clients import client
+
+Row = Dict[str, Any]
+RowT = TypeVar("RowT", bound=Dict[str, Any])
+
+def _timeout(timeout: Optional[float]) -> float:
+    return settings.DB_TIMEOUT if timeout is None else timeout
+
+def _params(where: Optional[Dict[str, Any]], filters: Optional[Dict[str, str]]) -> Dict[str, str]:
+    # where = equality on columns; filters = raw PostgREST expressions, e.g. {"id": "gt.42"}.
+    params = {k: f"eq.{str(v).lower() if isinstance(v, bool) else v}" for k, v in (where or {}).items()}
+    params.update(filters or {})
+    return params
+
+class Table(Generic[RowT]):
+    def __init__(self, name: str, upstream: str = "supabase"):
+        self.name = name
+        self.path = f"/rest/v1/{name}"
+        self.upstream = upstream
+
+    async def select(self, columns: str = "*", *, where: Optional[Dict[str, Any]] = None,
+                     filters: Optional[Dict[str, str]] = None, order: Optional[str] = None, desc: bool = False,
+                     limit: Optional[int] = None, timeout: Optional[float] = None) -> List[RowT]:
+        params = {"select": columns, **_params(where, filters)}
+        if order:
+            params["order"] = f"{order}.desc" if desc else order
+        if limit is not None:
+            params["limit"] = str(limit)
+        r = await client(self.upstream).get(self.path, params=params, timeout=_timeout(timeout))
+        r.raise_for_status()
+        return r.json()
+
+    async def first(self, columns: str = "*", **kw: Any) -> Optional[RowT]:
+        rows = await self.select(columns, limit=1, **kw)
+        return rows[0] if rows else None
+
+    async def count(self, *, where: Optional[Dict[str, Any]] = None, filters: Optional[Dict[str, str]] = None,
+                    timeout: Optional[float] = None) -> int:
+        r = await client(self.upstream).get(
+            self.path, params={"select": "id", "limit": "0", **_params(where, filters)},
+            headers={"Prefer": "count=exact"}, timeout=_timeout(timeout))
+        r.raise_for_status()
+        total = r.headers.get("Content-Range", "*/0").rpartition("/")[2]
+        return int(total) if total.isdigit() else 0
+
+    async def _write(self, method: str, body: Any, prefer: List[str], params: Dict[str, str],
+                     returning: str, timeout: Optional[float]) -> List[RowT]:
+        prefer = prefer + [f"return={returning}"]
+        r = await client(self.upstream).request(method, self.path, json=body, params=params,
+                                                headers={"Prefer": ",".join(prefer)}, timeout=_timeout(timeout))
+        r.raise_for_status()
+        return r.json() if returning == "representation" and r.content else []
+
+    async def insert(self, rows: Union[Row, List[Row]], *, returning: str = "representation",
+                     timeout: Optional[float] = None) -> List[RowT]:
+        return await self._write("POST", rows, [], {}, returning, timeout)
+
+    async def upsert(self, rows: Union[Row, List[Row]], *, on_conflict: Optional[str] = None,
+                     returning: str = "representation", timeout: Optional[float] = None) -> List[RowT]:
+        params = {"on_conflict": on_conflict} if on_conflict else {}
+        return await self._write("POST", rows, ["resolution=merge-duplicates"], params, returning, timeout)
+
+    async def update(self, values: Row, *, where: Dict[str, Any], filters: Optional[Dict[str, str]] = None,
+                     returning: str = "minimal", timeout: Optional[float] = None) -> List[RowT]:
+        # where is required: PostgREST would otherwise update every row.
+        return await self._write("PATCH", values, [], _params(where, filters), returning, timeout)
+
+    async def delete(self, *, where: Dict[str, Any], returning: str = "minimal",
+                     timeout: Optional[float] = None) -> List[RowT]:
+        return await self._write("DELETE", None, [], _params(where, None), returning, timeout)
+
+async def rpc(name: str, args: Optional[Row] = None, timeout: Optional[float] = None) -> Any:
+    r = await client("supabase").post(f"/rest/v1/rpc/{name}", json=args or {}, timeout=_timeout(timeout))
+    r.raise_for_status()
+    return r.json()
+
+async def signed_url(bucket: str, path: str, expires_in: int, timeout: Optional[float] = None) -> Optional[str]:
+    """Absolute signed GET URL for a Storage object (what supabase-py's create_signed_url returns as "signedURL")."""
+    r = await client("supabase").post(f"/storage/v1/object/sign/{bucket}/{path}",
+                                      json={"expiresIn": expires_in}, timeout=_timeout(timeout))
+    r.raise_for_status()
+    url = r.json().get("signedURL")
+    return f"{settings.SUPABASE_URL.rstrip('/')}/storage/v1/{url.lstrip('/')}" if url else None
+
+# -------------------------
+# Tables
+# -------------------------
+class SecureShare(TypedDict, total=False):
+    id: Any
+    motion_id: Any
+    one_time_secret: str
+    expires_at: Optional[str]
+    redeemed: bool
+
+class GeneratedMotion(TypedDict, total=False):
+    id: Any
+    pdf_path: Optional[str]
+
+class WebAuthnCredential(TypedDict, total=False):
+    id: Any
+    user_id: str
+    credential_id: str
+    public_key: str
+    sign_count: int
+    transports: Optional[List[str]]
+
+federal_case_library: Table[Row] = Table("federal_case_library")
+motion_templates: Table[Row] = Table("motion_templates")
+secure_shares: Table[SecureShare] = Table("secure_shares")
+generated_motions: Table[GeneratedMotion] = Table("generated_motions")
+user_cases: Table[Row] = Table("user_cases")
+webauthn_credentials: Table[WebAuthnCredential] = Table("webauthn_credentials")
+doh_child_support_metrics: Table[Row] = Table("doh_child_support_metrics")
+petition_signatures: Table[Row] = Table("petition_signatures", upstream="supabase_anon")
+v_public_metrics: Table[Row] = Table("v_public_metrics")
+v_state_activity: Table[Row] = Table("v_state_activity")
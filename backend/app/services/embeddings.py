@@ -1,16 +1,44 @@
+import hashlib
+from array import array
 from typing import List
 from app.config import settings
+from app.services.http_clients import client
+from app.utils.cache import TTLCache
+from app.utils.embed_batching import embed_in_batches
 
-async def embed_texts(texts: List[str]) -> List[List[float]]:
+MODEL = "text-embedding-3-small"
+
+# text hash -> float32 array; a 1536-d list of Python floats is ~50 KB, the array ~6 KB.
+_cache = TTLCache(settings.EMBED_CACHE_SIZE, settings.EMBED_CACHE_TTL)
+
+def _key(text: str) -> str:
+    return hashlib.sha256(f"{MODEL}\0{text}".encode()).hexdigest()
+
+async def openai_embed_texts(texts: List[str]) -> List[List[float]]:
+    return await embed_in_batches(
+        client("openai"), "/v1/embeddings", MODEL, texts,
+        max_tokens=settings.EMBED_MAX_TOKENS, max_inputs=settings.EMBED_MAX_INPUTS,
+        concurrency=settings.EMBED_CONCURRENCY, retries=settings.EMBED_MAX_RETRIES)
+
+async def _embed(texts: List[str]) -> List[List[float]]:
     # Try OpenAI first
     if settings.OPENAI_API_KEY:
-        import httpx
-        async with httpx.AsyncClient(timeout=60) as c:
-            r = await c.post("https://api.openai.com/v1/embeddings",
-                headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"},
-                json={"model":"text-embedding-3-small","input":texts})
-            r.raise_for_status()
-            return [d["embedding"] for d in r.json()["data"]]
+        return await openai_embed_texts(texts)
     # TODO: add local embedding model (e.g., sentence-transformers) if you host it.
     # Minimal deterministic fallback:
-    return [[hash(t) % 1000 / 1000.0] * settings.EMBEDDING_DIM for t in texts]
\ No newline at end of file
+    return [[hash(t) % 1000 / 1000.0] * settings.EMBEDDING_DIM for t in texts]
+
+async def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embeddings for texts, in order. Cached by text hash; only distinct misses go to the provider, in one call."""
+    if not texts:
+        return []
+    keys = [_key(t) for t in texts]
+    found = {k: v for k in set(keys) if (v := _cache.get(k)) is not None}
+    _cache.hits += len(found)
+    missing = {k: t for k, t in zip(keys, texts) if k not in found}
+    if missing:
+        _cache.misses += len(missing)
+        for k, emb in zip(missing, await _embed(list(missing.values()))):
+            found[k] = array("f", emb)
+            _cache.set(k, found[k])
+    return [found[k].tolist() for k in keys]
@@ -0,0 +1,95 @@
+# backend/app/services/http_clients.py
+"""
+One pooled httpx.AsyncClient per upstream, shared by every request.
+
+Clients are opened in the app lifespan (see main.py) and closed on shutdown,
+so keep-alive connections (and their TLS sessions) are reused instead of
+being set up per call. Outside the app (scripts, tests) a client is created
+on first use.
+"""
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.config import settings
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2 = settings.HTTP2_ENABLED
+except ImportError:
+    HTTP2 = False
+
+def _upstreams() -> Dict[str, Dict[str, Any]]:
+    pool = settings.HTTP_POOL_SIZE
+    supa_key = settings.SUPABASE_SERVICE_ROLE_KEY
+    return {
+        "supabase": dict(
+            base_url=settings.SUPABASE_URL,
+            headers={"apikey": supa_key, "Authorization": f"Bearer {supa_key}"},
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=pool * 2, max_keepalive_connections=pool),
+        ),
+        # Anon key: public, unauthenticated writes stay subject to RLS.
+        "supabase_anon": dict(
+            base_url=settings.SUPABASE_URL,
+            headers={"apikey": settings.SUPABASE_ANON_KEY, "Authorization": f"Bearer {settings.SUPABASE_ANON_KEY}"},
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool // 2),
+        ),
+        "openai": dict(
+            base_url="https://api.openai.com",
+            headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY}"} if settings.OPENAI_API_KEY else {},
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool // 2),
+        ),
+        "anthropic": dict(
+            base_url="https://api.anthropic.com",
+            headers={"x-api-key": settings.ANTHROPIC_API_KEY or "", "anthropic-version": "2023-06-01"},
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool // 2),
+        ),
+        "courtlistener": dict(
+            base_url=settings.COURTLISTENER_BASE,
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool // 2),
+        ),
+        "vault": dict(
+            base_url=settings.VAULT_ADDR,
+            headers={"X-Vault-Token": settings.VAULT_TOKEN} if settings.VAULT_TOKEN else {},
+            timeout=httpx.Timeout(5.0),
+            limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool // 2),
+        ),
+        # Public data feeds (routes/doh.py) use absolute URLs.
+        "public": dict(
+            timeout=httpx.Timeout(45.0, connect=10.0),
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=2),
+        ),
+    }
+
+class ClientRegistry:
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._config: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        c = self._clients.get(name)
+        if c is None or c.is_closed:
+            if self._config is None:
+                self._config = _upstreams()
+            c = self._clients[name] = httpx.AsyncClient(http2=HTTP2, **self._config[name])
+        return c
+
+    def start(self) -> None:
+        self._config = _upstreams()
+        for name in self._config:
+            self.get(name)
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for c in clients.values():
+            await c.aclose()
+
+clients = ClientRegistry()
+
+def client(name: str) -> httpx.AsyncClient:
+    return clients.get(name)
@@ -0,0 +1,35 @@
+# backend/app/services/library.py
+"""
+Keyset paging over federal_case_library, shared by the citation index and the
+ANN matcher.
+
+Both refresh incrementally with id > last_id, which assumes `id` is an
+integer identity (bigserial) column: a row inserted later gets a larger id.
+library_pages() checks the type and raises instead of silently paging
+through, e.g., UUIDs, where new rows would land anywhere in the order. Rows
+whose smaller id commits after a larger one was read, edits and deletions are
+only picked up by the periodic full reloads.
+"""
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from app.services.db import federal_case_library
+
+PAGE = 1000
+
+def check_ids(rows: List[Dict[str, Any]]) -> None:
+    for row in rows:
+        if type(row.get("id")) is not int:
+            raise TypeError(f"federal_case_library.id must be an integer identity column for keyset paging, "
+                            f"got {row.get('id')!r}")
+
+async def library_pages(select: str, after: Optional[int] = None, page: int = PAGE) -> AsyncIterator[List[Dict[str, Any]]]:
+    """federal_case_library rows with id > after, in id order, one PostgREST page at a time (keyset, no OFFSET)."""
+    while True:
+        rows = await federal_case_library.select(
+            select, filters={"id": f"gt.{after}"} if after is not None else None, order="id", limit=page)
+        if rows:
+            check_ids(rows)
+            yield rows
+            after = rows[-1]["id"]
+        if len(rows) < page:
+            return
@@ -0,0 +1,89 @@
+# backend/app/services/public_metrics.py
+"""
+Stale-while-revalidate snapshot behind GET /metrics/public.
+
+The landing page is the busiest unauthenticated endpoint, so requests never
+query v_public_metrics / v_state_activity themselves: run() rebuilds the
+snapshot every METRICS_REFRESH seconds and requests serve the cached, pre-
+serialized body with an ETag. If the snapshot is older than two intervals
+(the last refresh failed), it is still served and one refresh is kicked off; at
+most one refresh is ever in flight, and aclose() cancels it at shutdown.
+Only the very first request after startup can wait on the database.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+
+from app.config import settings
+from app.services.db import v_public_metrics, v_state_activity
+
+log = logging.getLogger(__name__)
+
+class Snapshot:
+    __slots__ = ("body", "etag", "built_at")
+
+    def __init__(self, payload: dict):
+        self.body = json.dumps(payload, separators=(",", ":"), default=str).encode()
+        self.etag = '"%s"' % hashlib.sha256(self.body).hexdigest()[:32]
+        self.built_at = time.monotonic()
+
+class PublicMetrics:
+    def __init__(self):
+        self.snapshot: Optional[Snapshot] = None
+        self._inflight: Optional[asyncio.Future] = None
+
+    async def _build(self) -> Snapshot:
+        totals, heat = await asyncio.gather(v_public_metrics.first(), v_state_activity.select())
+        snap = Snapshot({"totals": totals or {}, "heatmap": heat})
+        if self.snapshot and snap.etag == self.snapshot.etag:
+            self.snapshot.built_at = snap.built_at  # unchanged: keep the object, just mark it fresh
+            return self.snapshot
+        self.snapshot = snap
+        return snap
+
+    def refresh(self) -> "asyncio.Future[Snapshot]":
+        """Start a rebuild, or join the one in flight."""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._build())
+            self._inflight.add_done_callback(self._done)
+        return self._inflight
+
+    @staticmethod
+    def _done(f: asyncio.Future) -> None:
+        if not f.cancelled() and f.exception() is not None:
+            log.warning("public metrics refresh failed: %s", f.exception())
+
+    async def get(self) -> Snapshot:
+        snap = self.snapshot
+        if snap is None:
+            return await asyncio.shield(self.refresh())
+        if time.monotonic() - snap.built_at >= 2 * settings.METRICS_REFRESH:
+            self.refresh()  # serve stale now, revalidate in the background
+        return snap
+
+    async def run(self) -> None:
+        """Background refresh loop, started from the app lifespan."""
+        while True:
+            try:
+                await self.refresh()  # cancelling run() cancels the build with it
+            except Exception:
+                pass  # logged by _done; keep serving the last snapshot
+            await asyncio.sleep(settings.METRICS_REFRESH)
+
+    async def aclose(self) -> None:
+        """Cancel a refresh still in flight (e.g. one started by get()), before the HTTP clients close."""
+        fut, self._inflight = self._inflight, None
+        if fut is not None and not fut.done():
+            fut.cancel()
+            await asyncio.gather(fut, return_exceptions=True)
+
+public_metrics = PublicMetrics()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
@@ -0,0 +1,74 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    In-process LRU map with per-entry expiry. get_or_load() is single-flight:
+    concurrent misses for a key share one load, which runs in its own task so
+    a cancelled caller does not cancel it for the others. Failed loads are not
+    cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires, value = item
+        if expires <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or everything when key is None. A load already in flight is not cached."""
+        if key is None:
+            self._data.clear()
+            self._inflight.clear()
+        else:
+            self._data.pop(key, None)
+            self._inflight.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[Any]],
+                          ttl_for: Optional[Callable[[Any], Optional[float]]] = None) -> Any:
+        """Cached value for key, else the result of load(); ttl_for(value) may pick the TTL (e.g. shorter for misses)."""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(load())
+            self._inflight[key] = fut
+
+            def done(f: asyncio.Future) -> None:
+                if self._inflight.get(key) is not f:
+                    return  # invalidated while loading
+                del self._inflight[key]
+                if not f.cancelled() and f.exception() is None:
+                    self.set(key, f.result(), ttl_for(f.result()) if ttl_for else None)
+
+            fut.add_done_callback(done)
+        return await asyncio.shield(fut)
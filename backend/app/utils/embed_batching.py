@@ -0,0 +1,92 @@
+# backend/app/utils/embed_batching.py
+"""
+Token-budgeted, retrying calls to an OpenAI-style /embeddings endpoint.
+
+Shared by the API (services/embeddings.py) and the scraper
+(analytics/scrap_courtlistener.py, which puts backend/ on sys.path), so it only
+depends on httpx and takes every limit as an argument instead of reading
+app.config.
+"""
+import asyncio
+import logging
+import random
+from typing import List, Optional, Tuple
+
+import httpx
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def approx_tokens(text: str) -> int:
+    # No tokenizer dependency; ~3 chars/token over-estimates English and legal text.
+    return len(text) // 3 + 1
+
+def pack_batches(texts: List[str], max_tokens: int, max_inputs: int) -> List[Tuple[int, int]]:
+    """Split `texts` into consecutive [start, end) spans under both per-request limits.
+
+    A single text over max_tokens still gets a span of its own; the API decides
+    whether it fits.
+    """
+    spans: List[Tuple[int, int]] = []
+    start, tokens = 0, 0
+    for i, t in enumerate(texts):
+        n = approx_tokens(t)
+        if i > start and (tokens + n > max_tokens or i - start >= max_inputs):
+            spans.append((start, i))
+            start, tokens = i, 0
+        tokens += n
+    if start < len(texts):
+        spans.append((start, len(texts)))
+    return spans
+
+async def embed_in_batches(c: httpx.AsyncClient, url: str, model: str, texts: List[str], *,
+                           max_tokens: int, max_inputs: int, concurrency: int, retries: int,
+                           log: Optional[logging.Logger] = None) -> List[List[float]]:
+    """
+    Embed `texts` as pack_batches() sub-batches, `concurrency` requests at a
+    time. A sub-batch that hits 429/5xx/network errors is retried alone with
+    jittered backoff (or Retry-After); one rejected with 400 (e.g. the token
+    estimate was low) is split in half. Results come back in input order.
+    """
+    out: List[Optional[List[float]]] = [None] * len(texts)
+    if not texts:
+        return []
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def post(lo: int, hi: int) -> None:
+        for attempt in range(retries + 1):
+            wait = None
+            async with sem:
+                try:
+                    r = await c.post(url, json={"model": model, "input": texts[lo:hi]})
+                except httpx.RequestError as e:
+                    err: Exception = e
+                else:
+                    if r.status_code == 400 and hi - lo > 1:
+                        break
+                    if r.status_code not in RETRY_STATUSES:
+                        r.raise_for_status()
+                        for j, d in enumerate(r.json()["data"]):
+                            out[lo + d.get("index", j)] = d["embedding"]
+                        return
+                    err = httpx.HTTPStatusError(f"HTTP {r.status_code}", request=r.request, response=r)
+                    ra = r.headers.get("Retry-After")
+                    wait = float(ra) if ra and ra.replace(".", "", 1).isdigit() else None
+            if attempt == retries:
+                raise err
+            wait = wait or min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+            if log:
+                log.warning("Embeddings sub-batch [%d:%d] failed (%s); retry in %.1fs…", lo, hi, err, wait)
+            await asyncio.sleep(wait)
+        mid = (lo + hi) // 2
+        if log:
+            log.warning("Embeddings sub-batch [%d:%d] rejected; splitting", lo, hi)
+        await asyncio.gather(post(lo, mid), post(mid, hi))
+
+    tasks = [asyncio.ensure_future(post(lo, hi)) for lo, hi in pack_batches(texts, max_tokens, max_inputs)]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        raise
+    return out
@@ -0,0 +1,19 @@
+# backend/app/utils/vectors.py
+"""
+pgvector values as PostgREST returns them. Shared with
+analytics/case_snapshot.py, so numpy is the only dependency.
+"""
+import json
+from typing import Any, Optional
+
+import numpy as np
+
+def parse_vector(v: Any, dim: int) -> Optional[np.ndarray]:
+    """float32 array for a pgvector value ("[0.1,0.2,...]" text or a list); None if missing, malformed or not dim long."""
+    if v is None:
+        return None
+    try:
+        arr = np.array(json.loads(v) if isinstance(v, str) else v, dtype=np.float32)
+    except (ValueError, TypeError):
+        return None
+    return arr if arr.ndim == 1 and arr.size == dim else None
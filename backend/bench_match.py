@@ -0,0 +1,117 @@
+# backend/bench_match.py
+"""
+Recall / latency benchmark for the in-process ANN match backend
+---------------------------------------------------------------
+Compares IVFIndex top-k (services/ann.py) with exact cosine search over a
+synthetic clustered corpus, or with the live match_federal_cases RPC over
+the real library (--live). Fails (exit 1) if mean recall@k drops below
+--min-recall, so it can gate changes to MATCH_ANN_NPROBE or the index.
+
+Usage (from backend/):
+  python bench_match.py                          # synthetic, 20k x 1536
+  python bench_match.py --rows 50000 --nprobe 4
+  python bench_match.py --live --queries 100     # needs SUPABASE_* env
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+def synthetic(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    # Embeddings of legal text cluster by topic; uniform noise would make every index look bad.
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    x = centers[rng.integers(0, clusters, rows)] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+def queries_from(x: np.ndarray, n: int, seed: int) -> np.ndarray:
+    # "Facts" texts land near, not on, library rows.
+    rng = np.random.default_rng(seed + 1)
+    q = x[rng.integers(0, len(x), n)] + 0.5 * rng.standard_normal((n, x.shape[1])).astype(np.float32) / np.sqrt(x.shape[1])
+    return q / np.linalg.norm(q, axis=1, keepdims=True)
+
+def exact(x: np.ndarray, q: np.ndarray, k: int) -> List[int]:
+    s = x @ q
+    top = np.argpartition(-s, k - 1)[:k]
+    return top[np.argsort(-s[top])].tolist()
+
+def summarize(name: str, lat: List[float], recalls: List[float]) -> None:
+    ms = np.array(lat) * 1000
+    r = f"  recall@k {np.mean(recalls):.3f} (min {np.min(recalls):.2f})" if recalls else ""
+    print(f"{name:<8} p50 {np.percentile(ms, 50):7.2f} ms  p99 {np.percentile(ms, 99):7.2f} ms{r}")
+
+def run_synthetic(args) -> float:
+    from app.services.ann import IVFIndex
+    x = synthetic(args.rows, args.dim, args.clusters, args.seed)
+    q = queries_from(x, args.queries, args.seed)
+    index = IVFIndex(args.dim, nprobe=args.nprobe)
+    t0 = time.perf_counter()
+    index.build(list(range(len(x))), x)
+    print(f"corpus: {len(x)} x {args.dim}, {len(index.centroids)} cells, nprobe {args.nprobe}, "
+          f"build {time.perf_counter() - t0:.1f}s")
+
+    lat_exact, lat_ann, recalls = [], [], []
+    for qi in q:
+        t = time.perf_counter(); truth = exact(x, qi, args.k); lat_exact.append(time.perf_counter() - t)
+        t = time.perf_counter(); got = index.search(qi, args.k); lat_ann.append(time.perf_counter() - t)
+        recalls.append(len(set(truth) & {i for i, _ in got}) / args.k)
+    summarize("exact", lat_exact, [])
+    summarize("ivf", lat_ann, recalls)
+    return float(np.mean(recalls))
+
+async def run_live(args) -> float:
+    from app.config import settings
+    from app.services.ann import AnnMatcher
+    from app.services.http_clients import client, clients
+
+    settings.MATCH_ANN_NPROBE = args.nprobe
+    matcher = AnnMatcher()
+    t0 = time.perf_counter()
+    await matcher.refresh(full=True)
+    index = matcher.index
+    print(f"library: {len(index)} rows, {len(index.centroids)} cells, nprobe {args.nprobe}, "
+          f"load+build {time.perf_counter() - t0:.1f}s")
+    if not len(index):
+        raise SystemExit("federal_case_library has no embedded rows")
+
+    q = queries_from(index.vecs[:index.size][index.cells[:index.size] >= 0], args.queries, args.seed)
+    lat_rpc, lat_ann, recalls = [], [], []
+    for qi in q:
+        t = time.perf_counter()
+        r = await client("supabase").post("/rest/v1/rpc/match_federal_cases", json={"query": qi.tolist(), "n": args.k})
+        r.raise_for_status()
+        lat_rpc.append(time.perf_counter() - t)
+        truth = {row.get("id") for row in r.json()}
+        t = time.perf_counter(); got = matcher.match(qi.tolist(), args.k); lat_ann.append(time.perf_counter() - t)
+        recalls.append(len(truth & {row["id"] for row in got}) / max(1, len(truth)))
+    await clients.aclose()
+    summarize("rpc", lat_rpc, [])
+    summarize("ivf", lat_ann, recalls)
+    return float(np.mean(recalls))
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark ANN match recall and latency.")
+    ap.add_argument("--live", action="store_true", help="Compare with the match_federal_cases RPC on the real library.")
+    ap.add_argument("--rows", type=int, default=20000, help="Synthetic corpus size.")
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--clusters", type=int, default=200, help="Topic clusters in the synthetic corpus.")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--nprobe", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=1983)
+    ap.add_argument("--min-recall", type=float, default=0.95)
+    args = ap.parse_args()
+
+    recall = asyncio.run(run_live(args)) if args.live else run_synthetic(args)
+    if recall < args.min_recall:
+        print(f"FAIL: recall {recall:.3f} < {args.min_recall}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
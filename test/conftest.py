@@ -0,0 +1,25 @@
+import os
+import sys
+
+import httpx
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path[:0] = [os.path.join(ROOT, "backend"), os.path.join(ROOT, "analytics")]
+
+# backend/app/config.py requires these; nothing here talks to a real project.
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_ANON_KEY", "anon")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "service")
+
+@pytest.fixture
+def upstream():
+    """upstream(name, handler): route one pooled backend client (http_clients.client(name)) to an httpx handler."""
+    from app.services import http_clients
+
+    def install(name, handler):
+        http_clients.clients._clients[name] = httpx.AsyncClient(
+            base_url=os.environ["SUPABASE_URL"], transport=httpx.MockTransport(handler))
+
+    yield install
+    http_clients.clients._clients.clear()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+import scrap_courtlistener as sc
+
+class PgError(Exception):
+    """Shaped like postgrest's APIError: a `code` that is a SQLSTATE string, or an HTTP status from the gateway."""
+
+    def __init__(self, code):
+        super().__init__(f"error {code}")
+        self.code = code
+
+def rows(n):
+    return [{"citation": f"{i} F.4th 1", "summary": "x" * 200, "vector_embedding": [0.5] * 1536} for i in range(n)]
+
+class Sink:
+    def __init__(self, fail):
+        self.fail = fail
+        self.stored = []
+        self.batches = []
+
+    async def __call__(self, batch):
+        self.batches.append(len(batch))
+        err = self.fail(batch)
+        if err:
+            raise err
+        self.stored.extend(batch)
+        return len(batch)
+
+@pytest.fixture
+def sink(monkeypatch):
+    def install(fail):
+        s = Sink(fail)
+        monkeypatch.setattr(sc, "write_rows", s)
+        return s
+    return install
+
+def dead_rows(path):
+    return [json.loads(line)["row"]["citation"] for line in path.read_text().splitlines()]
+
+def test_error_kinds():
+    assert sc._write_error_kind(PgError(413)) == "too_big"
+    assert sc._write_error_kind(PgError("57014")) == "too_big"
+    assert sc._write_error_kind(PgError(503)) == "transient"
+    assert sc._write_error_kind(PgError("40001")) == "transient"
+    assert sc._write_error_kind(PgError("23502")) == "bad"
+
+def test_bad_row_is_bisected_out_and_dead_lettered(sink, tmp_path):
+    data = rows(40)
+    bad = data[17]["citation"]
+    s = sink(lambda batch: PgError("23502") if any(r["citation"] == bad for r in batch) else None)
+    dead = tmp_path / "dead.jsonl"
+    writer = sc.BatchWriter(concurrency=3, dead_letter=str(dead))
+
+    stored, failed = asyncio.run(writer.write(data))
+
+    assert stored == 39
+    assert [r["citation"] for r in failed] == [bad]
+    assert dead_rows(dead) == [bad]
+    assert sorted(r["citation"] for r in s.stored) == sorted(r["citation"] for r in data if r["citation"] != bad)
+    assert writer.splits > 0 and writer.dead == 1
+
+@pytest.mark.parametrize("code", [413, "57014"])
+def test_too_big_shrinks_batches_without_losing_rows(sink, tmp_path, code):
+    limit = 200 * 1024
+    s = sink(lambda batch: PgError(code) if sum(map(sc.row_bytes, batch)) > limit else None)
+    dead = tmp_path / "dead.jsonl"
+    writer = sc.BatchWriter(concurrency=2, max_bytes=1024 * 1024, dead_letter=str(dead))
+    data = rows(60)
+
+    stored, failed = asyncio.run(writer.write(data))
+
+    assert (stored, failed) == (60, [])
+    assert not dead.exists()
+    assert len(s.stored) == 60
+    assert writer.target < writer.max_bytes
+    # The shrunken target is what later writes are packed to.
+    assert all(sum(map(sc.row_bytes, b)) <= writer.target for b in writer.pack(rows(60)))
+
+def test_retry_dead_letter_round_trip(sink, tmp_path):
+    dead = tmp_path / "dead.jsonl"
+    data = rows(6)
+    flaky = {data[2]["citation"], data[4]["citation"]}
+    sink(lambda batch: PgError("23502") if any(r["citation"] in flaky for r in batch) else None)
+    writer = sc.BatchWriter(dead_letter=str(dead))
+    asyncio.run(writer.write(data))
+    assert sorted(dead_rows(dead)) == sorted(flaky)
+
+    flaky.discard(data[2]["citation"])
+    assert asyncio.run(sc.retry_dead_letter(writer)) == (1, 1)
+    assert dead_rows(dead) == [data[4]["citation"]]
+    assert not (tmp_path / "dead.jsonl.retrying").exists()
@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pytest
+
+import case_snapshot as cs
+
+DIM = 4
+
+def vec(i):
+    return "[" + ",".join(f"{i + k / 8}" for k in range(DIM)) + "]"
+
+def row(i, **kw):
+    r = {"id": i, "case_name": f"Case {i}", "citation": f"{i} F.4th 1", "tags": ["a", "b"],
+         "vector_embedding": vec(i), "updated_at": f"2024-01-{i:02d}T00:00:00+00:00"}
+    r.update(kw)
+    return r
+
+def test_rows_round_trip_with_null_vectors():
+    rows = [row(1), row(2, vector_embedding=None), row(3, vector_embedding="[1,2]"), row(4, tags=None)]
+    table = cs.rows_to_table(rows, DIM)
+    assert table.schema.field("id").type == pa.int64()
+    assert table.schema.field(cs.VECTOR).type == pa.list_(pa.float32(), DIM)
+
+    back = cs.batch_to_rows(table.to_batches()[0], keep_ids=True)
+    assert [r["id"] for r in back] == [1, 2, 3, 4]
+    assert json.loads(back[0][cs.VECTOR]) == json.loads(vec(1))
+    assert back[1][cs.VECTOR] is None and back[2][cs.VECTOR] is None  # missing and wrong-dim
+    assert back[3]["tags"] is None and back[0]["tags"] == ["a", "b"]
+    assert "id" not in cs.batch_to_rows(table.to_batches()[0], keep_ids=False)[0]
+
+def test_sliced_ipc_batches_keep_their_own_vectors(tmp_path):
+    rows = [row(i, vector_embedding=None if i == 5 else vec(i)) for i in range(1, 11)]
+    name = cs.write_part(tmp_path, 1, cs.rows_to_table(rows, DIM), "arrow")
+
+    batches = list(cs.iter_batches(tmp_path / name, 3))
+    assert [b.num_rows for b in batches] == [3, 3, 3, 1]
+    back = [r for b in batches for r in cs.batch_to_rows(b, keep_ids=True)]
+    assert [r["id"] for r in back] == list(range(1, 11))
+    for r in back:
+        expected = None if r["id"] == 5 else json.loads(vec(r["id"]))
+        assert (r[cs.VECTOR] and json.loads(r[cs.VECTOR])) == expected
+
+class Query:
+    """The supabase-py query builder calls fetch_pages makes, applied to in-memory rows."""
+
+    def __init__(self, rows, log):
+        self.rows, self.log = rows, log
+        self.calls, self.keys = [], []
+
+    def table(self, name):
+        return Query(self.rows, self.log)
+
+    def select(self, cols):
+        return self
+
+    def gt(self, col, v):
+        self.calls.append(("gt", col, v))
+        self.rows = [r for r in self.rows if r[col] > v]
+        return self
+
+    def or_(self, expr):
+        self.calls.append(("or", expr))
+        by, rest = expr.split(".gt.", 1)
+        after = json.loads(rest.split(",", 1)[0])
+        after_id = int(expr.rsplit("id.gt.", 1)[1].rstrip(")"))
+        self.rows = [r for r in self.rows if r[by] > after or (r[by] == after and r["id"] > after_id)]
+        return self
+
+    def order(self, col):
+        self.keys.append(col)
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    def execute(self):
+        self.log.append(self.calls)
+        rows = sorted(self.rows, key=lambda r: [r[k] for k in self.keys])
+        return SimpleNamespace(data=rows[:self.n])
+
+def test_keyset_filter_pages_ties_on_the_update_column(monkeypatch):
+    same = "2024-02-01T00:00:00+00:00"
+    rows = [row(i, updated_at=same) for i in range(1, 6)] + [row(6)]
+    log = []
+    monkeypatch.setattr(cs, "get_sb", lambda: Query(rows, log))
+
+    pages = [[r["id"] for r in p] for p in cs.fetch_pages("updated_at", None, None, page_size=2)]
+
+    assert pages == [[6, 1], [2, 3], [4, 5]]
+    assert log[0] == []
+    assert log[1] == [("or", f'updated_at.gt."{same}",and(updated_at.eq."{same}",id.gt.1)')]
+    assert [r["id"] for p in cs.fetch_pages("id", None, 4, page_size=10) for r in p] == [5, 6]
+
+def test_extending_a_snapshot_with_another_watermark_column_fails(monkeypatch, tmp_path):
+    monkeypatch.setattr(cs, "get_sb", lambda: Query([row(1)], []))
+    args = argparse.Namespace(out=str(tmp_path), format="parquet", incremental=False, by=None,
+                              page_size=10, chunk_rows=10)
+    cs.export(args)
+    assert cs.load_manifest(tmp_path)["by"] == "id"
+
+    args.incremental, args.by = True, "updated_at"
+    with pytest.raises(SystemExit, match="watermarked by id"):
+        cs.export(args)
+    args.by = None
+    cs.export(args)  # no --by: keeps the snapshot's own column
+
+class Sink:
+    """upsert().execute() that stores rows by id; rows of `slow` ids take a while to land."""
+
+    def __init__(self, slow=()):
+        self.stored, self.statements, self.slow = {}, [], set(slow)
+        self.lock = threading.Lock()
+
+    def table(self, name):
+        return self
+
+    def upsert(self, rows, returning):
+        ids = [r["id"] for r in rows]
+        assert len(ids) == len(set(ids)), "one statement updates a row twice"
+        return SimpleNamespace(execute=lambda rows=rows: self._land(rows))
+
+    def _land(self, rows):
+        if self.slow & {r["id"] for r in rows}:
+            time.sleep(0.1)
+        with self.lock:
+            self.statements.append(len(rows))
+            self.stored.update({r["id"]: r["case_name"] for r in rows})
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_import_later_parts_and_rows_win(monkeypatch, tmp_path, fmt):
+    first = [row(i) for i in range(1, 5)]
+    # An updated_at export that read row 2 twice (edited mid-export), then a later part re-exporting row 1.
+    second = [row(2, case_name="Case 2 v2"), row(5), row(2, case_name="Case 2 v3")]
+    third = [row(1, case_name="Case 1 v2")]
+    manifest = {"table": cs.TABLE, "dim": DIM, "parts": []}
+    for n, rows in enumerate([first, second, third], 1):
+        manifest["parts"].append({"file": cs.write_part(tmp_path, n, cs.rows_to_table(rows, DIM), fmt)})
+    cs.save_manifest(tmp_path, manifest)
+
+    sink = Sink(slow={1})  # without a barrier between parts, the first part's row 1 would land last
+    monkeypatch.setattr(cs, "get_sb", lambda: sink)
+    asyncio.run(cs.load(argparse.Namespace(path=str(tmp_path), batch=2, concurrency=4, no_ids=False)))
+
+    assert sink.stored == {1: "Case 1 v2", 2: "Case 2 v3", 3: "Case 3", 4: "Case 4", 5: "Case 5"}
+    assert sum(sink.statements) == 4 + 2 + 1
@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+
+import scrap_courtlistener as sc
+
+def record(n, **kw):
+    fields = dict(case_name=f"Case {n}", jurisdiction="federal", court_level="Court of Appeals",
+                  summary=f"Opinion {n}.", holding="", citation=f"{n} F.4th 100", outcome="granted",
+                  tags=["civil rights"], source_link=f"https://www.courtlistener.com/opinion/{n}/",
+                  provider="courtlistener")
+    fields.update(kw)
+    return sc.Record(**fields)
+
+def stored_row(rec, **kw):
+    row = {f: v for f, v in sc.record_row(rec, []).items() if f in sc.CONTENT_FIELDS}
+    row.update(kw)
+    return row
+
+class FakeSupabase:
+    """The select(...).in_("citation", chunk).execute() chain fetch_fingerprints uses."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def table(self, name):
+        assert name == "federal_case_library"
+        return self
+
+    def select(self, columns):
+        assert "vector_embedding" not in columns
+        return self
+
+    def in_(self, column, values):
+        self.queries.append(list(values))
+        self._chunk = set(values)
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=[r for r in self.rows if r["citation"] in self._chunk])
+
+def test_classify_new_changed_unchanged(monkeypatch):
+    same, edited, fresh, round_trip = record(1), record(2), record(3), record(4, holding="")
+    db = FakeSupabase([
+        stored_row(same),
+        stored_row(edited, summary="An older summary."),
+        stored_row(round_trip, holding=None),  # NULL in the table, "" in the record
+    ])
+    monkeypatch.setattr(sc, "_sb", db)
+
+    kinds = asyncio.run(sc.classify_changes([same, edited, fresh, round_trip]))
+
+    assert kinds == ["unchanged", "changed", "new", "unchanged"]
+
+def test_fingerprints_are_fetched_in_url_sized_chunks(monkeypatch):
+    records = [record(n) for n in range(250)]
+    db = FakeSupabase([stored_row(r) for r in records])
+    monkeypatch.setattr(sc, "_sb", db)
+
+    kinds = asyncio.run(sc.classify_changes(records + records[:10]))  # repeats are looked up once
+
+    assert kinds == ["unchanged"] * 260
+    assert [len(q) for q in db.queries] == [100, 100, 50]
+
+def test_lookup_failure_upserts_everything(monkeypatch):
+    def boom():
+        raise RuntimeError("PostgREST unavailable")
+    monkeypatch.setattr(sc, "get_sb", boom)
+
+    assert asyncio.run(sc.classify_changes([record(1), record(2)])) == ["new", "new"]
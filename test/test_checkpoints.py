@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+
+import scrap_courtlistener as sc
+
+TOPICS = ["civil rights", "due process"]
+
+def day(d):
+    return datetime(2024, 6, d, tzinfo=timezone.utc)
+
+def test_bare_dates_parse_as_utc():
+    assert sc.parse_date("2024-06-05") == day(5)
+    assert sc.parse_date("2024-06-05T00:00:00Z") == day(5)
+
+def test_key_ignores_topic_order_and_case():
+    assert sc.CheckpointStore.key("cl", ["Due Process ", "civil rights"]) == sc.CheckpointStore.key("cl", TOPICS)
+    assert sc.CheckpointStore.key("cl", ["civil rights"]) != sc.CheckpointStore.key("cl", TOPICS)
+    assert sc.CheckpointStore.key("govinfo", TOPICS) != sc.CheckpointStore.key("cl", TOPICS)
+
+def test_finished_walk_raises_the_watermark_and_drops_its_cursor(tmp_path):
+    store = sc.CheckpointStore(str(tmp_path / "state.json"))
+    cp = store.get("cl", TOPICS)
+    for d in (5, 9, 7):
+        cp.seen(day(d))
+    cp.page_done("cursor-2")
+    store.commit(cp, TOPICS, snapshot=cp.snapshot())
+    assert store.state[cp.key]["walks"]["full"] == {"cursor": "cursor-2", "newest": day(9).isoformat()}
+
+    cp.page_done(None)
+    store.commit(cp, TOPICS)
+    store.save()
+    entry = sc.CheckpointStore(str(tmp_path / "state.json")).state[cp.key]
+    assert entry["watermark"] == day(9).isoformat() and entry["walks"] == {}
+
+    # A later walk that saw nothing newer keeps the watermark.
+    older = store.get("cl", TOPICS)
+    older.seen(day(1))
+    older.complete()
+    store.commit(older, TOPICS)
+    assert store.state[cp.key]["watermark"] == day(9).isoformat()
+
+def test_incremental_walks_start_at_the_watermark_and_resume_their_cursor(tmp_path):
+    store = sc.CheckpointStore(str(tmp_path / "state.json"))
+    store.state[store.key("cl", TOPICS)] = {
+        "watermark": day(9).isoformat(),
+        "walks": {"incremental": {"cursor": "p3", "newest": day(12).isoformat()},
+                  "full": {"cursor": "p7", "newest": day(9).isoformat()}}}
+
+    inc = store.get("cl", TOPICS, "incremental")
+    assert inc.since(day(1)) == day(9) and inc.since(day(10)) == day(10)
+    assert inc.cursor == "p3" and inc.newest == day(12)  # incremental walks always continue
+
+    full = store.get("cl", TOPICS, "full")
+    assert full.since(day(1)) == day(1) and full.cursor is None  # a fresh full walk...
+    assert store.get("cl", TOPICS, "full", resume=True).cursor == "p7"  # ...unless --resume
+
+def test_failed_or_frozen_walks_keep_their_last_snapshot(tmp_path):
+    store = sc.CheckpointStore(str(tmp_path / "state.json"))
+    cp = store.get("cl", TOPICS)
+    cp.seen(day(3))
+    cp.page_done("p1")
+    store.commit(cp, TOPICS, snapshot=cp.snapshot())
+
+    cp.failed = True
+    cp.page_done(None)
+    store.commit(cp, TOPICS)  # the end of a failed walk is not trusted
+    assert "watermark" not in store.state[cp.key]
+    assert store.state[cp.key]["walks"]["full"]["cursor"] == "p1"
+
+    cp.frozen = True
+    store.commit(cp, TOPICS, snapshot=(None, day(4)))
+    assert store.state[cp.key]["walks"]["full"]["cursor"] == "p1"
+
+def test_unreadable_state_file_is_ignored(tmp_path):
+    path = tmp_path / "state.json"
+    path.write_text("{not json")
+    store = sc.CheckpointStore(str(path))
+    assert store.state == {}
+    assert store.get("cl", TOPICS).watermark is None
@@ -0,0 +1,106 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services import courtlistener as cl
+from app.services.citation_index import CitationIndex
+from app.utils.cache import TTLCache
+
+class Library:
+    """federal_case_library behind PostgREST (id=gt.N, order=id, limit); rows can be added and deleted."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.requests = []
+
+    def __call__(self, req):
+        params = req.url.params
+        self.requests.append(params.get("id"))
+        rows = self.rows
+        if params.get("id"):
+            rows = [r for r in rows if r["id"] > int(params["id"][len("gt."):])]
+        return httpx.Response(200, json=rows[:int(params["limit"])])
+
+class CourtListener:
+    def __init__(self, found=(), fail=False):
+        self.found = set(found)
+        self.fail = fail
+        self.queries = []
+
+    def __call__(self, req):
+        q = req.url.params["q"]
+        self.queries.append(q)
+        if self.fail:
+            return httpx.Response(502)
+        results = [{"case_name": f"Case for {q}", "absolute_url": "/opinion/1/"}] if q in self.found else []
+        return httpx.Response(200, json={"results": results})
+
+ROE = {"id": 1, "case_name": "Roe v. Wade", "citation": "410 U.S. 113, 93 S. Ct. 705", "source_link": "https://x.test/roe"}
+DOE = {"id": 2, "case_name": "Doe v. Bolton", "citation": "410 U.S. 179", "source_link": "https://x.test/doe"}
+
+@pytest.fixture
+def verify(monkeypatch, tmp_path, upstream):
+    """verify_citation() with an empty index, a fresh front cache and a temp CitationStore."""
+    index = CitationIndex()
+    monkeypatch.setattr(cl, "citation_index", index)
+    monkeypatch.setattr(cl, "_recent", TTLCache(100, 60))
+    monkeypatch.setattr(cl, "_store", cl.CitationStore(str(tmp_path / "citations.sqlite3")))
+    remote = CourtListener(found={"5 U.S. 137"})
+    upstream("courtlistener", remote)
+    return index, remote
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_index_resolves_every_citation_of_a_row_and_refreshes_by_id(upstream):
+    library = Library([ROE])
+    upstream("supabase", library)
+    index = CitationIndex()
+    assert run(index.refresh()) == 1
+    assert index.lookup("93 S.Ct. 705")["case_name"] == index.lookup("410 U. S. 113")["case_name"] == "Roe v. Wade"
+
+    library.rows.append(DOE)
+    assert run(index.refresh()) == 1
+    assert library.requests[-1] == "gt.1" and index.lookup("410 U.S. 179")["id"] == 2
+
+    library.rows.remove(ROE)  # deletions are only seen by a full reload
+    assert index.lookup("410 U.S. 113")
+    run(index.refresh(full=True))
+    assert index.lookup("410 U.S. 113") is None and len(index) == 1
+
+def test_index_hit_never_calls_courtlistener(verify, upstream):
+    index, remote = verify
+    upstream("supabase", Library([ROE]))
+    run(index.refresh())
+    res = run(cl.verify_citation("410 U.S. 113"))
+    assert res["found"] and res["source"] == "library" and res["case_name"] == "Roe v. Wade"
+    assert remote.queries == []
+
+def test_miss_calls_courtlistener_once_then_the_store_answers(verify, monkeypatch):
+    _, remote = verify
+    for _ in range(2):
+        assert run(cl.verify_citation("5 U.S. 137"))["found"] is True
+    assert remote.queries == ["5 U.S. 137"]
+
+    monkeypatch.setattr(cl, "_recent", TTLCache(100, 60))  # a restart keeps only the SQLite store
+    res = run(cl.verify_citation("5 U. S. 137"))  # same citation_key
+    assert res["found"] is True and res["citation"] == "5 U. S. 137"
+    assert remote.queries == ["5 U.S. 137"]
+
+def test_negative_results_are_cached_with_the_miss_ttl(verify, monkeypatch):
+    _, remote = verify
+    assert run(cl.verify_citation("999 F.4th 1"))["found"] is False
+    monkeypatch.setattr(cl, "_recent", TTLCache(100, 60))
+    assert run(cl.verify_citation("999 F.4th 1"))["found"] is False
+    assert remote.queries == ["999 F.4th 1"]
+    _, ttl = cl._store.get("999 f4th 1")
+    assert ttl <= cl.settings.CITATION_MISS_TTL < cl.settings.CITATION_CACHE_TTL
+
+def test_failed_lookup_is_not_cached(verify):
+    _, remote = verify
+    remote.fail = True
+    assert run(cl.verify_citation("5 U.S. 137")) == {"citation": "5 U.S. 137", "found": None, "error": "lookup failed"}
+    remote.fail = False
+    assert run(cl.verify_citation("5 U.S. 137"))["found"] is True
+    assert remote.queries == ["5 U.S. 137", "5 U.S. 137"]
@@ -0,0 +1,11 @@
+from pathlib import Path
+
+from app.config import BACKEND_DIR, Settings
+
+def test_citation_cache_path_does_not_depend_on_cwd(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    assert Settings().CITATION_CACHE_PATH == str(BACKEND_DIR / ".citation_cache.sqlite3")
+    assert Settings(DATA_DIR="data").CITATION_CACHE_PATH == str(BACKEND_DIR / "data" / ".citation_cache.sqlite3")
+    assert Settings(DATA_DIR=str(tmp_path)).CITATION_CACHE_PATH == str(tmp_path / ".citation_cache.sqlite3")
+    assert Settings(CITATION_CACHE_PATH="/srv/cache.sqlite3").CITATION_CACHE_PATH == "/srv/cache.sqlite3"
+    assert Path(Settings().CITATION_CACHE_PATH).is_absolute()
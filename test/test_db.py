@@ -0,0 +1,23 @@
+import asyncio
+
+import httpx
+
+from app.services import db
+from app.services.http_clients import _upstreams
+
+def test_public_inserts_use_anon_key(upstream):
+    seen = []
+    upstream("supabase_anon", lambda req: seen.append(req) or httpx.Response(201, json=[{"id": 1}]))
+    assert asyncio.run(db.petition_signatures.insert({"full_name": "A"})) == [{"id": 1}]
+    assert seen[0].url.path == "/rest/v1/petition_signatures"
+    anon = _upstreams()["supabase_anon"]["headers"]
+    assert anon["apikey"] == anon["Authorization"].split()[-1] == "anon"
+
+def test_update_filters(upstream):
+    seen = []
+    upstream("supabase", lambda req: seen.append(req) or httpx.Response(200, json=[]))
+    asyncio.run(db.secure_shares.update({"redeemed": True}, where={"id": 3},
+                                        filters={"redeemed": "not.is.true"}, returning="representation"))
+    assert seen[0].method == "PATCH"
+    assert dict(seen[0].url.params) == {"id": "eq.3", "redeemed": "not.is.true"}
+    assert seen[0].headers["prefer"] == "return=representation"
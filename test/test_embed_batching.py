@@ -0,0 +1,75 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.utils.embed_batching import approx_tokens, embed_in_batches, pack_batches
+
+def text(tokens):
+    return "x" * (3 * (tokens - 1))  # approx_tokens(text(n)) == n
+
+def test_pack_batches_token_budget():
+    texts = [text(40)] * 5
+    assert [approx_tokens(t) for t in texts] == [40] * 5
+    assert pack_batches(texts, max_tokens=100, max_inputs=100) == [(0, 2), (2, 4), (4, 5)]
+    assert pack_batches(texts, max_tokens=80, max_inputs=100) == [(0, 2), (2, 4), (4, 5)]
+    assert pack_batches(texts, max_tokens=79, max_inputs=100) == [(i, i + 1) for i in range(5)]
+
+def test_pack_batches_input_cap():
+    assert pack_batches([text(1)] * 7, max_tokens=10_000, max_inputs=3) == [(0, 3), (3, 6), (6, 7)]
+
+def test_pack_batches_oversized_text_gets_its_own_span():
+    texts = [text(10), text(500), text(10), text(10)]
+    assert pack_batches(texts, max_tokens=100, max_inputs=100) == [(0, 1), (1, 2), (2, 4)]
+    assert pack_batches([text(500)], max_tokens=100, max_inputs=100) == [(0, 1)]
+    assert pack_batches([], max_tokens=100, max_inputs=100) == []
+
+class OpenAI:
+    """/v1/embeddings: embeds each input as [len(input)]; rejects requests over `limit` inputs, 429s on `flaky` once."""
+
+    def __init__(self, limit=None, flaky=(), always_429=False):
+        self.limit = limit
+        self.flaky = set(flaky)
+        self.always_429 = always_429
+        self.requests = []
+
+    def __call__(self, req):
+        inputs = json.loads(req.content)["input"]
+        self.requests.append(len(inputs))
+        if self.limit and len(inputs) > self.limit:
+            return httpx.Response(400, json={"error": "maximum context length"})
+        hit = self.flaky & set(inputs)
+        if hit:
+            if not self.always_429:
+                self.flaky -= hit
+            return httpx.Response(429, headers={"Retry-After": "0.01"})
+        data = [{"index": i, "embedding": [float(len(t))]} for i, t in reversed(list(enumerate(inputs)))]
+        return httpx.Response(200, json={"data": data})
+
+def embed(api, texts, **kw):
+    limits = dict(max_tokens=10_000, max_inputs=100, concurrency=2, retries=2)
+    limits.update(kw)
+
+    async def go():
+        async with httpx.AsyncClient(base_url="https://api.test", transport=httpx.MockTransport(api)) as c:
+            return await embed_in_batches(c, "/v1/embeddings", "m", texts, **limits)
+    return asyncio.run(go())
+
+def test_results_come_back_in_input_order_across_sub_batches():
+    texts = ["a" * n for n in range(1, 11)]
+    api = OpenAI()
+    assert embed(api, texts, max_inputs=3) == [[float(n)] for n in range(1, 11)]
+    assert sorted(api.requests) == [1, 3, 3, 3]
+
+def test_rejected_sub_batch_is_split_and_throttled_one_is_retried():
+    texts = ["a" * n for n in range(1, 9)]
+    api = OpenAI(limit=2, flaky={"aaa"})
+    assert embed(api, texts) == [[float(n)] for n in range(1, 9)]
+    assert api.requests.count(8) == 1 and api.requests.count(2) == 5  # 8 -> 4+4 -> 2+2+2+2, plus one retry
+
+def test_retries_are_capped():
+    api = OpenAI(flaky={"a"}, always_429=True)
+    with pytest.raises(httpx.HTTPStatusError):
+        embed(api, ["a"], retries=1)
+    assert api.requests == [1, 1]
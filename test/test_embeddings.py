@@ -0,0 +1,88 @@
+import asyncio
+import math
+
+import pytest
+
+import scrap_courtlistener as sc
+
+TEXTS = ["Section 1983 claim; due process violated.", "", "the the the court", "Due  process -- DUE process!"]
+
+def test_batched_local_embeddings_match_the_python_path(monkeypatch):
+    if sc.np is None:
+        pytest.skip("numpy not installed")
+    batched = sc.local_hash_embeddings(TEXTS, dim=64)
+    monkeypatch.setattr(sc, "np", None)
+    assert batched == [sc.local_hash_embedding(t, dim=64) for t in TEXTS]  # bit-identical
+    assert sc.local_hash_embeddings(TEXTS, dim=64) == batched
+
+def test_local_embeddings_are_normalized_token_counts():
+    vecs = sc.local_hash_embeddings(TEXTS, dim=64)
+    assert [len(v) for v in vecs] == [64] * len(TEXTS)
+    assert vecs[1] == [0.0] * 64  # no tokens
+    assert math.isclose(sum(x * x for x in vecs[0]), 1.0)
+    assert max(vecs[2]) == pytest.approx(3 / math.sqrt(9 + 1))  # "the" x3, "court" x1 (distinct buckets)
+    assert vecs[3] == sc.local_hash_embedding("due process due process", dim=64)
+    assert sc.local_hash_embeddings([], dim=64) == []
+
+def test_token_hashes_are_memoized():
+    sc.token_bucket.cache_clear()
+    sc.local_hash_embeddings(["alpha beta alpha"] * 3, dim=64)
+    info = sc.token_bucket.cache_info()
+    assert info.misses == 2 and info.hits == 4
+
+class Embedder:
+    """Stands in for embed_texts_with_model; `used` is the model it reports."""
+
+    def __init__(self, used):
+        self.used = used
+        self.calls = []
+
+    async def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 0.1, 1 / 3] for t in texts], self.used
+
+@pytest.fixture
+def cache(tmp_path):
+    c = sc.EmbeddingCache(str(tmp_path / "embed.sqlite3"), dim=3)
+    yield c
+    c.close()
+
+def embed(monkeypatch, cache, texts, used=sc.LOCAL_EMBED_MODEL, key=None):
+    monkeypatch.setattr(sc, "OPENAI_API_KEY", key)
+    fake = Embedder(used)
+    monkeypatch.setattr(sc, "embed_texts_with_model", fake)
+    return asyncio.run(sc.embed_texts_cached(texts, cache)), fake.calls
+
+def test_hits_skip_the_embedding_call(monkeypatch, cache, tmp_path):
+    first, calls = embed(monkeypatch, cache, ["a", "bb", "a"])
+    assert calls == [["a", "bb"]]  # deduped within the batch
+    again, calls = embed(monkeypatch, cache, ["bb", "a", "ccc"])
+    assert calls == [["ccc"]]
+    assert again[:2] == [first[1], first[0]] and again[0] == [2.0, 0.1, 1 / 3]  # float64 round trip
+    assert (cache.hits, cache.misses) == (2, 4)
+
+    reopened = sc.EmbeddingCache(str(tmp_path / "embed.sqlite3"), dim=3)
+    _, calls = embed(monkeypatch, reopened, ["a", "bb", "ccc"])
+    assert calls == []
+    reopened.close()
+
+def test_model_change_misses(monkeypatch, cache):
+    embed(monkeypatch, cache, ["a"])
+    _, calls = embed(monkeypatch, cache, ["a"], used=sc.EMBED_MODEL, key="sk-test")
+    assert calls == [["a"]]
+    _, calls = embed(monkeypatch, cache, ["a"], used=sc.EMBED_MODEL, key="sk-test")
+    assert calls == []
+
+def test_local_fallback_is_not_served_as_openai_vectors(monkeypatch, cache):
+    _, calls = embed(monkeypatch, cache, ["a"], used=sc.LOCAL_EMBED_MODEL, key="sk-test")  # OpenAI failed
+    _, calls = embed(monkeypatch, cache, ["a"], used=sc.EMBED_MODEL, key="sk-test")
+    assert calls == [["a"]]
+    _, calls = embed(monkeypatch, cache, ["a"])  # ...but the local model reuses it
+    assert calls == []
+
+def test_dimension_change_misses(monkeypatch, cache, tmp_path):
+    embed(monkeypatch, cache, ["a"])
+    wider = sc.EmbeddingCache(str(tmp_path / "embed.sqlite3"), dim=4)
+    _, calls = embed(monkeypatch, wider, ["a"])
+    assert calls == [["a"]] and wider.misses == 1
+    wider.close()
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+import scrap_courtlistener as sc
+
+SINCE = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+class FakeGovInfo(sc.GovInfoProvider):
+    """api.govinfo.gov search + package text; `statuses` are answered to searches before the real page."""
+
+    rate_limits = None
+
+    def __init__(self, statuses=(), fixtures=None):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.fixtures = fixtures
+        self.searches = 0
+
+    def handle(self, req):
+        if req.url.path == "/search":
+            self.searches += 1
+            if self.statuses:
+                return httpx.Response(self.statuses.pop(0))
+            return httpx.Response(200, json={"results": [
+                {"packageId": "USCOURTS-1", "title": "Doe v. Roe", "dateIssued": "2024-05-01"}]})
+        return httpx.Response(200, text="The motion is granted.", headers={"content-type": "text/plain"})
+
+    def _client(self, limits=None, **kwargs):
+        inner = None if self.replaying else httpx.MockTransport(self.handle)
+        transport = sc.RecordReplayTransport(self.fixtures, inner) if self.fixtures else inner
+        return httpx.AsyncClient(transport=transport, **kwargs)
+
+@pytest.fixture(autouse=True)
+def waits(monkeypatch):
+    monkeypatch.setattr(sc, "GOVINFO_API_KEY", "key")
+    waits = []
+    real_sleep = asyncio.sleep
+    monkeypatch.setattr(asyncio, "sleep", lambda s, *a: (waits.append(s), real_sleep(0))[1])
+    return waits
+
+def fetch(provider):
+    return asyncio.run(provider.fetch(SINCE, [], max_results=10, page_size=10))
+
+def test_throttled_search_is_retried_with_backoff(waits):
+    provider = FakeGovInfo(statuses=[429, 503])
+    assert [r.case_name for r in fetch(provider)] == ["Doe v. Roe"]
+    assert provider.searches == 3
+    assert len(waits) == 2 and waits[0] <= waits[1]
+
+def test_retries_are_capped(waits):
+    provider = FakeGovInfo(statuses=[429] * 100)
+    assert fetch(provider) == []
+    assert provider.searches == 5
+
+def test_replayed_error_raises_instead_of_spinning(tmp_path):
+    recording = FakeGovInfo(statuses=[429] * 100, fixtures=sc.FixtureStore(str(tmp_path), "record"))
+    fetch(recording)
+
+    replay = FakeGovInfo(fixtures=sc.FixtureStore(str(tmp_path), "replay"))
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch(replay)
+    assert replay.fixtures.replayed == 1
@@ -0,0 +1,28 @@
+import pytest
+
+import scrap_courtlistener as sc
+
+DOC = """<html><head><title>T</title><style>p{}</style></head><body><nav>Home | Search</nav>
+<h1>Smith v. Jones</h1><!-- a <b>comment</b> --><p>The court <i>GRANTS</i> the motion&nbsp;to   dismiss &amp; costs.</p>
+<script>var x = "</p><p>"; if (a<b) {}</script><div>Held: <a href="/x">42 U.S.C. &sect; 1983</a> claim&#39;s dismissed.<br>Affirmed.</div>
+<footer>(c) court</footer><p>Dated &lt;2024&gt;</p></body></html>"""
+
+EXPECTED = ("Smith v. Jones\nThe court GRANTS the motion to dismiss & costs.\n"
+            "Held: 42 U.S.C. § 1983 claim's dismissed.\nAffirmed.\nDated <2024>")
+
+def test_extracts_text():
+    assert sc.html_to_text(DOC) == EXPECTED
+
+def test_same_output_for_every_chunk_size():
+    # Every split point: tags, entities, comments and the </script> close all get cut somewhere.
+    for chunk in range(1, len(DOC) + 1):
+        assert sc.html_to_text(DOC, chunk) == EXPECTED, chunk
+
+@pytest.mark.parametrize("text, expected", [
+    ("", ""),
+    ("  plain   text\n\n second  line ", "plain text\nsecond line"),
+    ("<p>unclosed <b", "unclosed <b"),
+    ("<p>a</p><!-- never closed", "a"),
+])
+def test_edge_cases(text, expected):
+    assert sc.html_to_text(text, 3) == sc.html_to_text(text) == expected
@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routes import doh
+from app.services import http_clients
+
+class Upstreams:
+    """Every configured upstream answered by one MockTransport; counts the clients built and requests seen."""
+
+    def __init__(self, monkeypatch):
+        self.built = []
+        self.requests = []
+        real = http_clients._upstreams
+
+        def upstreams():
+            return {name: {**cfg, "transport": httpx.MockTransport(self.handle)} for name, cfg in real().items()}
+
+        class Client(httpx.AsyncClient):
+            def __init__(client, **kw):
+                super().__init__(**kw)
+                self.built.append(client)
+
+        monkeypatch.setattr(http_clients, "_upstreams", upstreams)
+        monkeypatch.setattr(http_clients.httpx, "AsyncClient", Client)
+        monkeypatch.setattr(http_clients, "clients", http_clients.ClientRegistry())
+
+    def handle(self, req):
+        self.requests.append(req.url.host)
+        if req.method == "POST":
+            return httpx.Response(201)
+        return httpx.Response(200, json=[{"state": "NY", "year": "2024", "cases": 3}])
+
+def test_start_opens_every_upstream_and_aclose_closes_them(monkeypatch):
+    ups = Upstreams(monkeypatch)
+    registry = http_clients.clients
+
+    async def go():
+        registry.start()
+        assert set(registry._clients) == set(http_clients._upstreams())
+        assert all(registry.get(name) is c for name, c in registry._clients.items())
+        opened = list(ups.built)
+        await registry.aclose()
+        assert all(c.is_closed for c in opened) and registry._clients == {}
+        reopened = registry.get("supabase")  # used after shutdown (scripts, tests): a fresh client
+        assert not reopened.is_closed and reopened not in opened
+        await registry.aclose()
+    asyncio.run(go())
+
+def test_requests_reuse_one_client_per_upstream(monkeypatch):
+    ups = Upstreams(monkeypatch)
+    app = FastAPI()
+    app.include_router(doh.router)
+    with TestClient(app) as api:
+        for _ in range(3):
+            assert api.post("/doh/refresh").json() == {"inserted": 1, "seen": 1}
+    assert len(ups.requests) == 6  # one DOH fetch and one insert per call...
+    assert len(ups.built) == 2     # ...through the same "public" and "supabase" clients
+
+def test_app_lifespan_starts_and_closes_the_clients(monkeypatch):
+    pytest.importorskip("webauthn")
+    pytest.importorskip("aiosqlite")
+    from app import main
+    ups = Upstreams(monkeypatch)
+    monkeypatch.setattr(main, "clients", http_clients.clients)
+    monkeypatch.setattr(main.settings, "CITATION_INDEX_ENABLED", False)
+    with TestClient(main.app):
+        assert len(ups.built) == len(http_clients._upstreams())
+        assert not any(c.is_closed for c in ups.built)
+    assert all(c.is_closed for c in ups.built)
@@ -0,0 +1,37 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.library import library_pages
+
+def table(ids):
+    """federal_case_library behind PostgREST: honours id=gt.N, order=id and limit."""
+    requests = []
+
+    def handle(req):
+        params = req.url.params
+        requests.append(params.get("id"))
+        rows = [{"id": i} for i in ids]
+        if params.get("id"):
+            rows = [r for r in rows if r["id"] > int(params["id"][len("gt."):])]
+        return httpx.Response(200, json=rows[:int(params["limit"])])
+    return handle, requests
+
+def pages(after=None, page=2):
+    async def go():
+        return [[r["id"] for r in rows] async for rows in library_pages("id", after, page=page)]
+    return asyncio.run(go())
+
+def test_pages_by_integer_id(upstream):
+    handle, requests = table([1, 2, 5, 9, 10])
+    upstream("supabase", handle)
+    assert pages() == [[1, 2], [5, 9], [10]]
+    assert requests == [None, "gt.2", "gt.9"]
+    assert pages(after=9) == [[10]]
+
+def test_non_integer_ids_are_rejected(upstream):
+    handle, _ = table(["0b6c1d2e-0000-4000-8000-000000000001"])
+    upstream("supabase", handle)
+    with pytest.raises(TypeError, match="integer identity"):
+        pages()
@@ -0,0 +1,50 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import get_user
+from app.config import settings
+from app.routes import match_cases
+
+@pytest.fixture
+def api(monkeypatch):
+    calls = []
+
+    async def embed_texts(texts):
+        calls.append(len(texts))
+        return [[float(len(t))] for t in texts]
+
+    async def match_embedding(embedding, n):
+        return [{"score": embedding[0]}] * n
+
+    monkeypatch.setattr(match_cases, "embed_texts", embed_texts)
+    monkeypatch.setattr(match_cases, "match_embedding", match_embedding)
+    app = FastAPI()
+    app.include_router(match_cases.router)
+    app.dependency_overrides[get_user] = lambda: {"user_id": "u1"}
+    return TestClient(app), calls
+
+def test_batch_matches_in_input_order(api):
+    client, calls = api
+    r = client.post("/match_cases/batch", json={"texts": ["a", "bbb"], "n": 2})
+    assert r.status_code == 200
+    assert r.json() == {"results": [{"matches": [{"score": 1.0}] * 2}, {"matches": [{"score": 3.0}] * 2}]}
+    assert calls == [2]
+
+@pytest.mark.parametrize("body", [
+    {"texts": []},
+    {"texts": [""]},
+    {"texts": "not a list"},
+    {"texts": ["a"] * (settings.MATCH_BATCH_MAX + 1)},
+    {"texts": ["a"], "n": 0},
+    {"texts": ["a"], "n": settings.MATCH_MAX_N + 1},
+])
+def test_batch_rejects_out_of_bounds_requests(api, body):
+    client, calls = api
+    assert client.post("/match_cases/batch", json=body).status_code == 422
+    assert calls == []
+
+def test_single_match_bounds_n(api):
+    client, _ = api
+    assert client.post("/match_cases", json={"text": "a", "n": 10_000}).status_code == 400
+    assert len(client.post("/match_cases", json={"text": "a", "n": 5}).json()["matches"]) == 5
@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+import scrap_courtlistener as sc
+
+WORDS = [f"w{i}" for i in range(5000)]
+
+def doc(rng, n=300):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def mutate(rng, text, frac):
+    toks = text.split()
+    for i in rng.sample(range(len(toks)), int(len(toks) * frac)):
+        toks[i] = rng.choice(WORDS)
+    return " ".join(toks)
+
+def jaccard(a, b):
+    x, y = sc.shingle_hashes(a), sc.shingle_hashes(b)
+    return len(x & y) / len(x | y)
+
+def test_numpy_and_python_signatures_match(monkeypatch):
+    if sc.np is None:
+        pytest.skip("numpy not installed")
+    rng = random.Random(7)
+    texts = [doc(rng) for _ in range(5)]
+    with_np = [sc.minhash_signature(t) for t in texts]
+    monkeypatch.setattr(sc, "np", None)
+    pure = [sc.minhash_signature(t) for t in texts]
+    assert pure == with_np
+    assert all(len(s) == sc.MINHASH_PERM for s in pure)
+    assert sc.signature_similarity(pure[0], pure[1]) == pytest.approx(
+        float(sum(x == y for x, y in zip(with_np[0], with_np[1]))) / sc.MINHASH_PERM)
+
+def test_short_text_has_no_signature():
+    assert sc.minhash_signature("Smith v. Jones") is None
+
+def test_similarity_estimates_jaccard():
+    rng = random.Random(11)
+    base = doc(rng, 600)
+    for frac in (0.01, 0.03, 0.08):
+        other = mutate(rng, base, frac)
+        est = sc.signature_similarity(sc.minhash_signature(base), sc.minhash_signature(other))
+        assert est == pytest.approx(jaccard(base, other), abs=0.12)
+
+def test_lsh_recall_and_precision():
+    rng = random.Random(1983)
+    originals = [doc(rng) for _ in range(200)]
+    index = sc.NearDupIndex(None, threshold=0.8)
+    for i, text in enumerate(originals):
+        assert index.match(f"{i} F.4th 1", sc.minhash_signature(text)) is None
+
+    found = sum(index.match(f"USCOURTS-{i}", sc.minhash_signature(mutate(rng, t, 0.01))) == f"{i} F.4th 1"
+                for i, t in enumerate(originals))
+    assert found / len(originals) >= 0.95
+    assert all(index.match(f"other-{i}", sc.minhash_signature(doc(rng))) is None for i in range(200))
+
+def test_persisted_signatures_match_in_later_runs(tmp_path):
+    rng = random.Random(3)
+    text = doc(rng)
+    path = str(tmp_path / "dedup.sqlite3")
+    first = sc.NearDupIndex(path)
+    assert first.match("123 F.4th 1", sc.minhash_signature(text)) is None
+    first.persist(["123 F.4th 1"])
+    first.close()
+
+    later = sc.NearDupIndex(path)
+    assert later.match("USCOURTS-abc", sc.minhash_signature(mutate(rng, text, 0.01))) == "123 F.4th 1"
+    # The same key again is not its own duplicate.
+    assert later.match("123 F.4th 1", sc.minhash_signature(text)) is None
+
+def test_index_from_another_signature_version_is_cleared(tmp_path, monkeypatch):
+    rng = random.Random(4)
+    text = doc(rng)
+    path = str(tmp_path / "dedup.sqlite3")
+    monkeypatch.setattr(sc, "MINHASH_VERSION", "old")
+    old = sc.NearDupIndex(path)
+    old.match("123 F.4th 1", sc.minhash_signature(text))
+    old.persist(["123 F.4th 1"])
+    old.close()
+
+    monkeypatch.undo()
+    index = sc.NearDupIndex(path)
+    assert index.db.execute("SELECT count(*) FROM sketches").fetchone() == (0,)
+    assert index.match("USCOURTS-abc", sc.minhash_signature(text)) is None
+
+KEYS = ["123 F.4th 456", "USCOURTS-ca9-22-01", sc.stable_id("Doe v. Roe", "https://x.test/1")]
+
+def test_key_rank_prefers_reporter_citations():
+    assert sorted(reversed(KEYS), key=sc.key_rank) == KEYS
+    assert sc.key_rank("5 U.S. 137 (1803)")[0] == 0
+
+@pytest.mark.parametrize("order", list(itertools.permutations(range(3))))
+def test_canonical_copy_does_not_depend_on_arrival_order(order):
+    rng = random.Random(5)
+    text = doc(rng)
+    index = sc.NearDupIndex(None)
+    kept = [KEYS[i] for i in order if index.match(KEYS[i], sc.minhash_signature(mutate(rng, text, 0.003))) is None]
+    assert list(index.sigs) == [KEYS[0]]
+    assert set(index.superseded) == set(kept) - {KEYS[0]}
+    assert all(new == KEYS[0] for new in index.superseded.values())
+
+    index.persist(kept)
+    assert sorted(index.replaced) == sorted(set(kept) - {KEYS[0]}) and not index.superseded
+
+def test_better_copy_replaces_a_stored_one(tmp_path):
+    rng = random.Random(6)
+    text = doc(rng)
+    path = str(tmp_path / "dedup.sqlite3")
+    first = sc.NearDupIndex(path)
+    first.match("USCOURTS-abc", sc.minhash_signature(text))
+    first.persist(["USCOURTS-abc"])
+    first.close()
+
+    later = sc.NearDupIndex(path)
+    assert later.match("123 F.4th 1", sc.minhash_signature(mutate(rng, text, 0.01))) is None
+    assert later.superseded == {"USCOURTS-abc": "123 F.4th 1"}
+    assert later.match("USCOURTS-abc", sc.minhash_signature(text)) == "123 F.4th 1"
+    later.persist(["123 F.4th 1"])
+    assert later.replaced == ["USCOURTS-abc"]
+    assert later.db.execute("SELECT key FROM sketches").fetchall() == [("123 F.4th 1",)]
+
+class Copies(sc.Provider):
+    """Yields one record per (key, text); `delay` staggers providers that run side by side."""
+
+    def __init__(self, name, items, delay):
+        self.name, self.items, self.delay = name, items, delay
+
+    async def stream(self, since, topics, page_size, budget, checkpoint=None):
+        for key, text in self.items:
+            await asyncio.sleep(self.delay)
+            yield sc.Record(case_name="Doe v. Roe", jurisdiction="federal", court_level="", summary=text,
+                            holding="", citation=key, outcome="WON", tags=[], source_link="", provider=self.name)
+
+@pytest.mark.parametrize("govinfo_first", [True, False])
+def test_pipeline_stores_the_citation_copy_and_deletes_the_one_it_replaces(monkeypatch, govinfo_first):
+    rng = random.Random(8)
+    text = doc(rng)
+    stored, deleted = [], []
+
+    async def write_rows(rows):
+        stored.extend(r["citation"] for r in rows)
+        return len(rows)
+
+    async def delete_rows(keys):
+        deleted.extend(keys)
+        return len(keys)
+
+    monkeypatch.setattr(sc, "OPENAI_API_KEY", None)
+    monkeypatch.setattr(sc, "write_rows", write_rows)
+    monkeypatch.setattr(sc, "delete_rows", delete_rows)
+    gov = Copies("govinfo", [("USCOURTS-1", text)], 0 if govinfo_first else 0.05)
+    cl = Copies("courtlistener", [("123 F.4th 1", mutate(rng, text, 0.01))], 0.05 if govinfo_first else 0)
+    pipeline = sc.ScrapePipeline(keep=lambda r: True, flush_after=0.01, diff=False,
+                                 near_dups=sc.NearDupIndex(None), writer=sc.BatchWriter(retries=0))
+    stats = asyncio.run(pipeline.run([gov, cl], datetime(2000, 1, 1, tzinfo=timezone.utc), 10, 10,
+                                     progress_every=0))
+
+    assert stats.near_dups == 1
+    assert set(stored) - set(deleted) == {"123 F.4th 1"}
+    assert deleted == (["USCOURTS-1"] if govinfo_first else [])
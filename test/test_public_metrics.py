@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.routes import metrics as routes
+from app.services import public_metrics as pm
+
+class Views:
+    """v_public_metrics / v_state_activity behind PostgREST; `gate` holds responses until set."""
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 10
+        self.gate = None
+
+    async def __call__(self, req):
+        if req.url.path.endswith("/v_public_metrics"):
+            self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        if req.url.path.endswith("/v_public_metrics"):
+            return httpx.Response(200, json=[{"signatures": self.total}])
+        return httpx.Response(200, json=[{"state": "NY", "count": 3}])
+
+@pytest.fixture
+def views(upstream, monkeypatch):
+    v = Views()
+    upstream("supabase", v)
+    monkeypatch.setattr(pm, "public_metrics", pm.PublicMetrics())
+    monkeypatch.setattr(routes, "snapshot", pm.public_metrics)
+    return v
+
+def age(snap, seconds):
+    snap.built_at = time.monotonic() - seconds
+
+def test_concurrent_first_requests_build_once(views):
+    async def scenario():
+        views.gate = asyncio.Event()
+        gets = [asyncio.ensure_future(pm.public_metrics.get()) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        views.gate.set()
+        return await asyncio.gather(*gets)
+
+    snaps = asyncio.run(scenario())
+    assert views.calls == 1
+    assert all(s is snaps[0] for s in snaps)
+
+def test_stale_snapshot_is_served_while_one_refresh_runs(views):
+    metrics = pm.public_metrics
+
+    async def scenario():
+        first = await metrics.get()
+        age(first, 2 * settings.METRICS_REFRESH + 1)
+        views.total = 11
+        views.gate = asyncio.Event()
+
+        served = [await metrics.get()]
+        refresh = metrics._inflight
+        served += [await metrics.get() for _ in range(9)]  # none of these wait on the database
+        await asyncio.sleep(0.01)
+        assert all(s is first for s in served)
+        assert metrics._inflight is refresh and not refresh.done()
+        assert views.calls == 2  # one refresh for all ten stale hits
+
+        views.gate.set()
+        await metrics._inflight
+        return first, await metrics.get()
+
+    stale, fresh = asyncio.run(scenario())
+    assert fresh is not stale and fresh.etag != stale.etag
+    assert b'"signatures":11' in fresh.body
+
+def test_if_none_match_returns_304_while_etag_is_unchanged(views):
+    async def scenario():
+        first = await routes.public_metrics(if_none_match=None)
+        etag = first.headers["etag"]
+        again = await routes.public_metrics(if_none_match=etag)
+        weak = await routes.public_metrics(if_none_match=f'"other", W/{etag}')
+
+        # A rebuild with the same data keeps the ETag, so clients keep getting 304s.
+        age(pm.public_metrics.snapshot, 2 * settings.METRICS_REFRESH + 1)
+        await routes.public_metrics(if_none_match=etag)
+        await pm.public_metrics._inflight
+        same = await routes.public_metrics(if_none_match=etag)
+
+        views.total = 12
+        await pm.public_metrics.refresh()
+        changed = await routes.public_metrics(if_none_match=etag)
+        return first, etag, again, weak, same, changed
+
+    first, etag, again, weak, same, changed = asyncio.run(scenario())
+    assert first.status_code == 200 and first.body
+    assert again.status_code == weak.status_code == same.status_code == 304
+    assert again.body == b"" and again.headers["etag"] == same.headers["etag"] == etag
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+def test_cancelling_run_cancels_its_build(views):
+    metrics = pm.public_metrics
+
+    async def scenario():
+        views.gate = asyncio.Event()  # never set: the build hangs until cancelled
+        runner = asyncio.ensure_future(metrics.run())
+        await asyncio.sleep(0.01)
+        build = metrics._inflight
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        await asyncio.sleep(0)
+        return build.cancelled()  # checked here: asyncio.run() cancels leftover tasks on exit
+
+    assert asyncio.run(scenario())
+
+def test_aclose_cancels_a_background_refresh_started_by_get(views):
+    metrics = pm.public_metrics
+
+    async def scenario():
+        age(await metrics.get(), 2 * settings.METRICS_REFRESH + 1)
+        views.gate = asyncio.Event()
+        await metrics.get()
+        build = metrics._inflight
+        await metrics.aclose()
+        return build.cancelled() and metrics._inflight is None
+
+    assert asyncio.run(scenario())
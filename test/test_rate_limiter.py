@@ -0,0 +1,98 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import scrap_courtlistener as sc
+
+class Clock:
+    """Fake monotonic time for the limiter; asyncio.sleep advances it instead of waiting."""
+
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        self.slept = []
+        real_sleep = asyncio.sleep
+
+        def sleep(seconds, *a):
+            self.slept.append(seconds)
+            self.now += seconds
+            return real_sleep(0)
+
+        monkeypatch.setattr(sc, "time", SimpleNamespace(monotonic=lambda: self.now, time=time.time))
+        monkeypatch.setattr(asyncio, "sleep", sleep)
+
+@pytest.fixture
+def clock(monkeypatch):
+    return Clock(monkeypatch)
+
+def test_throttling_halves_the_rate_and_successes_win_it_back(clock):
+    lim = sc.HostRateLimiter("api.test", 2.0, max_rate=2.0, step=0.25)
+    lim.observe(429, {"Retry-After": "5"})
+    assert lim.rate == 1.0
+    assert clock.now + 5 <= lim.paused_until <= clock.now + 5 * 1.25
+    lim.observe(503, {})
+    assert lim.rate == 0.5 and lim.failures == 1  # no Retry-After: exponential backoff
+
+    rates = []
+    for _ in range(8):
+        lim.observe(200, {})
+        rates.append(lim.rate)
+    assert rates == [0.75, 1.0, 1.25, 1.5, 1.75, 2.0, 2.0, 2.0]
+    assert lim.failures == 0
+
+def test_rate_never_drops_below_min_rate(clock):
+    lim = sc.HostRateLimiter("api.test", 1.0, min_rate=0.2)
+    for _ in range(10):
+        lim.observe(429, {"Retry-After": "0"})
+    assert lim.rate == 0.2
+
+def test_backoff_grows_until_a_success(clock):
+    lim = sc.HostRateLimiter("api.test", 1.0)
+    for expected in (2, 4, 8, 16, 32, 60, 60):
+        lim.paused_until = 0.0
+        lim.observe(503, {})
+        assert expected <= lim.paused_until - clock.now <= expected * 1.25  # jittered
+    lim.observe(200, {})
+    assert lim.failures == 0
+
+def test_server_quota_caps_the_rate(clock):
+    lim = sc.HostRateLimiter("api.test", 5.0, max_rate=10.0)
+    lim.observe(200, {"X-RateLimit-Remaining": "30", "X-RateLimit-Reset": "60"})
+    assert lim.rate == 0.5
+    lim.observe(200, {"X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "20"})
+    assert lim.paused_until >= clock.now + 20
+
+def test_only_the_providers_throttle_statuses_halve_the_rate(clock):
+    cl = sc.HostRateLimiter("www.courtlistener.com", 1.0, throttle=(403, 429, 503))
+    other = sc.HostRateLimiter("api.test", 1.0)
+    cl.observe(403, {})
+    other.observe(403, {})
+    assert cl.rate == 0.5 and other.rate > 1.0
+
+def test_transport_paces_pauses_and_recovers(clock):
+    statuses = [200, 429] + [200] * 30
+    seen = []
+
+    def handle(req):
+        seen.append(clock.now)
+        status = statuses.pop(0)
+        return httpx.Response(status, headers={"Retry-After": "10"} if status == 429 else {})
+
+    registry = sc.RateLimiterRegistry()
+    transport = sc.RateLimitedTransport(registry, httpx.MockTransport(handle), rate=2.0, throttle=(429,))
+
+    async def go():
+        async with httpx.AsyncClient(transport=transport) as c:
+            for _ in range(32):
+                await c.get("https://api.test/search")
+    asyncio.run(go())
+
+    lim = registry.get("api.test", 99.0, ())
+    assert registry.hosts == {"api.test": lim} and lim.host == "api.test"  # one shared limiter per host
+    assert seen[2] - seen[1] >= 10  # paused for Retry-After
+    assert lim.rate == pytest.approx((2.0 + lim.step) / 2 + 30 * lim.step)  # +step, halved, +step per success
+    # After the pause there is no burst credit: requests are spaced by at least 1/rate.
+    gaps = [b - a for a, b in zip(seen[2:], seen[3:])]
+    assert all(g >= 1 / lim.rate - 1e-9 for g in gaps)
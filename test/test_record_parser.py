@@ -0,0 +1,33 @@
+import asyncio
+
+import scrap_courtlistener as sc
+
+def opinion(n):
+    if n == 5:
+        return {"case_name": "Broken", "citations": [5]}  # parse_item raises on this
+    return {"case_name": f"Case {n}", "absolute_url": f"/opinion/{n}/", "citations": [{"cite": f"{n} F.4th 1"}],
+            "html": f"<p>Opinion {n}: the motion to dismiss is <b>granted</b>.</p>" * 50}
+
+def parse_all(workers, items):
+    parser = sc.RecordParser(workers)
+    try:
+        return asyncio.run(parser.map(sc.CourtListenerProvider.parse_item, items))
+    finally:
+        parser.close()
+
+def test_process_pool_matches_inline_parsing():
+    items = [(opinion(n),) for n in range(11)]
+
+    inline = parse_all(0, items)
+    pooled = parse_all(3, items)
+
+    assert pooled == inline
+    assert [r.case_name for r, _ in inline if r] == [f"Case {n}" for n in range(11) if n != 5]
+
+def test_one_bad_item_only_fails_itself():
+    items = [(opinion(n),) for n in range(4, 7)]
+    for workers in (0, 2):
+        (a, a_err), (b, b_err), (c, c_err) = parse_all(workers, items)
+        assert a.case_name == "Case 4" and c.case_name == "Case 6"
+        assert a_err is None and c_err is None
+        assert b is None and b_err
@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+import pytest
+
+import scrap_courtlistener as sc
+
+URL = "https://api.test/opinions/1"
+
+class Origin:
+    """One resource; answers conditional GETs with 304 while its validators still match."""
+
+    def __init__(self, body=b"opinion text", **headers):
+        self.body = body
+        self.headers = headers
+        self.requests = []
+
+    def __call__(self, req):
+        self.requests.append(req.headers)
+        etag, modified = self.headers.get("ETag"), self.headers.get("Last-Modified")
+        if (etag and req.headers.get("If-None-Match") == etag) or \
+                (modified and req.headers.get("If-Modified-Since") == modified):
+            return httpx.Response(304)
+        return httpx.Response(200, content=self.body, headers=self.headers)
+
+def provider(monkeypatch, origin, cache):
+    monkeypatch.setattr(httpx, "AsyncHTTPTransport", lambda **kw: httpx.MockTransport(origin))
+    prov = sc.Provider()
+    prov.rate_limits = None
+    prov.cache = cache
+    return prov
+
+def get_twice(prov):
+    async def go():
+        async with prov._client() as c:
+            return [(await c.get(URL)) for _ in range(2)]
+    return asyncio.run(go())
+
+@pytest.fixture
+def cache(tmp_path):
+    return sc.ResponseCache(str(tmp_path / "cache"), 1 << 20)
+
+def test_revalidated_entry_is_answered_from_disk(monkeypatch, cache):
+    origin = Origin(ETag='"v1"')
+    first, second = get_twice(provider(monkeypatch, origin, cache))
+    assert origin.requests[0].get("If-None-Match") is None
+    assert origin.requests[1]["If-None-Match"] == '"v1"'
+    assert second.status_code == 200 and second.content == first.content == b"opinion text"
+    assert (cache.misses, cache.revalidated, cache.hits) == (1, 1, 0)
+
+def test_last_modified_is_sent_as_if_modified_since(monkeypatch, cache):
+    origin = Origin(**{"Last-Modified": "Wed, 01 May 2024 00:00:00 GMT"})
+    _, second = get_twice(provider(monkeypatch, origin, cache))
+    assert origin.requests[1]["If-Modified-Since"] == "Wed, 01 May 2024 00:00:00 GMT"
+    assert second.content == b"opinion text" and cache.revalidated == 1
+
+def test_fresh_entry_skips_the_network(monkeypatch, cache):
+    origin = Origin(**{"Cache-Control": "max-age=60"})
+    _, second = get_twice(provider(monkeypatch, origin, cache))
+    assert len(origin.requests) == 1 and second.content == b"opinion text" and cache.hits == 1
+
+def test_no_store_is_not_cached(monkeypatch, cache):
+    origin = Origin(ETag='"v1"', **{"Cache-Control": "no-store"})
+    get_twice(provider(monkeypatch, origin, cache))
+    assert [r.get("If-None-Match") for r in origin.requests] == [None, None]
+    assert not list(cache.root.iterdir())
+
+def test_no_cache_flag_runs_without_a_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(sc, "_sb", None)
+    for flags, created in (([], True), (["--no-cache"], False)):
+        cache_dir = tmp_path / ("on" if created else "off")
+        argv = flags + ["--cache-dir", str(cache_dir), "--providers", "nosuch", "--no-embed-cache", "--no-dedup",
+                        "--state-file", str(tmp_path / "state.json")]
+        with pytest.raises(SystemExit, match="No valid providers"):
+            asyncio.run(sc.main_async(argv, sb=object()))
+        assert cache_dir.exists() == created
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    body = b"x" * 1000
+    cache = sc.ResponseCache(str(tmp_path), 2500)
+    for k in ("a", "b"):
+        cache.store(k, 200, httpx.Headers({"ETag": k}), body)
+    assert cache.load("a")  # now b is the oldest
+    cache.store("c", 200, httpx.Headers({"ETag": "c"}), body)
+    assert cache.load("b") is None and cache.load("a") and cache.load("c")
+    assert sorted(p.stem for p in tmp_path.glob("*.entry")) == ["a", "c"]
+    assert sc.ResponseCache(str(tmp_path), 2500)._size == cache._size <= 2500
+
+def test_body_streams_through_and_is_cached_once_read(monkeypatch, cache):
+    async def go():
+        more = asyncio.Event()
+
+        async def body():
+            yield b"first "
+            await asyncio.wait_for(more.wait(), 2)  # a transport that buffers the body fails here
+            yield b"second"
+
+        prov = provider(monkeypatch, lambda req: httpx.Response(200, content=body(), headers={"ETag": '"v1"'}), cache)
+        async with prov._client() as c:
+            async with c.stream("GET", URL) as resp:
+                chunks = resp.aiter_bytes()
+                assert await chunks.__anext__() == b"first "  # before the origin has sent the rest
+                assert not list(cache.root.glob("*.entry"))
+                more.set()
+                assert [c async for c in chunks] == [b"second"]
+            assert cache.load(sc.ResponseCache.key("GET", URL))[1] == b"first second"
+
+            # A body the reader abandons is not cached, and leaves no temp file behind.
+            more.clear()
+            async with c.stream("GET", URL + "?other") as resp:
+                await resp.aiter_bytes().__anext__()
+        assert [p.suffix for p in cache.root.iterdir()] == [".entry"]
+    asyncio.run(go())
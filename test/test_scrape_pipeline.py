@@ -0,0 +1,195 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import scrap_courtlistener as sc
+
+TOPICS = ["civil rights"]
+PAGES = 3
+PER_PAGE = 3
+BASE = "https://cl.test/opinions/"
+
+def page_url(i):
+    return None if i == 0 else f"{BASE}?cursor=p{i}"
+
+def opinion(n):
+    filed = datetime(2024, 6, 1, tzinfo=timezone.utc) - timedelta(days=n)
+    return {"case_name": f"Case {n}", "date_filed": filed.date().isoformat(), "absolute_url": f"/opinion/{n}/",
+            "citations": [{"cite": f"{n + 1} F.4th 100"}], "html": f"<p>Opinion {n}. The motion is granted.</p>"}
+
+class FakeCL(sc.CourtListenerProvider):
+    """CourtListener's paging, driven by an httpx.MockTransport instead of the network."""
+
+    def __init__(self, fail_on_page=None):
+        self.requested = []
+        self.fail_on_page = fail_on_page
+
+    def handle(self, req):
+        cursor = req.url.params.get("cursor")
+        i = int(cursor[1:]) if cursor else 0
+        self.requested.append(i)
+        if i == self.fail_on_page:
+            raise RuntimeError("connection reset mid-walk")
+        nxt = page_url(i + 1) if i + 1 < PAGES else None
+        return httpx.Response(200, json={"results": [opinion(i * PER_PAGE + j) for j in range(PER_PAGE)], "next": nxt})
+
+    def _client(self, limits=None, **kwargs):
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handle), **kwargs)
+
+class PgError(Exception):
+    def __init__(self, code):
+        super().__init__(f"postgres error {code}")
+        self.code = code
+
+class FakeSink:
+    """Stands in for write_rows(); writes finish in random order, like concurrent upserts."""
+
+    def __init__(self, bad=()):
+        self.rows = []
+        self.bad = set(bad)
+
+    async def __call__(self, rows):
+        await asyncio.sleep(random.random() / 200)
+        if any(r["citation"] in self.bad for r in rows):
+            raise PgError("23502")
+        self.rows.extend(rows)
+        return len(rows)
+
+    def stored(self):
+        return {r["citation"] for r in self.rows}
+
+def cite(n):
+    return sc.normalize_citation(f"{n + 1} F.4th 100")
+
+@pytest.fixture
+def scraper(monkeypatch, tmp_path):
+    monkeypatch.setattr(sc, "COURTLISTENER_TOKEN", "token")
+    monkeypatch.setattr(sc, "COURTLISTENER_BASE", BASE.rsplit("/opinions/", 1)[0])
+    monkeypatch.setattr(sc, "OPENAI_API_KEY", None)  # local hash embeddings
+    sink = FakeSink()
+    monkeypatch.setattr(sc, "write_rows", sink)
+    return sink, tmp_path / "state.json"
+
+def run_pipeline(provider, state_path, resume=False, upsert_batch=2, check=None, walk="full"):
+    store = sc.CheckpointStore(str(state_path))
+    checkpoints = {provider.name: store.get(provider.name, TOPICS, walk, resume=resume)}
+    if check:
+        save = store.save
+        store.save = lambda: (check(store.state), save())
+    pipeline = sc.ScrapePipeline(
+        keep=lambda r: True, checkpoints=checkpoints, store=store, topics=TOPICS,
+        embed_batch=2, upsert_batch=upsert_batch, queue_size=2, flush_after=0.01, diff=False,
+        writer=sc.BatchWriter(concurrency=4, retries=0))
+    stats = asyncio.run(pipeline.run([provider], datetime(2000, 1, 1, tzinfo=timezone.utc), 100, 10, progress_every=0))
+    return pipeline, stats, json.loads(state_path.read_text())
+
+def entry(state):
+    (value,) = state.values()
+    return value
+
+def test_clean_run_commits_watermark_in_fifo_order(scraper):
+    sink, state_path = scraper
+    order = [cite(n) for n in range(PAGES * PER_PAGE)]
+
+    def check(state):
+        # A walk snapshot at page k may only be saved once every record before page k is stored.
+        walk = entry(state).get("walks", {}).get("full")
+        if walk and walk["cursor"]:
+            k = int(walk["cursor"].rsplit("p", 1)[1])
+            assert set(order[:k * PER_PAGE]) <= sink.stored()
+
+    pipeline, stats, state = run_pipeline(FakeCL(), state_path, check=check)
+
+    assert stats.fetched == stats.inserted == PAGES * PER_PAGE
+    assert sink.stored() == set(order)
+    assert entry(state)["walks"] == {}
+    assert entry(state)["watermark"] == "2024-06-01T00:00:00+00:00"
+    for q in (pipeline.q_fetched, pipeline.q_kept, pipeline.q_rows):
+        assert q.empty()
+
+def test_failed_upsert_freezes_checkpoint_and_resume_refetches(scraper):
+    sink, state_path = scraper
+    sink.bad = {cite(4)}  # second record of page 1
+
+    _, stats, state = run_pipeline(FakeCL(), state_path, upsert_batch=1)
+
+    assert stats.skipped == 1
+    assert cite(4) not in sink.stored()
+    # Only records up to #3 (first of page 1) settled before the failure: resume at page 1, no watermark.
+    assert "watermark" not in entry(state)
+    assert entry(state)["walks"]["full"] == {"cursor": page_url(1), "newest": "2024-06-01T00:00:00+00:00"}
+
+    sink.bad = set()
+    provider = FakeCL()
+    _, stats, state = run_pipeline(provider, state_path, resume=True)
+    assert provider.requested == [1, 2]
+    assert cite(4) in sink.stored()
+    assert entry(state)["walks"] == {}
+    assert entry(state)["watermark"] == "2024-06-01T00:00:00+00:00"
+
+def test_incremental_run_stops_at_the_watermark(scraper):
+    sink, state_path = scraper
+    run_pipeline(FakeCL(), state_path)
+    sink.rows.clear()
+
+    provider = FakeCL()
+    _, stats, state = run_pipeline(provider, state_path, walk="incremental")
+    # Page 0 still holds the watermark's own date; page 1 is wholly older and ends the walk.
+    assert provider.requested == [0, 1]
+    assert stats.fetched == 1 and sink.stored() == {cite(0)}
+    assert entry(state)["watermark"] == "2024-06-01T00:00:00+00:00"
+    assert entry(state)["walks"] == {}
+
+def test_provider_crash_keeps_last_stored_cursor(scraper):
+    sink, state_path = scraper
+
+    _, stats, state = run_pipeline(FakeCL(fail_on_page=2), state_path)
+
+    assert sink.stored() == {cite(n) for n in range(2 * PER_PAGE)}
+    # Records already fetched still land; the walk end state is not trusted.
+    assert "watermark" not in entry(state)
+    assert entry(state)["walks"]["full"]["cursor"] == page_url(1)
+
+    provider = FakeCL()
+    _, _, state = run_pipeline(provider, state_path, resume=True)
+    assert provider.requested == [1, 2]
+    assert entry(state)["walks"] == {}
+
+def test_stage_error_cancels_every_stage(scraper):
+    sink, state_path = scraper
+    store = sc.CheckpointStore(str(state_path))
+    checkpoints = {"courtlistener": store.get("courtlistener", TOPICS)}
+
+    def keep(rec):
+        if rec.case_name == "Case 4":
+            raise ValueError("bad record")
+        return True
+
+    pipeline = sc.ScrapePipeline(keep=keep, checkpoints=checkpoints, store=store, topics=TOPICS,
+                                 queue_size=1, flush_after=0.01, diff=False)
+
+    async def scenario():
+        run = pipeline.run([FakeCL()], datetime(2000, 1, 1, tzinfo=timezone.utc), 100, 10, progress_every=0)
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(run, 5)  # a stage left blocked on its queue would time out here
+        return [t for t in asyncio.all_tasks() if t is not asyncio.current_task() and not t.done()]
+
+    assert asyncio.run(scenario()) == []
+    assert not state_path.exists() or "watermark" not in entry(json.loads(state_path.read_text()))
+
+@pytest.mark.parametrize("extra", [["--retry-dead-letter"], ["--replay", "{tmp}", "--providers", "nosuch"]])
+def test_main_async_restores_module_settings(monkeypatch, tmp_path, extra):
+    monkeypatch.setattr(sc, "COURTLISTENER_TOKEN", None)
+    monkeypatch.setattr(sc, "GOVINFO_API_KEY", None)
+    monkeypatch.setattr(sc, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(sc, "_sb", None)
+    argv = ["--local-embeddings", "--dead-letter", str(tmp_path / "dead.jsonl"), "--state-file", str(tmp_path / "s.json")]
+    try:
+        asyncio.run(sc.main_async(argv + [a.format(tmp=tmp_path) for a in extra], sb=object()))
+    except SystemExit:
+        pass  # no valid providers: the run still ends after overriding the credentials
+    assert (sc.COURTLISTENER_TOKEN, sc.GOVINFO_API_KEY, sc.OPENAI_API_KEY, sc._sb) == (None, None, "sk-test", None)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.routes import shares
+
+def fake_postgrest(tables):
+    """Just enough PostgREST for shares.py: eq./not.is.true filters, limit, insert, PATCH with return=representation."""
+    def matches(row, params):
+        for col, expr in params.items():
+            if col in ("select", "limit", "order"):
+                continue
+            if expr == "not.is.true":
+                if row.get(col) is True:
+                    return False
+            elif expr.startswith("eq.") and str(row.get(col)) != expr[3:]:
+                return False
+        return True
+
+    def handler(req):
+        if req.url.path.startswith("/storage/v1/object/sign/"):
+            return httpx.Response(200, json={"signedURL": "/object/sign/pdf/m1.pdf?token=t"})
+        rows = tables[req.url.path.rsplit("/", 1)[1]]
+        params = dict(req.url.params)
+        if req.method == "GET":
+            found = [r for r in rows if matches(r, params)]
+            return httpx.Response(200, json=found[: int(params.get("limit", len(found)))])
+        if req.method == "POST":
+            row = {"id": len(rows) + 1, **json.loads(req.content)}  # redeemed left unset, i.e. NULL
+            rows.append(row)
+            return httpx.Response(201)
+        if req.method == "PATCH":
+            hit = [r for r in rows if matches(r, params)]
+            for r in hit:
+                r.update(json.loads(req.content))
+            return httpx.Response(200, json=hit)
+        return httpx.Response(405)
+    return handler
+
+def test_create_then_redeem_once(upstream):
+    tables = {"secure_shares": [], "generated_motions": [{"id": 7, "pdf_path": "m1.pdf"}]}
+    upstream("supabase", fake_postgrest(tables))
+
+    async def scenario():
+        url = (await shares.create_share({"motion_id": 7}, {"user_id": "u1"}))["url"]
+        secret = url.rsplit("/", 1)[1]
+        assert "redeemed" not in tables["secure_shares"][0]
+
+        first = await shares.redeem(secret)
+        assert first["signed_url"].startswith("https://test.supabase.co/storage/v1/object/sign/")
+        assert tables["secure_shares"][0]["redeemed"] is True
+
+        with pytest.raises(HTTPException) as e:
+            await shares.redeem(secret)
+        assert e.value.status_code == 410
+
+    asyncio.run(scenario())
+
+def test_concurrent_redeems_single_winner(upstream):
+    tables = {"secure_shares": [{"id": 1, "motion_id": 7, "one_time_secret": "s", "expires_at": None}],
+              "generated_motions": [{"id": 7, "pdf_path": "m1.pdf"}]}
+    upstream("supabase", fake_postgrest(tables))
+
+    async def scenario():
+        return await asyncio.gather(*(shares.redeem("s") for _ in range(5)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert sum(isinstance(r, dict) for r in results) == 1
+    assert all(r.status_code == 410 for r in results if isinstance(r, HTTPException))
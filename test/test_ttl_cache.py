@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.utils.cache import TTLCache
+
+class Loader:
+    def __init__(self, value="role", fail=False):
+        self.calls = 0
+        self.value = value
+        self.fail = fail
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("PostgREST down")
+        return self.value
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(maxsize=10, ttl=60)
+    load = Loader()
+
+    async def scenario():
+        load.release = asyncio.Event()
+        gets = [asyncio.ensure_future(cache.get_or_load("user-1", load)) for _ in range(50)]
+        await asyncio.sleep(0)
+        load.release.set()
+        return await asyncio.gather(*gets)
+
+    assert asyncio.run(scenario()) == ["role"] * 50
+    assert load.calls == 1
+    assert cache.get("user-1") == "role"
+
+def test_cancelled_caller_does_not_cancel_the_shared_load():
+    cache = TTLCache(maxsize=10, ttl=60)
+    load = Loader()
+
+    async def scenario():
+        load.release = asyncio.Event()
+        first = asyncio.ensure_future(cache.get_or_load("k", load))
+        second = asyncio.ensure_future(cache.get_or_load("k", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        load.release.set()
+        return await second
+
+    assert asyncio.run(scenario()) == "role"
+    assert load.calls == 1
+    assert cache.get("k") == "role"
+
+def test_failed_load_is_not_cached():
+    cache = TTLCache(maxsize=10, ttl=60)
+    load = Loader(fail=True)
+
+    async def scenario():
+        load.release = asyncio.Event()
+        load.release.set()
+        with pytest.raises(RuntimeError):
+            await cache.get_or_load("k", load)
+        load.fail = False
+        return await cache.get_or_load("k", load)
+
+    assert asyncio.run(scenario()) == "role"
+    assert load.calls == 2
+
+def test_ttl_for_and_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.utils.cache.time.monotonic", lambda: now[0])
+    cache = TTLCache(maxsize=2, ttl=60)
+    miss = Loader(value=None)
+
+    async def scenario():
+        miss.release = asyncio.Event()
+        miss.release.set()
+        return await cache.get_or_load("k", miss, ttl_for=lambda v: 5 if v is None else None)
+
+    assert asyncio.run(scenario()) is None
+    now[0] += 4
+    assert cache.get("k", "gone") is None
+    now[0] += 2
+    assert cache.get("k", "gone") == "gone"
+
+    for key in "abc":
+        cache.set(key, key)
+    assert len(cache) == 2 and cache.get("a") is None
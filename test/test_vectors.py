@@ -0,0 +1,15 @@
+import numpy as np
+
+from app.utils.vectors import parse_vector
+
+def test_parses_postgrest_text_and_lists():
+    v = parse_vector("[0.5,-1.25e-3,2]", 3)
+    assert v.dtype == np.float32 and v.tolist() == np.array([0.5, -1.25e-3, 2], np.float32).tolist()
+    assert parse_vector([1, 2, 3], 3).tolist() == [1.0, 2.0, 3.0]
+
+def test_rejects_missing_malformed_and_wrong_dim():
+    assert parse_vector(None, 3) is None
+    assert parse_vector("[1,2,3]x", 3) is None
+    assert parse_vector("[1,,3]", 3) is None
+    assert parse_vector("[1,2]", 3) is None
+    assert parse_vector("[[1,2,3]]", 3) is None